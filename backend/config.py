@@ -3,7 +3,7 @@ Configuration management for VPS Email Finder
 Centralizes all environment variables and settings
 """
 import os
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 
 class Config:
@@ -13,6 +13,24 @@ class Config:
     SMTP_HOSTNAME: str = os.getenv("SMTP_HOSTNAME", "vps.auraia.ch")
     SMTP_FROM_EMAIL: str = os.getenv("SMTP_FROM_EMAIL", "verify@vps.auraia.ch")
     SMTP_TIMEOUT: int = int(os.getenv("SMTP_TIMEOUT", "10"))
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "25"))
+    SMTP_COMMAND_TIMEOUT: int = int(os.getenv("SMTP_COMMAND_TIMEOUT", "10"))  # per SMTP command (async engine)
+
+    # Outbound Source Addresses (local IPs, each with its own EHLO hostname)
+    SMTP_SOURCE_ADDRESSES: str = os.getenv("SMTP_SOURCE_ADDRESSES", "")  # "ip=ehlo-host,..." empty = OS default + SMTP_HOSTNAME
+    SMTP_SOURCE_STRATEGY: str = os.getenv("SMTP_SOURCE_STRATEGY", "round_robin")  # or "least_loaded" (fewest open sessions)
+    SMTP_SOURCE_RATE: float = float(os.getenv("SMTP_SOURCE_RATE", "10"))  # RCPTs per second per source IP
+    SMTP_SOURCE_BURST: float = float(os.getenv("SMTP_SOURCE_BURST", "30"))
+    SMTP_SOURCE_BLOCK_COOLDOWN: float = float(os.getenv("SMTP_SOURCE_BLOCK_COOLDOWN", "900"))  # seconds a blocked IP is avoided
+
+    # Session Reuse
+    SMTP_SESSION_MAX_RECIPIENTS: int = int(os.getenv("SMTP_SESSION_MAX_RECIPIENTS", "20"))  # RCPTs before RSET
+
+    # Connection Pool (warm sessions per MX host)
+    SMTP_POOL_MAX_SESSIONS_PER_HOST: int = int(os.getenv("SMTP_POOL_MAX_SESSIONS_PER_HOST", "2"))
+    SMTP_POOL_IDLE_TIMEOUT: float = float(os.getenv("SMTP_POOL_IDLE_TIMEOUT", "30"))  # seconds, 0 disables pooling
+    SMTP_POOL_MAX_RECIPIENTS_PER_SESSION: int = int(os.getenv("SMTP_POOL_MAX_RECIPIENTS_PER_SESSION", "100"))
+    SMTP_POOL_HEALTH_CHECK_AFTER: float = float(os.getenv("SMTP_POOL_HEALTH_CHECK_AFTER", "5"))  # idle seconds before NOOP
 
     # Retry Logic
     SMTP_MAX_RETRIES: int = int(os.getenv("SMTP_MAX_RETRIES", "3"))
@@ -21,14 +39,104 @@ class Config:
     # MX Fallback
     MAX_MX_SERVERS: int = int(os.getenv("MAX_MX_SERVERS", "2"))
 
-    # Rate Limiting
-    RATE_LIMIT_DELAY: float = float(os.getenv("RATE_LIMIT_DELAY", "1.0"))  # seconds between checks
+    # Politeness (token buckets, in RCPT commands per second)
+    POLITENESS_HOST_RATE: float = float(os.getenv("POLITENESS_HOST_RATE", "5"))
+    POLITENESS_HOST_BURST: float = float(os.getenv("POLITENESS_HOST_BURST", "20"))
+    POLITENESS_PROVIDER_RATE: float = float(os.getenv("POLITENESS_PROVIDER_RATE", "20"))
+    POLITENESS_PROVIDER_BURST: float = float(os.getenv("POLITENESS_PROVIDER_BURST", "50"))
+    POLITENESS_RATE_LIMIT_CODES: Tuple[int, ...] = tuple(
+        int(code) for code in os.getenv("POLITENESS_RATE_LIMIT_CODES", "421,450,451").split(",")
+    )
+    POLITENESS_BACKOFF_FACTOR: float = float(os.getenv("POLITENESS_BACKOFF_FACTOR", "0.5"))  # rate multiplier on 421/450
+    POLITENESS_MIN_RATE: float = float(os.getenv("POLITENESS_MIN_RATE", "0.2"))
+    POLITENESS_RECOVERY_STEP: float = float(os.getenv("POLITENESS_RECOVERY_STEP", "0.05"))  # share of base rate regained per normal reply
+    POLITENESS_PROVIDERS: str = os.getenv("POLITENESS_PROVIDERS", "")  # extra "mx-suffix=provider,..." mappings
+
+    # Well-known MX hostname suffixes -> provider (shared rate budget)
+    DEFAULT_PROVIDER_SUFFIXES: Dict[str, str] = {
+        "google.com": "google",
+        "googlemail.com": "google",
+        "outlook.com": "microsoft",
+        "pphosted.com": "proofpoint",
+        "ppe-hosted.com": "proofpoint",
+        "mimecast.com": "mimecast",
+        "messagelabs.com": "broadcom",
+        "barracudanetworks.com": "barracuda",
+        "yahoodns.net": "yahoo",
+        "zoho.com": "zoho",
+        "zoho.eu": "zoho",
+        "infomaniak.ch": "infomaniak",
+        "ovh.net": "ovh",
+    }
 
     # Cache Settings
-    MX_CACHE_TTL: int = int(os.getenv("MX_CACHE_TTL", "3600"))  # 1 hour default
+    MX_CACHE_TTL: int = int(os.getenv("MX_CACHE_TTL", "3600"))  # 1 hour, when the DNS answer has no TTL
+    MX_CACHE_MIN_TTL: int = int(os.getenv("MX_CACHE_MIN_TTL", "300"))  # clamp for DNS answer TTLs
+    MX_CACHE_MAX_TTL: int = int(os.getenv("MX_CACHE_MAX_TTL", "86400"))
+    MX_CACHE_REFRESH_AHEAD: float = float(os.getenv("MX_CACHE_REFRESH_AHEAD", "0.8"))  # refresh hot entries after 80% of TTL
+    MX_CACHE_NEGATIVE_TTL: int = int(os.getenv("MX_CACHE_NEGATIVE_TTL", "600"))  # NXDOMAIN / no MX / null MX, 10 minutes
+    MX_CACHE_TRANSIENT_TTL: int = int(os.getenv("MX_CACHE_TRANSIENT_TTL", "60"))  # DNS timeout / SERVFAIL
+    MX_CACHE_MAX_ENTRIES: int = int(os.getenv("MX_CACHE_MAX_ENTRIES", "100000"))  # LRU cap, 0 = unbounded
+    MX_CACHE_MAX_BYTES: int = int(os.getenv("MX_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # approx memory cap, 0 = unbounded
+    HOST_ADDRESS_CACHE_MAX_ENTRIES: int = int(os.getenv("HOST_ADDRESS_CACHE_MAX_ENTRIES", "50000"))  # MX host IP cache LRU cap, 0 = unbounded
+    MX_CACHE_SWEEP_INTERVAL: int = int(os.getenv("MX_CACHE_SWEEP_INTERVAL", "300"))  # seconds between expiry sweeps
+    MX_CACHE_DB_PATH: str = os.getenv("MX_CACHE_DB_PATH", "")  # SQLite file for the shared disk tier, empty = memory only
+    # DNS Prefetch (bulk: resolve every distinct domain before SMTP work)
+    DNS_PREFETCH_CONCURRENCY: int = int(os.getenv("DNS_PREFETCH_CONCURRENCY", "50"))  # parallel DNS queries
+    DNS_PREFETCH_ADDRESSES: bool = os.getenv("DNS_PREFETCH_ADDRESSES", "true").lower() == "true"  # also A/AAAA of MX hosts
+
+    CATCH_ALL_CACHE_POSITIVE_TTL: int = int(os.getenv("CATCH_ALL_CACHE_POSITIVE_TTL", "21600"))  # catch_all/honest verdicts, 6 hours
+    CATCH_ALL_CACHE_NEGATIVE_TTL: int = int(os.getenv("CATCH_ALL_CACHE_NEGATIVE_TTL", "300"))  # unreachable verdicts, 5 minutes
+    CATCH_ALL_CACHE_MAX_ENTRIES: int = int(os.getenv("CATCH_ALL_CACHE_MAX_ENTRIES", "100000"))  # LRU cap, 0 = unbounded
+    VERDICT_CACHE_VALID_TTL: int = int(os.getenv("VERDICT_CACHE_VALID_TTL", "604800"))  # 250/251 verdicts, 7 days
+    VERDICT_CACHE_INVALID_TTL: int = int(os.getenv("VERDICT_CACHE_INVALID_TTL", "604800"))  # 5xx verdicts, 7 days
+    VERDICT_CACHE_TEMPFAIL_TTL: int = int(os.getenv("VERDICT_CACHE_TEMPFAIL_TTL", "900"))  # 4xx verdicts, 15 minutes
+    VERDICT_CACHE_MAX_ENTRIES: int = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "200000"))  # LRU cap, 0 = unbounded
+
+    # Shared Cache (MX, catch-all and verdicts across uvicorn workers)
+    CACHE_BACKEND_ADDRESS: str = os.getenv("CACHE_BACKEND_ADDRESS", "")  # "unix:/path.sock" or "host:port", empty = per-worker memory only
+    CACHE_BACKEND_TOKEN: str = os.getenv("CACHE_BACKEND_TOKEN", "")  # shared secret of the cache server, required off loopback
+    CACHE_BACKEND_TIMEOUT: float = float(os.getenv("CACHE_BACKEND_TIMEOUT", "0.5"))  # seconds per cache server request
+    CACHE_SERVER_MAX_ENTRIES: int = int(os.getenv("CACHE_SERVER_MAX_ENTRIES", "500000"))  # cache server LRU cap, 0 = unbounded
+
+    # Pattern Priors (learned email formats)
+    PATTERN_PRIORS_MIN_SAMPLES: int = int(os.getenv("PATTERN_PRIORS_MIN_SAMPLES", "20"))  # Hits before provider/global order applies
+    PATTERN_PRIORS_MAX_DOMAINS: int = int(os.getenv("PATTERN_PRIORS_MAX_DOMAINS", "500000"))  # Domains remembered, 0 = unbounded
+
+    # Streaming Bulk Search
+    BULK_UPLOAD_BATCH_ROWS: int = int(os.getenv("BULK_UPLOAD_BATCH_ROWS", "1000"))  # Upload rows read (and searched) at a time
+    BULK_STREAM_PROGRESS_EVERY: int = int(os.getenv("BULK_STREAM_PROGRESS_EVERY", "25"))  # Progress event every N rows
+    BULK_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("BULK_STREAM_HEARTBEAT_SECONDS", "15"))  # Progress event when idle that long, 0 = off
+
+    # Search History Writer (batched inserts)
+    HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", "100"))  # Rows per transaction
+    HISTORY_FLUSH_INTERVAL_MS: int = int(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "500"))  # Max wait before a row is written
+    HISTORY_MAX_PENDING: int = int(os.getenv("HISTORY_MAX_PENDING", "10000"))  # Writer queue bound (backpressure above)
+    HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "500"))  # /api/history rows per page, max
+    HISTORY_PUT_TIMEOUT: float = float(os.getenv("HISTORY_PUT_TIMEOUT", "30"))  # Seconds a lookup waits for queue room before writing its row itself
+
+    # Background Bulk Jobs
+    JOB_WORKERS_PER_JOB: int = int(os.getenv("JOB_WORKERS_PER_JOB", "4"))  # domain groups processed concurrently per job
+    JOB_MAX_CONCURRENT_LOOKUPS: int = int(os.getenv("JOB_MAX_CONCURRENT_LOOKUPS", "20"))  # across all jobs
+
+    # Distributed Mode (coordinator hands bulk job shards to worker processes)
+    COORDINATOR_ADDRESS: str = os.getenv("COORDINATOR_ADDRESS", "")  # "host:port" or "unix:/path.sock", empty = jobs run in-process
+    COORDINATOR_TOKEN: str = os.getenv("COORDINATOR_TOKEN", "")  # shared secret workers must present, required off loopback
+    COORDINATOR_SHARD_MAX_ROWS: int = int(os.getenv("COORDINATOR_SHARD_MAX_ROWS", "200"))  # rows per shard (one provider)
+    COORDINATOR_WORKER_TIMEOUT: float = float(os.getenv("COORDINATOR_WORKER_TIMEOUT", "30"))  # silent seconds before a worker is lost
+    COORDINATOR_MAX_ATTEMPTS: int = int(os.getenv("COORDINATOR_MAX_ATTEMPTS", "3"))  # workers lost on one shard before its rows fail
+    WORKER_HEARTBEAT_INTERVAL: float = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "5"))  # seconds, while a shard is processed
+    WORKER_RECONNECT_INTERVAL: float = float(os.getenv("WORKER_RECONNECT_INTERVAL", "5"))  # seconds between connection attempts
+
+    # Blocking Work Executor (DNS cache misses, database access)
+    BLOCKING_EXECUTOR_WORKERS: int = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "16"))  # Worker threads
+    BLOCKING_EXECUTOR_QUEUE: int = int(os.getenv("BLOCKING_EXECUTOR_QUEUE", "256"))  # Calls waiting for a worker before 503
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./email_finder.db")
+    DB_JOURNAL_MODE: str = os.getenv("DB_JOURNAL_MODE", "WAL")  # SQLite: WAL lets reads run during writes
+    DB_SYNCHRONOUS: str = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # SQLite: NORMAL is durable enough with WAL
+    DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))  # SQLite: wait for locks instead of failing
 
     # Application
     APP_VERSION: str = "v6"
@@ -39,6 +147,37 @@ class Config:
         """Get SMTP timeout in seconds"""
         return cls.SMTP_TIMEOUT
 
+    @classmethod
+    def get_provider_suffixes(cls) -> Dict[str, str]:
+        """
+        MX hostname suffix -> provider mapping, defaults plus POLITENESS_PROVIDERS.
+
+        Returns:
+            Dict like {"outlook.com": "microsoft", ...}
+        """
+        providers = dict(cls.DEFAULT_PROVIDER_SUFFIXES)
+        for item in cls.POLITENESS_PROVIDERS.split(","):
+            suffix, _, provider = item.partition("=")
+            if suffix.strip() and provider.strip():
+                providers[suffix.strip().lower()] = provider.strip()
+        return providers
+
+    @classmethod
+    def get_source_addresses(cls) -> Dict[str, str]:
+        """
+        Outbound source IP -> EHLO hostname, from SMTP_SOURCE_ADDRESSES.
+        An IP without "=hostname" announces SMTP_HOSTNAME.
+
+        Returns:
+            Dict like {"203.0.113.10": "mx1.auraia.ch", ...} (empty: single default address)
+        """
+        sources = {}
+        for item in cls.SMTP_SOURCE_ADDRESSES.split(","):
+            address, _, hostname = item.partition("=")
+            if address.strip():
+                sources[address.strip()] = hostname.strip() or cls.SMTP_HOSTNAME
+        return sources
+
     @classmethod
     def get_retry_delay(cls, attempt: int) -> float:
         """
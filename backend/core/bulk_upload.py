@@ -0,0 +1,161 @@
+"""
+Bulk upload ingestion.
+Parses CSV incrementally and Excel with openpyxl's read-only reader, so an
+upload is never loaded whole into memory (no pandas DataFrame).
+"""
+import csv
+import io
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from config import config
+
+CSV_EXTENSIONS = (".csv",)
+EXCEL_EXTENSIONS = (".xlsx",)
+
+
+class UploadFormatError(ValueError):
+    """Unsupported file type or missing columns (reported to the client as a 400)."""
+
+
+class ColumnMap:
+    """
+    Locates the domain and name columns in a header row.
+
+    Accepted name columns, in order: fullname, name, first_name + last_name
+    (case-insensitive).
+    """
+
+    def __init__(self, header: Sequence):
+        columns = [self._cell(value).lower() for value in header]
+
+        if "domain" not in columns:
+            raise UploadFormatError("CSV must have 'domain' column")
+        self.domain = columns.index("domain")
+
+        self.full_name: Optional[int] = None
+        self.first_last: Optional[Tuple[int, int]] = None
+        if "fullname" in columns:
+            self.full_name = columns.index("fullname")
+        elif "name" in columns:
+            self.full_name = columns.index("name")
+        elif "first_name" in columns and "last_name" in columns:
+            self.first_last = (columns.index("first_name"), columns.index("last_name"))
+        else:
+            raise UploadFormatError("CSV must have 'name', 'fullname', or 'first_name' + 'last_name' columns")
+
+    @staticmethod
+    def _cell(value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).strip()
+
+    def _get(self, row: Sequence, index: int) -> str:
+        return self._cell(row[index]) if index < len(row) else ""
+
+    def row(self, row: Sequence) -> Optional[Tuple[str, str]]:
+        """(domain, full_name) for a data row, or None if either is empty."""
+        domain = self._get(row, self.domain)
+        if self.full_name is not None:
+            full_name = self._get(row, self.full_name)
+        else:
+            first, last = (self._get(row, index) for index in self.first_last)
+            full_name = f"{first} {last}" if first and last else ""
+
+        if not domain or not full_name or domain == "nan" or full_name == "nan":
+            return None
+        return domain, full_name
+
+
+def _map_rows(rows: Iterable[Sequence]) -> Iterator[Tuple[str, str]]:
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise UploadFormatError("CSV must have 'domain' column")
+
+    columns = ColumnMap(header)
+    for row in rows:
+        mapped = columns.row(row)
+        if mapped is not None:
+            yield mapped
+
+
+def iter_csv_rows(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (domain, full_name) rows from a CSV file.
+
+    Args:
+        stream: Binary file object (e.g. UploadFile.file)
+        chunk_size: Bytes read at a time
+
+    Raises:
+        UploadFormatError: Missing columns
+    """
+    # newline="" leaves line endings (and separators inside quoted fields) to the csv module
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    text._CHUNK_SIZE = chunk_size
+    try:
+        yield from _map_rows(csv.reader(text))
+    finally:
+        # Leave the upload's file object open for its owner
+        text.detach()
+
+
+def iter_excel_rows(stream: BinaryIO) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (domain, full_name) rows from the first sheet of an .xlsx file.
+
+    Raises:
+        UploadFormatError: Unreadable workbook or missing columns
+    """
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise UploadFormatError(f"Could not read Excel file: {e}")
+    try:
+        yield from _map_rows(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(filename: str, stream: BinaryIO) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (domain, full_name) rows from an uploaded CSV/Excel file.
+    Expected columns: domain, fullName (or name, or first_name + last_name)
+
+    Args:
+        filename: Uploaded filename (its extension selects the parser)
+        stream: Binary file object
+
+    Raises:
+        UploadFormatError: Unsupported file type or missing columns
+    """
+    name = (filename or "").lower()
+    if name.endswith(CSV_EXTENSIONS):
+        return iter_csv_rows(stream)
+    if name.endswith(EXCEL_EXTENSIONS):
+        return iter_excel_rows(stream)
+    if name.endswith(".xls"):
+        raise UploadFormatError("Legacy Excel (.xls) is not supported, save the file as .xlsx or CSV")
+    raise UploadFormatError("File must be CSV or Excel (.xlsx)")
+
+
+def read_upload_batch(rows: Iterator[Tuple[str, str]], size: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Read the next rows of an upload (blocking: call it from a worker thread).
+
+    Args:
+        rows: Iterator from iter_upload_rows()
+        size: Max rows (default: BULK_UPLOAD_BATCH_ROWS)
+
+    Returns:
+        Up to size rows, [] once the file is exhausted
+
+    Raises:
+        UploadFormatError: Missing columns (on the first batch)
+    """
+    return list(islice(rows, size or config.BULK_UPLOAD_BATCH_ROWS))
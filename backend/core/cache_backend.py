@@ -0,0 +1,504 @@
+"""
+Shared cache backends for the MX, catch-all and verdict caches.
+Each EmailFinder keeps its own in-memory LRU caches; a backend adds a tier
+shared by every uvicorn worker on the host, so a domain resolved or probed
+by one worker is a hit for the others.
+
+Run the shared server next to the workers:
+    python -m core.cache_backend unix:/tmp/email_finder_cache.sock
+
+With CACHE_BACKEND_TOKEN set, every connection starts with
+{"op": "auth", "token": ...}; the token is required to listen on a
+non-loopback TCP address.
+"""
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+from core.logger import StructuredLogger
+
+logger = StructuredLogger("cache_backend", json_format=False)
+
+# Namespaces used by the caches
+NS_MX = "mx"
+NS_CATCH_ALL = "catch_all"
+NS_VERDICTS = "verdicts"
+
+
+class CacheBackend(ABC):
+    """
+    Key-value store shared by the caches, keyed by (namespace, key).
+
+    Values are JSON-compatible (lists, strings, numbers). Entries carry the
+    time they were stored so each cache enforces its own TTLs as usual; the
+    backend's ttl only bounds how long it keeps them. Backends never raise
+    on I/O errors: an unavailable backend behaves like an empty one.
+    """
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Value stored under key, or None if absent or expired."""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value (kept at most ttl seconds, None = until evicted)."""
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        """Forget a key."""
+
+    @abstractmethod
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Forget every key of a namespace (None = all namespaces)."""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Backend statistics."""
+
+    def close(self) -> None:
+        """Release connections (the backend reconnects on next use)."""
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Bounded, thread-safe in-process backend (a dict in LRU order).
+
+    The default storage of CacheServer; on its own it is only shared
+    between the threads of one process.
+
+    Usage:
+        backend = MemoryBackend(max_entries=500000)
+        backend.set("mx", "example.com", [["mx.example.com"], time.time(), None, 3600], ttl=3600)
+    """
+
+    def __init__(self, max_entries: int = 500000):
+        """
+        Initialize backend.
+
+        Args:
+            max_entries: Max stored keys across namespaces (0 = unbounded)
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, str], Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                del self._data[(namespace, key)]
+                self._misses += 1
+                return None
+            self._data.move_to_end((namespace, key))
+            self._hits += 1
+            return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data.pop((namespace, key), None)
+            self._data[(namespace, key)] = (value, expires_at)
+            while self.max_entries and len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+                return
+            for stored in [stored for stored in self._data if stored[0] == namespace]:
+                del self._data[stored]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            namespaces: Dict[str, int] = {}
+            for namespace, _ in self._data:
+                namespaces[namespace] = namespaces.get(namespace, 0) + 1
+            return {
+                "type": "memory",
+                "entries": len(self._data),
+                "namespaces": namespaces,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "max_entries": self.max_entries
+            }
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    Parse a server address: "unix:/path/to.sock" or "host:port".
+
+    Returns:
+        (socket family, address for bind/connect)
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Cache backend address must be 'unix:/path' or 'host:port', got {address!r}")
+    return socket.AF_INET, (host, int(port))
+
+
+def is_loopback(host: str) -> bool:
+    """True if host only accepts local connections (host names other than localhost may not)."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def token_matches(expected: str, presented) -> bool:
+    """Constant-time shared secret check; a missing token never matches."""
+    if not isinstance(presented, str) or not presented:
+        return False
+    return hmac.compare_digest(expected.encode(), presented.encode())
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One client connection: a JSON request per line, a JSON reply per line."""
+
+    def setup(self):
+        super().setup()
+        self.server.connections.add(self.request)
+
+    def finish(self):
+        self.server.connections.discard(self.request)
+        super().finish()
+
+    def handle(self):
+        backend = self.server.backend
+        if self.server.token and not self._authenticate():
+            return
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request["op"]
+                if op == "get":
+                    reply = {"ok": True, "value": backend.get(request["ns"], request["key"])}
+                elif op == "set":
+                    backend.set(request["ns"], request["key"], request["value"], request.get("ttl"))
+                    reply = {"ok": True}
+                elif op == "delete":
+                    backend.delete(request["ns"], request["key"])
+                    reply = {"ok": True}
+                elif op == "clear":
+                    backend.clear(request.get("ns"))
+                    reply = {"ok": True}
+                elif op == "auth":
+                    reply = {"ok": True}  # Server without a token: nothing to check
+                elif op == "stats":
+                    reply = {"ok": True, "value": backend.stats()}
+                else:
+                    reply = {"ok": False, "error": f"unknown op {op!r}"}
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+    def _authenticate(self) -> bool:
+        """The connection's first request must carry the server's token."""
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            request = None
+        ok = isinstance(request, dict) and request.get("op") == "auth" \
+            and token_matches(self.server.token, request.get("token"))
+        self.wfile.write(json.dumps({"ok": ok} if ok else {"ok": False, "error": "unauthorized"}).encode() + b"\n")
+        if not ok:
+            logger.warning("Cache client rejected", peer=str(self.client_address))
+        return ok
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CacheServer:
+    """
+    Local socket server holding the shared cache (a MemoryBackend).
+
+    Usage:
+        server = CacheServer("unix:/tmp/email_finder_cache.sock")
+        server.start()           # background thread (tests), or serve_forever()
+        backend = SocketBackend(server.address)
+        server.stop()
+    """
+
+    def __init__(self, address: str, backend: Optional[CacheBackend] = None, token: Optional[str] = None):
+        """
+        Initialize server (the socket is bound immediately).
+
+        Args:
+            address: "unix:/path/to.sock" or "host:port" (port 0 picks a free one)
+            backend: Storage (default: MemoryBackend with CACHE_SERVER_MAX_ENTRIES)
+            token: Secret clients must present on connect (default: from config)
+
+        Raises:
+            ValueError: No token while binding a non-loopback TCP address
+        """
+        token = token if token is not None else config.CACHE_BACKEND_TOKEN
+        family, bind_address = parse_address(address)
+        if family != socket.AF_UNIX and not token and not is_loopback(bind_address[0]):
+            raise ValueError(
+                f"CACHE_BACKEND_TOKEN is required to listen on {address} (any host could poison the caches)"
+            )
+        if family == socket.AF_UNIX:
+            if os.path.exists(bind_address):
+                os.unlink(bind_address)  # Left behind by a previous run
+            self._server = _UnixServer(bind_address, _RequestHandler)
+            self.address = address
+        else:
+            self._server = _TCPServer(bind_address, _RequestHandler)
+            host, port = self._server.server_address[:2]
+            self.address = f"{host}:{port}"
+        self._server.backend = backend or MemoryBackend(config.CACHE_SERVER_MAX_ENTRIES)
+        self._server.token = token
+        self._server.connections = set()
+        self._thread: Optional[threading.Thread] = None
+        self._serving = False
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._server.backend
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        self._serving = True
+        self._server.serve_forever(poll_interval)
+
+    def start(self) -> None:
+        """Serve in a daemon thread."""
+        self._serving = True
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), name="cache-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving, drop client connections and remove the socket file."""
+        if not self._serving:
+            return
+        self._serving = False
+        self._server.shutdown()
+        self._server.server_close()
+        for conn in list(self._server.connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        family, bind_address = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(bind_address):
+            os.unlink(bind_address)
+
+
+class SocketBackend(CacheBackend):
+    """
+    Client of a CacheServer, shared by all workers on the host.
+
+    One connection per backend, used under a lock. When the server cannot
+    be reached, calls return immediately (as misses) for retry_interval
+    seconds before the next connection attempt, so a stopped server costs
+    the workers their shared hits, not their latency.
+
+    Usage:
+        backend = SocketBackend("unix:/tmp/email_finder_cache.sock")
+        finder.verdict_cache.backend = backend
+    """
+
+    def __init__(
+        self,
+        address: str,
+        timeout: Optional[float] = None,
+        retry_interval: float = 5.0,
+        token: Optional[str] = None
+    ):
+        """
+        Initialize client (no connection until first use).
+
+        Args:
+            address: Server address, "unix:/path/to.sock" or "host:port"
+            timeout: Socket timeout in seconds (default: from config)
+            retry_interval: Seconds to wait after a failure before reconnecting
+            token: Server secret (default: from config)
+        """
+        self.address = address
+        self.token = token if token is not None else config.CACHE_BACKEND_TOKEN
+        self.family, self._connect_address = parse_address(address)
+        self.timeout = timeout if timeout is not None else config.CACHE_BACKEND_TIMEOUT
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._retry_at = 0.0
+        self._requests = 0
+        self._errors = 0
+        self._skipped = 0
+
+    def _connect(self) -> None:
+        """Open the connection (caller holds the lock)."""
+        if self._sock is None:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self._connect_address)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+            self._reader = sock.makefile("rb")
+            if self.token:
+                sock.sendall(json.dumps({"op": "auth", "token": self.token}).encode() + b"\n")
+                line = self._reader.readline()
+                if not line or not json.loads(line).get("ok"):
+                    raise ConnectionError("cache server rejected the token")
+
+    def _disconnect(self) -> None:
+        """Drop the connection (caller holds the lock)."""
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+    def _call(self, request: Dict) -> Optional[Dict]:
+        """Send one request; the reply, or None if the server is unavailable."""
+        with self._lock:
+            if time.monotonic() < self._retry_at:
+                self._skipped += 1
+                return None
+            try:
+                self._connect()
+                self._sock.sendall(json.dumps(request).encode() + b"\n")
+                line = self._reader.readline()
+                if not line:
+                    raise ConnectionError("cache server closed the connection")
+                reply = json.loads(line)
+            except (OSError, ValueError):
+                self._disconnect()
+                self._errors += 1
+                self._retry_at = time.monotonic() + self.retry_interval
+                return None
+            self._requests += 1
+        return reply if reply.get("ok") else None
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        reply = self._call({"op": "get", "ns": namespace, "key": key})
+        return reply.get("value") if reply else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._call({"op": "set", "ns": namespace, "key": key, "value": value, "ttl": ttl})
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._call({"op": "delete", "ns": namespace, "key": key})
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        self._call({"op": "clear", "ns": namespace})
+
+    def stats(self) -> Dict:
+        reply = self._call({"op": "stats"})
+        return {
+            "type": "socket",
+            "address": self.address,
+            "connected": self._sock is not None,
+            "requests": self._requests,
+            "errors": self._errors,
+            "skipped": self._skipped,
+            "server": reply.get("value") if reply else None
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+class SharedMXStore:
+    """
+    MXCache store on a CacheBackend (same interface as MXCacheStore).
+
+    The backend expires entries by their TTL, so compact() has nothing to do.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def get(self, domain: str) -> Optional[Tuple[List[str], float, Optional[str], Optional[float]]]:
+        value = self.backend.get(NS_MX, domain)
+        return tuple(value) if value else None
+
+    def set(
+        self,
+        domain: str,
+        records: List[str],
+        stored_at: Optional[float] = None,
+        failure: Optional[str] = None,
+        ttl: Optional[float] = None
+    ) -> None:
+        stored_at = stored_at if stored_at is not None else time.time()
+        self.backend.set(NS_MX, domain, [records, stored_at, failure, ttl], ttl)
+
+    def compact(self, ttl: float, negative_ttl: Optional[float] = None, vacuum: bool = False) -> int:
+        return 0
+
+    def clear(self) -> None:
+        self.backend.clear(NS_MX)
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def stats(self) -> Dict:
+        return self.backend.stats()
+
+
+def create_backend() -> Optional[CacheBackend]:
+    """
+    Shared backend from config (None: each worker keeps its own caches).
+    The backend replaces the MX disk tier, so MX_CACHE_DB_PATH is ignored
+    (with a warning) when CACHE_BACKEND_ADDRESS is set.
+    """
+    if config.CACHE_BACKEND_ADDRESS:
+        if config.MX_CACHE_DB_PATH:
+            logger.warning(
+                "MX_CACHE_DB_PATH ignored: MX records are stored in the shared cache backend",
+                cache_backend=config.CACHE_BACKEND_ADDRESS,
+                mx_cache_db_path=config.MX_CACHE_DB_PATH
+            )
+        return SocketBackend(config.CACHE_BACKEND_ADDRESS)
+    return None
+
+
+if __name__ == "__main__":
+    server = CacheServer(sys.argv[1] if len(sys.argv) > 1 else config.CACHE_BACKEND_ADDRESS)
+    print(f"Cache server listening on {server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
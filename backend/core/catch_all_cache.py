@@ -0,0 +1,207 @@
+"""
+Per-domain catch-all verdict cache.
+Lets repeat lookups on a domain skip the random-address probe.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from core.cache_backend import CacheBackend, NS_CATCH_ALL
+
+# Verdicts
+CATCH_ALL = "catch_all"      # Server accepts any address
+HONEST = "honest"            # Server rejected the random probe
+UNREACHABLE = "unreachable"  # No MX server answered
+
+VERDICTS = (CATCH_ALL, HONEST, UNREACHABLE)
+
+# (verdict, mx_host, timestamp)
+CatchAllEntry = Tuple[str, Optional[str], float]
+
+
+class CatchAllCache:
+    """
+    Bounded, thread-safe LRU cache of catch-all verdicts with TTL.
+
+    Definitive verdicts (catch_all / honest) use the positive TTL;
+    unreachable verdicts use the (shorter) negative TTL so a domain whose
+    servers were down is probed again soon. With a backend, verdicts are
+    shared with the other workers (read through on miss, written through).
+
+    Usage:
+        cache = CatchAllCache(positive_ttl=21600, negative_ttl=300)
+        cached = cache.get("example.com")      # (verdict, mx_host) or None
+        if cached is None:
+            ...probe...
+            cache.set("example.com", "honest", "mx.example.com")
+    """
+
+    def __init__(
+        self,
+        positive_ttl: int = 21600,
+        negative_ttl: int = 300,
+        max_entries: int = 100000,
+        backend: Optional[CacheBackend] = None
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            positive_ttl: TTL in seconds for catch_all / honest verdicts
+            negative_ttl: TTL in seconds for unreachable verdicts
+            max_entries: Max cached domains (0 = unbounded)
+            backend: Optional tier shared across worker processes
+        """
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, CatchAllEntry]" = OrderedDict()  # LRU order, most recent last
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._shared_hits = 0
+
+    def _ttl_for(self, verdict: str) -> int:
+        return self.negative_ttl if verdict == UNREACHABLE else self.positive_ttl
+
+    def get(self, domain: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Get a domain's verdict if available and not expired.
+
+        Args:
+            domain: Domain name
+
+        Returns:
+            (verdict, mx_host that answered) or None if not in cache or expired
+        """
+        domain = domain.lower().strip()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(domain)
+            if entry is not None and now - entry[2] > self._ttl_for(entry[0]):
+                # Expired - remove from cache
+                del self._cache[domain]
+                entry = None
+            if entry is not None:
+                self._cache.move_to_end(domain)
+                self._hits += 1
+
+        if entry is None:
+            # Memory miss - another worker may have probed it
+            entry = self._shared_get(domain, now)
+            with self._lock:
+                if entry is None:
+                    self._misses += 1
+                    return None
+                self._insert(domain, entry)
+                self._hits += 1
+                self._shared_hits += 1
+
+        verdict, mx_host, _ = entry
+        return verdict, mx_host
+
+    def _shared_get(self, domain: str, now: float) -> Optional[CatchAllEntry]:
+        """Unexpired entry from the shared tier, if any."""
+        if self.backend is None:
+            return None
+        value = self.backend.get(NS_CATCH_ALL, domain)
+        if not value or value[0] not in VERDICTS:
+            return None
+        if now - value[2] > self._ttl_for(value[0]):
+            return None
+        return tuple(value)
+
+    def _insert(self, domain: str, entry: CatchAllEntry) -> None:
+        """Add or replace an entry as most recently used, then evict (caller holds the lock)."""
+        self._cache.pop(domain, None)
+        self._cache[domain] = entry
+        while self.max_entries and len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self._evictions += 1
+
+    def set(self, domain: str, verdict: str, mx_host: Optional[str] = None) -> None:
+        """
+        Store a domain's verdict.
+
+        Args:
+            domain: Domain name
+            verdict: "catch_all", "honest" or "unreachable"
+            mx_host: MX server that answered the probe (None if unreachable)
+        """
+        if verdict not in VERDICTS:
+            raise ValueError(f"Unknown catch-all verdict: {verdict}")
+        domain = domain.lower().strip()
+        entry = (verdict, mx_host, time.time())
+        with self._lock:
+            self._insert(domain, entry)
+        if self.backend is not None:
+            self.backend.set(NS_CATCH_ALL, domain, list(entry), self._ttl_for(verdict))
+
+    def invalidate(self, domain: str) -> None:
+        """Forget a domain's verdict (e.g. when its cached MX stops answering)."""
+        domain = domain.lower().strip()
+        with self._lock:
+            self._cache.pop(domain, None)
+        if self.backend is not None:
+            self.backend.delete(NS_CATCH_ALL, domain)
+
+    def clear(self) -> None:
+        """Clear all cached verdicts (both tiers)."""
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._shared_hits = 0
+        if self.backend is not None:
+            self.backend.clear(NS_CATCH_ALL)
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with hits, misses, hit_rate, size, and per-verdict counts
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            verdicts = {verdict: 0 for verdict in VERDICTS}
+            for verdict, _, _ in self._cache.values():
+                verdicts[verdict] += 1
+
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": f"{hit_rate:.1f}%",
+                "cached_domains": len(self._cache),
+                "verdicts": verdicts,
+                "evictions": self._evictions,
+                "shared_hits": self._shared_hits,
+                "max_entries": self.max_entries,
+                "positive_ttl_seconds": self.positive_ttl,
+                "negative_ttl_seconds": self.negative_ttl
+            }
+
+    def cleanup_expired(self) -> int:
+        """
+        Remove expired entries from cache.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [
+                domain
+                for domain, (verdict, _, timestamp) in self._cache.items()
+                if now - timestamp > self._ttl_for(verdict)
+            ]
+
+            for domain in expired:
+                del self._cache[domain]
+
+        return len(expired)
@@ -0,0 +1,518 @@
+"""
+Coordinator / worker mode for bulk jobs.
+The API server (coordinator) groups a job's rows by mail provider and hands
+the shards to worker processes, possibly on other hosts with their own IPs,
+which run the lookups with their own EmailFinder and stream each result
+back. The coordinator stores the results as usual (job items, search
+history); a worker that disconnects or goes silent has its unfinished rows
+re-queued for the other workers.
+
+Protocol: one JSON message per line, over TCP or a Unix socket.
+    worker      -> {"op": "register", "name": ..., "token": ...}
+    coordinator -> {"op": "shard", "shard": id, "fresh": bool,
+                    "groups": [[domain, [[item_id, full_name], ...]], ...]}
+    worker      -> {"op": "result", "item": item_id, "result": {...}}
+                   (or "error": "..." instead of "result")
+    worker      -> {"op": "result", "items": [item_id, ...], "error": "..."}
+                   (the lookup of a whole domain group failed)
+    worker      -> {"op": "heartbeat"}      (while processing a shard)
+    worker      -> {"op": "done", "shard": id}
+
+Run a worker:
+    python -m core.distributed coordinator.example.com:7701
+"""
+import asyncio
+import itertools
+import json
+import socket
+import sys
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import config
+from core.cache_backend import is_loopback, parse_address, token_matches
+from core.logger import StructuredLogger
+from models import EmailFinderResponse
+
+logger = StructuredLogger("distributed", json_format=False)
+
+Item = Tuple[int, str, str]  # (job item id, domain, full name)
+Group = Tuple[str, List[Item]]  # (normalized domain, items)
+
+
+class RemoteLookupError(Exception):
+    """A lookup failed on a worker (or the shard was lost too many times)."""
+
+
+def shard_by_provider(
+    groups: List[Group],
+    provider_of: Callable[[str], str],
+    max_rows: Optional[int] = None
+) -> List[Tuple[str, List[Group]]]:
+    """
+    Split domain groups into shards of one mail provider each.
+
+    A domain group stays in one shard (one MX lookup, catch-all probe and
+    session per domain) unless it alone has more than max_rows rows: it is
+    then cut into max_rows parts, so no shard message outgrows the stream
+    limit. A provider with more than max_rows rows gets several shards so
+    several workers (IPs) share its load.
+
+    Args:
+        groups: (domain, items) in job order
+        provider_of: Domain -> provider name
+        max_rows: Rows per shard (default: from config)
+
+    Returns:
+        (provider, groups) shards, providers in order of first appearance
+    """
+    max_rows = max_rows or config.COORDINATOR_SHARD_MAX_ROWS
+    by_provider: Dict[str, List[Group]] = {}
+    for domain, items in groups:
+        provider_groups = by_provider.setdefault(provider_of(domain), [])
+        for start in range(0, len(items), max_rows):
+            provider_groups.append((domain, items[start:start + max_rows]))
+
+    shards = []
+    for provider, provider_groups in by_provider.items():
+        current: List[Group] = []
+        rows = 0
+        for domain, items in provider_groups:
+            if current and rows + len(items) > max_rows:
+                shards.append((provider, current))
+                current, rows = [], 0
+            current.append((domain, items))
+            rows += len(items)
+        shards.append((provider, current))
+    return shards
+
+
+class _Run:
+    """Shards of one job being processed."""
+
+    def __init__(
+        self,
+        on_result: Callable[[Item, object], Awaitable[bool]],
+        shards: int,
+        on_group_error: Optional[Callable[[List[Item], Exception], Awaitable[bool]]] = None
+    ):
+        self.on_result = on_result
+        self.on_group_error = on_group_error
+        self.outstanding = shards
+        self.stopped = False
+        self.done = asyncio.Event()
+        if not shards:
+            self.done.set()
+
+    def stop(self) -> None:
+        self.stopped = True
+        self.done.set()
+
+    async def report_group(self, items: List[Item], error: Exception) -> bool:
+        """One failure for several rows: once to on_group_error, else row by row."""
+        if self.on_group_error is not None:
+            return await self.on_group_error(items, error)
+        for item in items:
+            if self.stopped or not await self.on_result(item, error):
+                return False
+        return True
+
+
+class Shard:
+    """Domain groups of one provider; rows not reported yet stay in pending."""
+
+    def __init__(self, shard_id: int, provider: str, groups: List[Group], fresh: bool, run: _Run):
+        self.id = shard_id
+        self.provider = provider
+        self.groups = groups
+        self.fresh = fresh
+        self.run = run
+        self.pending: Dict[int, Item] = {item[0]: item for _, items in groups for item in items}
+        self.attempts = 0
+
+    def message(self) -> Dict:
+        """Shard message for a worker, with the rows still pending only."""
+        groups = [
+            [domain, [[item_id, full_name] for item_id, _, full_name in items if item_id in self.pending]]
+            for domain, items in self.groups
+        ]
+        return {
+            "op": "shard",
+            "shard": self.id,
+            "fresh": self.fresh,
+            "groups": [group for group in groups if group[1]]
+        }
+
+
+def _stream_limit() -> int:
+    """Max message size: a full shard at 1 KiB per row, at least asyncio's 64 KiB default."""
+    return max(2 ** 16, config.COORDINATOR_SHARD_MAX_ROWS * 1024)
+
+
+async def _send(writer: asyncio.StreamWriter, message: Dict) -> None:
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+async def _receive(reader: asyncio.StreamReader, timeout: Optional[float] = None) -> Dict:
+    line = await asyncio.wait_for(reader.readline(), timeout)
+    if not line:
+        raise ConnectionError("Connection closed")
+    return json.loads(line)
+
+
+class Coordinator:
+    """
+    Hands bulk job shards to registered workers and collects their results.
+
+    Each worker holds one shard at a time. A worker that closes its
+    connection or stays silent for worker_timeout seconds while holding a
+    shard is dropped and the shard's unreported rows go back to the queue;
+    after max_attempts lost workers the rows are reported as errors. Jobs
+    wait in the queue while no worker is connected.
+
+    Usage:
+        coordinator = Coordinator("0.0.0.0:7701")
+        await coordinator.start()
+        await coordinator.run(shards, fresh=False, on_result=handle)   # handle(item, result) -> keep going?
+        await coordinator.stop()
+    """
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        token: Optional[str] = None,
+        worker_timeout: Optional[float] = None,
+        max_attempts: Optional[int] = None
+    ):
+        """
+        Initialize coordinator.
+
+        Args:
+            address: "host:port" or "unix:/path" to listen on (default: from config)
+            token: Secret workers must present on register (default: from config)
+            worker_timeout: Silent seconds before a busy worker is lost (default: from config)
+            max_attempts: Lost workers per shard before its rows fail (default: from config)
+        """
+        self.address = address or config.COORDINATOR_ADDRESS
+        self.token = token if token is not None else config.COORDINATOR_TOKEN
+        self.worker_timeout = worker_timeout or config.COORDINATOR_WORKER_TIMEOUT
+        self.max_attempts = max_attempts or config.COORDINATOR_MAX_ATTEMPTS
+
+        self.workers: Dict[str, Dict] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers = set()
+        self._ids = itertools.count(1)
+
+        self._dispatched = 0
+        self._requeued = 0
+        self._workers_lost = 0
+        self._results = 0
+
+    async def start(self) -> None:
+        """
+        Listen for workers on the event loop.
+
+        Raises:
+            ValueError: No token while listening on a non-loopback address
+        """
+        family, address = parse_address(self.address)
+        if family != socket.AF_UNIX and not self.token and not is_loopback(address[0]):
+            raise ValueError(
+                f"COORDINATOR_TOKEN is required to listen on {self.address} (any host could register as a worker)"
+            )
+        self._queue = asyncio.Queue()
+        if family == socket.AF_UNIX:
+            self._server = await asyncio.start_unix_server(self._handle, path=address, limit=_stream_limit())
+        else:
+            self._server = await asyncio.start_server(self._handle, *address, limit=_stream_limit())
+            # Report the actual port when listening on port 0
+            self.address = f"{address[0]}:{self._server.sockets[0].getsockname()[1]}"
+        logger.info("Coordinator listening", address=self.address)
+
+    async def stop(self) -> None:
+        """Stop listening and drop worker connections."""
+        if self._server is None:
+            return
+        self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def run(
+        self,
+        shards: List[Tuple[str, List[Group]]],
+        fresh: bool,
+        on_result: Callable[[Item, object], Awaitable[bool]],
+        on_group_error: Optional[Callable[[List[Item], Exception], Awaitable[bool]]] = None
+    ) -> None:
+        """
+        Process shards on the workers; returns once every row is reported
+        or on_result asked to stop.
+
+        Args:
+            shards: (provider, groups) from shard_by_provider()
+            fresh: Workers ignore cached verdicts
+            on_result: Called with each item and its EmailFinderResponse (or
+                exception); returns False to stop the run
+            on_group_error: Called once with the items of a group whose lookup
+                failed as a whole (default: on_result for each item); returns
+                False to stop the run
+        """
+        run = _Run(on_result, len(shards), on_group_error)
+        for provider, groups in shards:
+            self._queue.put_nowait(Shard(next(self._ids), provider, groups, fresh, run))
+        try:
+            await run.done.wait()
+        finally:
+            # Cancelled (shutdown) or stopped: queued shards of this run are dropped
+            run.stopped = True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._handlers.add(asyncio.current_task())
+        name = None
+        shard = None
+        try:
+            hello = await _receive(reader, self.worker_timeout)
+            if hello.get("op") != "register":
+                logger.warning("Worker rejected", peer=str(writer.get_extra_info("peername")))
+                return
+            if self.token and not token_matches(self.token, hello.get("token")):
+                # Missing or wrong token, compared in constant time
+                logger.warning("Worker rejected: bad token", peer=str(writer.get_extra_info("peername")))
+                return
+            name = f"{hello.get('name') or 'worker'}#{next(self._ids)}"
+            worker = self.workers[name] = {"busy": False, "shards": 0, "results": 0}
+            logger.info("Worker registered", worker=name)
+
+            while True:
+                shard = await self._next_shard()
+                if reader.at_eof():
+                    # Worker left while idle: nothing was lost
+                    self._queue.put_nowait(shard)
+                    shard = None
+                    return
+                worker["busy"] = True
+                self._dispatched += 1
+                await _send(writer, shard.message())
+                await self._collect(reader, shard, worker)
+                worker["busy"] = False
+                worker["shards"] += 1
+                if shard.pending:
+                    self._requeue(shard, name)  # Worker skipped rows (should not happen)
+                else:
+                    self._finish(shard)
+                shard = None
+        except Exception as e:
+            if shard is not None:
+                self._workers_lost += 1
+            logger.warning("Worker disconnected", worker=name, error=str(e) or type(e).__name__)
+        finally:
+            if shard is not None:
+                self._requeue(shard, name)
+            if name is not None:
+                self.workers.pop(name, None)
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
+
+    async def _next_shard(self) -> Shard:
+        while True:
+            shard = await self._queue.get()
+            if not shard.run.stopped:
+                return shard
+            self._finish(shard)
+
+    async def _collect(self, reader: asyncio.StreamReader, shard: Shard, worker: Dict) -> None:
+        """Read a worker's messages until it reports the shard done."""
+        while True:
+            message = await _receive(reader, self.worker_timeout)
+            op = message.get("op")
+            if op == "done":
+                return
+            if op != "result":
+                continue  # heartbeat
+            if "items" in message:
+                items = [shard.pending.pop(item_id, None) for item_id in message["items"]]
+                items = [item for item in items if item is not None]
+                if not items or shard.run.stopped:
+                    continue
+                worker["results"] += len(items)
+                self._results += len(items)
+                error = RemoteLookupError(message.get("error") or "Lookup failed on worker")
+                if not await shard.run.report_group(items, error):
+                    shard.run.stop()
+                continue
+            item = shard.pending.pop(message.get("item"), None)
+            if item is None or shard.run.stopped:
+                continue
+            worker["results"] += 1
+            self._results += 1
+            if "result" in message:
+                result = EmailFinderResponse(**message["result"])
+            else:
+                result = RemoteLookupError(message.get("error") or "Lookup failed on worker")
+            if not await shard.run.on_result(item, result):
+                shard.run.stop()
+
+    def _finish(self, shard: Shard) -> None:
+        run = shard.run
+        run.outstanding -= 1
+        if run.outstanding <= 0:
+            run.done.set()
+
+    def _requeue(self, shard: Shard, worker: Optional[str]) -> None:
+        if shard.run.stopped:
+            self._finish(shard)
+            return
+        shard.attempts += 1
+        if shard.attempts < self.max_attempts:
+            self._requeued += 1
+            logger.info("Shard re-queued", shard=shard.id, worker=worker, rows=len(shard.pending))
+            self._queue.put_nowait(shard)
+            return
+        asyncio.get_running_loop().create_task(self._fail(shard))
+
+    async def _fail(self, shard: Shard) -> None:
+        """Report the rows of a shard that kept losing its workers as errors."""
+        error = RemoteLookupError(f"Shard lost by {shard.attempts} workers")
+        items = list(shard.pending.values())
+        shard.pending.clear()
+        if items and not shard.run.stopped and not await shard.run.report_group(items, error):
+            shard.run.stop()
+        self._finish(shard)
+
+    def stats(self) -> Dict:
+        """
+        Get coordinator statistics.
+
+        Returns:
+            Dict with connected workers, queued shards and dispatch counters
+        """
+        return {
+            "address": self.address,
+            "workers": {name: dict(worker) for name, worker in self.workers.items()},
+            "queued_shards": self._queue.qsize() if self._queue is not None else 0,
+            "dispatched_shards": self._dispatched,
+            "requeued_shards": self._requeued,
+            "workers_lost": self._workers_lost,
+            "results": self._results
+        }
+
+
+class Worker:
+    """
+    Worker process side: registers with the coordinator, looks up the rows
+    of each shard it receives and streams the results back.
+
+    Domain groups of a shard run concurrently (up to concurrency at a time).
+    The connection is re-opened after reconnect_interval seconds if it
+    drops; a shard in progress is then re-queued by the coordinator.
+
+    Usage:
+        worker = Worker("127.0.0.1:7701", EmailFinder())
+        await worker.run()
+    """
+
+    def __init__(
+        self,
+        address: str,
+        finder,
+        name: Optional[str] = None,
+        token: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        heartbeat_interval: Optional[float] = None,
+        reconnect_interval: Optional[float] = None
+    ):
+        """
+        Initialize worker.
+
+        Args:
+            address: Coordinator "host:port" or "unix:/path"
+            finder: EmailFinder used for the lookups
+            name: Name shown in the coordinator stats (default: hostname)
+            token: Coordinator secret (default: from config)
+            concurrency: Domain groups in flight (default: JOB_WORKERS_PER_JOB)
+            heartbeat_interval: Seconds between heartbeats (default: from config)
+            reconnect_interval: Seconds between connection attempts (default: from config)
+        """
+        self.address = address
+        self.finder = finder
+        self.name = name or socket.gethostname()
+        self.token = token if token is not None else config.COORDINATOR_TOKEN
+        self.concurrency = concurrency or config.JOB_WORKERS_PER_JOB
+        self.heartbeat_interval = heartbeat_interval or config.WORKER_HEARTBEAT_INTERVAL
+        self.reconnect_interval = reconnect_interval or config.WORKER_RECONNECT_INTERVAL
+        self.shards = 0
+
+    async def run(self) -> None:
+        """Serve shards until cancelled, reconnecting when the connection drops."""
+        while True:
+            try:
+                await self.serve()
+            except (ConnectionError, OSError, ValueError) as e:
+                logger.warning("Coordinator connection lost", address=self.address, error=str(e))
+            await asyncio.sleep(self.reconnect_interval)
+
+    async def serve(self) -> None:
+        """Serve shards over one connection (returns / raises when it drops)."""
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            reader, writer = await asyncio.open_unix_connection(address, limit=_stream_limit())
+        else:
+            reader, writer = await asyncio.open_connection(*address, limit=_stream_limit())
+        lock = asyncio.Lock()
+
+        async def send(message: Dict) -> None:
+            async with lock:
+                await _send(writer, message)
+
+        try:
+            await send({"op": "register", "name": self.name, "token": self.token})
+            logger.info("Registered with coordinator", address=self.address)
+            while True:
+                message = await _receive(reader)
+                if message.get("op") == "shard":
+                    await self._process(message, send)
+        finally:
+            writer.close()
+
+    async def _process(self, shard: Dict, send: Callable[[Dict], Awaitable[None]]) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def lookup(domain: str, items: List) -> None:
+            async with semaphore:
+                try:
+                    results = await self.finder.find_emails_for_domain_async(
+                        domain, [full_name for _, full_name in items], shard["fresh"]
+                    )
+                except Exception as e:
+                    await send({"op": "result", "items": [item_id for item_id, _ in items], "error": str(e)})
+                    return
+            for (item_id, _), result in zip(items, results):
+                await send({"op": "result", "item": item_id, "result": result.model_dump()})
+
+        async def heartbeat() -> None:
+            while True:
+                await asyncio.sleep(self.heartbeat_interval)
+                await send({"op": "heartbeat"})
+
+        beating = asyncio.ensure_future(heartbeat())
+        try:
+            await asyncio.gather(*(lookup(domain, items) for domain, items in shard["groups"]))
+        finally:
+            beating.cancel()
+        await send({"op": "done", "shard": shard["shard"]})
+        self.shards += 1
+
+
+if __name__ == "__main__":
+    from core.email_finder import EmailFinder
+
+    worker = Worker(sys.argv[1] if len(sys.argv) > 1 else config.COORDINATOR_ADDRESS, EmailFinder())
+    print(f"Worker connecting to {worker.address}")
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
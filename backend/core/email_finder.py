@@ -1,33 +1,98 @@
-import smtplib
+import asyncio
+import dns.asyncresolver
+import dns.exception
+import dns.name
 import dns.resolver
 import re
-import time
-import os
 import random
 import string
 import socket
-from typing import List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from unidecode import unidecode
 from models import EmailFinderResponse
-from core.mx_cache import MXCache
+from core.mx_cache import MXCache, HostAddressCache, NXDOMAIN, NO_ANSWER, NULL_MX, TIMEOUT, SERVFAIL
+from core.mx_cache_store import MXCacheStore
+from core.cache_backend import CacheBackend, SharedMXStore, create_backend
+from core.verdict_cache import VerdictCache
+from core.pattern_priors import PatternPriors, TEMPLATES, template_of
+from core.executor import BoundedExecutor
+from core.catch_all_cache import CatchAllCache, CATCH_ALL, HONEST, UNREACHABLE
+from core.smtp_session import AsyncSMTPSession
+from core.smtp_pool import SMTPPool
+from core.politeness import PolitenessScheduler
+from core.source_pool import SourcePool
+from core.loop_runner import get_background_loop, run_sync
 from core.logger import StructuredLogger
 from config import config
 
 load_dotenv()
 logger = StructuredLogger("email_finder", json_format=False)
 
+MX_FAILURE_MESSAGES = {
+    NXDOMAIN: "domain does not exist (NXDOMAIN)",
+    NO_ANSWER: "domain has no MX record",
+    NULL_MX: "domain does not accept email (null MX, RFC 7505)",
+    TIMEOUT: "DNS query timed out",
+    SERVFAIL: "DNS servers failed to answer (SERVFAIL)"
+}
+
 class EmailFinder:
-    def __init__(self, mx_cache_ttl: int = None):
+    def __init__(self, mx_cache_ttl: int = None, cache_backend: Optional[CacheBackend] = None):
         """
         Initialize EmailFinder with optional MX cache.
 
         Args:
             mx_cache_ttl: MX cache TTL in seconds (default: from config)
+            cache_backend: Tier shared by the MX, catch-all and verdict caches
+                (default: CACHE_BACKEND_ADDRESS server, if set)
         """
         self.smtp_hostname = config.SMTP_HOSTNAME
         self.smtp_from_email = config.SMTP_FROM_EMAIL
-        self.mx_cache = MXCache(ttl=mx_cache_ttl or config.MX_CACHE_TTL)
+        self.cache_backend = cache_backend or create_backend()
+        if self.cache_backend is not None:
+            mx_store = SharedMXStore(self.cache_backend)
+        elif config.MX_CACHE_DB_PATH:
+            mx_store = MXCacheStore(config.MX_CACHE_DB_PATH)
+        else:
+            mx_store = None
+        self.mx_cache = MXCache(
+            ttl=mx_cache_ttl or config.MX_CACHE_TTL,
+            store=mx_store,
+            negative_ttl=config.MX_CACHE_NEGATIVE_TTL,
+            transient_ttl=config.MX_CACHE_TRANSIENT_TTL,
+            max_entries=config.MX_CACHE_MAX_ENTRIES,
+            max_bytes=config.MX_CACHE_MAX_BYTES,
+            min_ttl=config.MX_CACHE_MIN_TTL,
+            max_ttl=config.MX_CACHE_MAX_TTL,
+            refresh_ahead=config.MX_CACHE_REFRESH_AHEAD,
+            refresher=self._schedule_mx_refresh
+        )
+        self.verdict_cache = VerdictCache(
+            valid_ttl=config.VERDICT_CACHE_VALID_TTL,
+            invalid_ttl=config.VERDICT_CACHE_INVALID_TTL,
+            tempfail_ttl=config.VERDICT_CACHE_TEMPFAIL_TTL,
+            max_entries=config.VERDICT_CACHE_MAX_ENTRIES,
+            backend=self.cache_backend
+        )
+        self.pattern_priors = PatternPriors()
+        self.catch_all_cache = CatchAllCache(
+            positive_ttl=config.CATCH_ALL_CACHE_POSITIVE_TTL,
+            negative_ttl=config.CATCH_ALL_CACHE_NEGATIVE_TTL,
+            max_entries=config.CATCH_ALL_CACHE_MAX_ENTRIES,
+            backend=self.cache_backend
+        )
+        self.host_addresses = HostAddressCache(
+            ttl=mx_cache_ttl or config.MX_CACHE_TTL,
+            max_entries=config.HOST_ADDRESS_CACHE_MAX_ENTRIES
+        )
+        self.sources = SourcePool()
+        self.smtp_pool = SMTPPool(
+            self.smtp_hostname, self.smtp_from_email, address_lookup=self.host_addresses.get,
+            helo_hostnames=self.sources.hostnames
+        )
+        self.scheduler = PolitenessScheduler()
+        self.executor = BoundedExecutor()
 
     def normalize_domain(self, domain: str) -> str:
         domain = domain.lower().strip()
@@ -68,29 +133,29 @@ class EmailFinder:
         
         return first_variants, last_variants
 
-    def generate_patterns(self, first_variants: List[str], last_variants: List[str], domain: str) -> List[str]:
+    def generate_patterns(
+        self,
+        first_variants: List[str],
+        last_variants: List[str],
+        domain: str,
+        provider: Optional[str] = None
+    ) -> List[str]:
         """
         Generate email patterns with enhanced coverage.
         Handles name variants (hyphenated, accented) and missing permutations.
+        Templates are ordered by pattern_priors: the domain's confirmed
+        format first, then the provider's (or global) most frequent ones.
         """
         patterns = []
+        templates = self.pattern_priors.order(domain, provider)
         
         # Generate patterns for all variant combinations
         for first in first_variants:
             for last in last_variants:
                 if first and last:
-                    # Original patterns (priority order)
-                    patterns.append(f"{first}.{last}@{domain}")        # john.doe@
-                    patterns.append(f"{first}{last}@{domain}")          # johndoe@
-                    patterns.append(f"{first[0]}.{last}@{domain}")     # j.doe@
-                    patterns.append(f"{first}.{last[0]}@{domain}")     # john.d@
-                    patterns.append(f"{first}@{domain}")                # john@
-                    patterns.append(f"{last}@{domain}")                 # doe@
-                    
-                    # NEW: Missing permutations (Edge Case #2)
-                    patterns.append(f"{first[0]}{last}@{domain}")      # jdoe@
-                    patterns.append(f"{last}{first[0]}@{domain}")      # doej@
-                    patterns.append(f"{first}{last[0]}@{domain}")      # johnd@
+                    # See pattern_priors.TEMPLATES (john.doe@, johndoe@, j.doe@, ... jdoe@, doej@, johnd@)
+                    for template in templates:
+                        patterns.append(f"{TEMPLATES[template](first, last)}@{domain}")
                     
                 elif first:
                     patterns.append(f"{first}@{domain}")
@@ -108,12 +173,14 @@ class EmailFinder:
     def get_mx_records(self, domain: str) -> List[str]:
         """
         Get MX records for a domain with caching.
+        DNS failures are cached too (see MXCache.set_failure), so a dead
+        domain repeated in a bulk file costs one lookup, not one per row.
 
         Args:
             domain: Domain name
 
         Returns:
-            List of MX hostnames, sorted by preference
+            List of MX hostnames, sorted by preference ([] if none usable)
         """
         # Check cache first
         cached = self.mx_cache.get(domain)
@@ -123,81 +190,353 @@ class EmailFinder:
         # Cache miss - query DNS
         try:
             records = dns.resolver.resolve(domain, 'MX')
-            sorted_records = sorted(records, key=lambda r: r.preference)
-            mx_list = [str(r.exchange).rstrip('.') for r in sorted_records]
+        except Exception as e:
+            return self._mx_error(domain, e)
+        return self._mx_answer(domain, records)
+
+    async def get_mx_records_async(self, domain: str) -> List[str]:
+        """
+        Non-blocking get_mx_records() (dns.asyncresolver), same caching.
 
-            # Store in cache
-            self.mx_cache.set(domain, mx_list)
-            return mx_list
+        Args:
+            domain: Domain name
+
+        Returns:
+            List of MX hostnames, sorted by preference ([] if none usable)
+        """
+        cached = await self._cache_io(self.mx_cache.get, domain)
+        if cached is not None:
+            return cached
+
+        try:
+            records = await dns.asyncresolver.resolve(domain, 'MX')
+        except Exception as e:
+            return await self._cache_io(self._mx_error, domain, e)
+        return await self._cache_io(self._mx_answer, domain, records)
 
+    async def _cache_io(self, fn: Callable, *args):
+        """
+        Call a cache method from the async flows. With a shared backend (a
+        socket round trip) or the MX disk tier (SQLite), cache reads and writes
+        may block, so they run on the bounded executor; memory-only caches are
+        called inline.
+
+        Args:
+            fn: Cache method (or helper using the caches)
+            *args: Its arguments
+
+        Returns:
+            fn's result
+        """
+        if self.cache_backend is None and self.mx_cache.store is None:
+            return fn(*args)
+        return await self.executor.run(fn, *args)
+
+    async def _resolve_mx(self, domain: str) -> List[str]:
+        """
+        get_mx_records() for the async flows. DNS misses (and the disk cache
+        tier) block, so the call runs on the bounded executor and the event
+        loop keeps serving other requests meanwhile.
+
+        Args:
+            domain: Domain name
+
+        Returns:
+            List of MX hostnames, sorted by preference ([] if none usable)
+        """
+        return await self.executor.run(self.get_mx_records, domain)
+
+    def _mx_answer(self, domain: str, records) -> List[str]:
+        """Cache and return an MX answer."""
+        # RFC 7505 null MX ("MX 0 ."): the domain accepts no mail at all
+        if any(r.exchange == dns.name.root for r in records):
+            return self._mx_failure(domain, NULL_MX)
+
+        sorted_records = sorted(records, key=lambda r: r.preference)
+        mx_list = [str(r.exchange).rstrip('.') for r in sorted_records]
+
+        # Store in cache, for as long as the answer's TTL allows (clamped by the cache)
+        rrset = getattr(records, 'rrset', None)
+        self.mx_cache.set(domain, mx_list, ttl=rrset.ttl if rrset is not None else None)
+        return mx_list
+
+    def _schedule_mx_refresh(self, domain: str) -> None:
+        """MXCache refresher: re-resolve a domain on the background loop."""
+        asyncio.run_coroutine_threadsafe(self._refresh_mx(domain), get_background_loop())
+
+    async def _refresh_mx(self, domain: str) -> None:
+        """Refresh-ahead lookup: a failure keeps the current entry instead of caching the error."""
+        try:
+            records = await dns.asyncresolver.resolve(domain, 'MX')
         except Exception as e:
-            logger.error("DNS query failed", domain=domain, error=str(e))
-            return []
+            logger.debug("MX refresh failed", domain=domain, error=str(e))
+            self.mx_cache.refresh_failed(domain)
+            return
+        self._mx_answer(domain, records)
+
+    def _mx_error(self, domain: str, error: Exception) -> List[str]:
+        """Cache a failed MX query as a negative entry (unknown errors are not cached)."""
+        if isinstance(error, dns.resolver.NXDOMAIN):
+            return self._mx_failure(domain, NXDOMAIN)
+        if isinstance(error, dns.resolver.NoAnswer):
+            return self._mx_failure(domain, NO_ANSWER)
+        if isinstance(error, dns.exception.Timeout):
+            return self._mx_failure(domain, TIMEOUT)
+        if isinstance(error, dns.resolver.NoNameservers):
+            return self._mx_failure(domain, SERVFAIL)
+        logger.error("DNS query failed", domain=domain, error=str(error))
+        return []
+
+    def _mx_failure(self, domain: str, failure: str) -> List[str]:
+        """Cache a DNS failure for domain and return no records."""
+        logger.warning("DNS query failed", domain=domain, failure=failure)
+        self.mx_cache.set_failure(domain, failure)
+        return []
+
+    def no_mx_message(self, domain: str) -> str:
+        """Error message for a domain without usable MX records."""
+        failure = self.mx_cache.failure_reason(domain)
+        if failure is None:
+            return "No MX records found"
+        return f"No MX records found: {MX_FAILURE_MESSAGES[failure]}"
+
+    async def resolve_host_addresses(self, host: str) -> List[str]:
+        """
+        Resolve an MX host's IPv4 then IPv6 addresses into host_addresses.
+
+        Returns:
+            Addresses (IPv4 first), [] if the host does not resolve
+        """
+        addresses = []
+        for rdtype in ('A', 'AAAA'):
+            try:
+                answer = await dns.asyncresolver.resolve(host, rdtype)
+                addresses.extend(r.address for r in answer)
+            except Exception:
+                continue
+        self.host_addresses.set(host, addresses)
+        return addresses
+
+    async def prefetch_mx_records(
+        self,
+        domains: List[str],
+        concurrency: Optional[int] = None,
+        resolve_addresses: Optional[bool] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Resolve the MX records of many domains concurrently, filling mx_cache
+        before any SMTP work starts (bulk paths). Dead domains end up as
+        negative cache entries.
+
+        Args:
+            domains: Domains (duplicates and URLs are fine)
+            concurrency: Max DNS queries in flight (default: from config)
+            resolve_addresses: Also resolve A/AAAA of the MX hosts that will be
+                contacted (default: from config)
+
+        Returns:
+            Normalized domain -> MX hostnames ([] if none usable)
+        """
+        concurrency = concurrency or config.DNS_PREFETCH_CONCURRENCY
+        if resolve_addresses is None:
+            resolve_addresses = config.DNS_PREFETCH_ADDRESSES
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        unique_domains = list(dict.fromkeys(self.normalize_domain(domain) for domain in domains))
+        mx_lists = await asyncio.gather(*(bounded(self.get_mx_records_async(d)) for d in unique_domains))
+        results = dict(zip(unique_domains, mx_lists))
+
+        if resolve_addresses:
+            hosts = {
+                host
+                for mx_list in mx_lists
+                for host in mx_list[:config.MAX_MX_SERVERS]
+                if not self.host_addresses.has(host)
+            }
+            await asyncio.gather(*(bounded(self.resolve_host_addresses(host)) for host in hosts))
+
+        logger.info(
+            "DNS prefetch done",
+            domains=len(unique_domains),
+            without_mx=sum(1 for mx_list in mx_lists if not mx_list)
+        )
+        return results
+
+    async def acquire_session(self, mx_host: str) -> AsyncSMTPSession:
+        """
+        Pooled session to an MX host, bound to the next source address of
+        self.sources (give it back with release_session()).
+        """
+        source = self.sources.select()
+        address = source.address if source else None
+        try:
+            return await self.smtp_pool.acquire(mx_host, address)
+        except BaseException:
+            self.sources.release(address)
+            raise
+
+    async def release_session(self, session: AsyncSMTPSession, reusable: bool = True) -> None:
+        """Return a session from acquire_session() to the pool."""
+        try:
+            await self.smtp_pool.release(session, reusable=reusable)
+        finally:
+            self.sources.release(session.source_address)
 
     def verify_email(self, email: str, mx_host: str) -> Tuple[bool, str, int]:
         """
-        Direct SMTP verification without proxy.
+        Blocking wrapper around verify_email_async() for sync callers.
+        Runs on the shared background loop, so the one-off connection goes
+        through the same source-address limits and politeness pacing.
         Returns (is_valid, log_message, code)
         """
+        return run_sync(self.verify_email_async(email, mx_host))
+
+    def verify_email_with_retry(self, email: str, mx_host: str) -> Tuple[bool, str, int]:
+        """
+        Blocking wrapper around verify_email_with_retry_async().
+
+        Retries on transient errors (timeout, connection issues) but NOT on
+        permanent failures like 550 (user not found).
+
+        Args:
+            email: Email address to verify
+            mx_host: MX server hostname
+
+        Returns:
+            Tuple of (is_valid, log_message, smtp_code)
+        """
+        return run_sync(self.verify_email_with_retry_async(email, mx_host))
+
+    def open_async_session(self, mx_host: str, source_address: Optional[str] = None) -> AsyncSMTPSession:
+        """Create a (lazily connected) asyncio SMTP session to an MX host, optionally from a source IP."""
+        helo_hostname = self.sources.helo_for(source_address, self.smtp_hostname)
+        return AsyncSMTPSession(mx_host, helo_hostname, self.smtp_from_email, source_address=source_address)
+
+    async def verify_email_async(self, email: str, mx_host: str, session: Optional[AsyncSMTPSession] = None) -> Tuple[bool, str, int]:
+        """
+        Non-blocking SMTP verification.
+        Uses the given session if provided, otherwise a one-off connection.
+        Returns (is_valid, log_message, code)
+        """
+        owns_session = session is None
+        if owns_session:
+            source = self.sources.select()
+            session = self.open_async_session(mx_host, source.address if source else None)
+
         try:
-            server = smtplib.SMTP(timeout=10)
-            server.set_debuglevel(0)
-            
-            server.connect(mx_host, 25)
-            server.ehlo(self.smtp_hostname)
-            server.mail(self.smtp_from_email)
-            
-            code, message = server.rcpt(email)
-            server.quit()
-            
-            log = f"{mx_host}: {code} {message.decode('ascii', errors='ignore')}"
-            
+            # Per-host / per-provider pacing (per source IP) instead of a fixed sleep
+            await self.scheduler.acquire(mx_host, source=session.source_address)
+            await self.sources.acquire(session.source_address)
+            code, message = await session.rcpt(email)
+            text = message.decode('ascii', errors='ignore')
+            self.scheduler.report(mx_host, code, session.source_address)
+            self.sources.report(session.source_address, code, text)
+
+            log = f"{mx_host}: {code} {text}"
+
             # 250 = OK, 251 = User not local (will forward)
             if code == 250 or code == 251:
                 return True, log, code
             return False, log, code
-            
-        except socket.timeout:
-            return False, f"{mx_host}: Timeout (>10s)", 0
+
+        except (asyncio.TimeoutError, socket.timeout):
+            session.abort()
+            return False, f"{mx_host}: Timeout (>{session.command_timeout}s)", 0
         except ConnectionRefusedError:
+            session.abort()
             return False, f"{mx_host}: Connection refused", 0
         except Exception as e:
+            session.abort()
             return False, f"{mx_host}: Error {str(e)}", 0
+        finally:
+            if owns_session:
+                await session.close()
+                self.sources.release(session.source_address)
 
-    def verify_email_with_retry(self, email: str, mx_host: str) -> Tuple[bool, str, int]:
+    async def verify_emails_async(self, emails: List[str], mx_host: str, session: Optional[AsyncSMTPSession] = None) -> List[Tuple[bool, str, int]]:
+        """
+        Verify several addresses on one session, batching RCPTs when possible.
+
+        If the session is already open and the server advertised PIPELINING,
+        all addresses go out in one write (one round trip). Otherwise only the
+        first address is verified, so callers keep their sequential pacing.
+
+        Returns:
+            List of (is_valid, log_message, code) for a prefix of emails
+        """
+        if session is None or not session.connected or not session.supports_pipelining or len(emails) < 2:
+            return [await self.verify_email_async(emails[0], mx_host, session)]
+
+        try:
+            await self.scheduler.acquire(mx_host, len(emails), session.source_address)
+            await self.sources.acquire(session.source_address, len(emails))
+            replies = await session.rcpt_many(emails)
+        except (asyncio.TimeoutError, socket.timeout):
+            session.abort()
+            return [(False, f"{mx_host}: Timeout (>{session.command_timeout}s)", 0)]
+        except Exception as e:
+            session.abort()
+            return [(False, f"{mx_host}: Error {str(e)}", 0)]
+
+        results = []
+        for code, message in replies:
+            text = message.decode('ascii', errors='ignore')
+            self.scheduler.report(mx_host, code, session.source_address)
+            self.sources.report(session.source_address, code, text)
+            log = f"{mx_host}: {code} {text}"
+            results.append((code == 250 or code == 251, log, code))
+        return results
+
+    async def verify_email_with_retry_async(self, email: str, mx_host: str, session: Optional[AsyncSMTPSession] = None) -> Tuple[bool, str, int]:
         """
         Verify email with retry logic and exponential backoff.
 
         Retries on transient errors (timeout, connection issues) but NOT on
-        permanent failures like 550 (user not found).
-
-        Retry strategy: 1s → 2s → 4s (max 3 attempts total)
+        permanent failures like 550 (user not found). The backoff
+        (1s → 2s → 4s, max 3 attempts total) is awaited so other lookups
+        keep running meanwhile.
 
         Args:
             email: Email address to verify
             mx_host: MX server hostname
+            session: Optional open session to reuse (reconnects on failure)
 
         Returns:
             Tuple of (is_valid, log_message, smtp_code)
         """
+        results = await self.verify_emails_with_retry_async([email], mx_host, session)
+        return results[0]
+
+    async def verify_emails_with_retry_async(self, emails: List[str], mx_host: str, session: Optional[AsyncSMTPSession] = None) -> List[Tuple[bool, str, int]]:
+        """
+        Batch version of verify_email_with_retry_async().
+
+        The retry decision is taken on the first result: a transient error
+        there means the connection failed and the whole batch is re-sent.
+
+        Returns:
+            List of (is_valid, log_message, code) for a prefix of emails
+        """
         last_error = None
 
         for attempt in range(config.SMTP_MAX_RETRIES):
-            is_valid, log, code = self.verify_email(email, mx_host)
+            results = await self.verify_emails_async(emails, mx_host, session)
+            is_valid, log, code = results[0]
 
             # Success - return immediately
             if is_valid:
                 if attempt > 0:
-                    log += f" (succeeded after {attempt + 1} attempts)"
-                return is_valid, log, code
+                    results[0] = (is_valid, log + f" (succeeded after {attempt + 1} attempts)", code)
+                return results
 
-            # Check if error is transient and should be retried
-            should_retry = config.should_retry_error(log)
-
-            if not should_retry:
-                # Permanent error (like 550 user not found) - don't retry
+            # Permanent error (like 550 user not found) - don't retry
+            if not config.should_retry_error(log):
                 logger.debug(f"Permanent error, not retrying: {log}")
-                return is_valid, log, code
+                return results
 
             # Transient error - retry
             last_error = (is_valid, log, code)
@@ -205,106 +544,306 @@ class EmailFinder:
             if attempt < config.SMTP_MAX_RETRIES - 1:
                 delay = config.get_retry_delay(attempt)
                 logger.info(f"Transient error, retrying in {delay}s (attempt {attempt + 1}/{config.SMTP_MAX_RETRIES}): {log}")
-                time.sleep(delay)
+                await asyncio.sleep(delay)
 
         # All retries exhausted
         is_valid, log, code = last_error
         log += f" (failed after {config.SMTP_MAX_RETRIES} attempts)"
-        return is_valid, log, code
+        return [(is_valid, log, code)]
 
     def generate_random_email(self, domain: str) -> str:
         """Generate a random email for catch-all detection."""
         random_string = ''.join(random.choices(string.ascii_lowercase + string.digits, k=9))
         return f"chk_{random_string}@{domain}"
 
-    def find_email(self, domain: str, full_name: str) -> EmailFinderResponse:
-        domain = self.normalize_domain(domain)
-        first_variants, last_variants = self.normalize_name(full_name)
-        patterns = self.generate_patterns(first_variants, last_variants, domain)
-        mx_records = self.get_mx_records(domain)
+    def find_email(self, domain: str, full_name: str, fresh: bool = False) -> EmailFinderResponse:
+        """Blocking wrapper around find_email_async()."""
+        return run_sync(self.find_email_async(domain, full_name, fresh))
 
-        response = EmailFinderResponse(
-            status="unknown",
-            patternsTested=patterns,
-            mxRecords=mx_records
-        )
+    async def find_email_async(self, domain: str, full_name: str, fresh: bool = False) -> EmailFinderResponse:
+        """
+        Find the email address of a person at a domain (async engine).
 
-        if not mx_records:
-            response.status = "error"
-            response.errorMessage = "No MX records found"
-            return response
+        Args:
+            domain: Company domain (URLs are accepted)
+            full_name: Person's full name
+            fresh: Ignore cached verdicts and verify over SMTP
 
-        # Try up to MAX_MX_SERVERS MX records with fallback
-        mx_hosts_to_try = mx_records[:config.MAX_MX_SERVERS]
-        mx_host = None
-        connection_errors = []
+        Returns:
+            EmailFinderResponse with status valid / catch_all / not_found / error
+        """
+        responses = await self.find_emails_for_domain_async(domain, [full_name], fresh)
+        return responses[0]
 
-        # STEP 1: Catch-All Check (CRUCIAL - Must be first)
-        catch_all_email = self.generate_random_email(domain)
+    def group_by_domain(self, rows: List[Tuple[str, str]]) -> Dict[str, List[int]]:
+        """
+        Group bulk rows by normalized domain.
 
-        for idx, mx in enumerate(mx_hosts_to_try):
-            is_valid, log, code = self.verify_email_with_retry(catch_all_email, mx)
-            response.smtpLogs.append(f"Catch-all check ({catch_all_email}) on MX{idx + 1} ({mx}): {log}")
+        Args:
+            rows: (domain, full_name) pairs
 
-            # Check if it's a connection error (should try next MX)
-            is_connection_error = any(err in log.lower() for err in [
-                "timeout", "connection refused", "connection reset", "connection closed"
-            ])
+        Returns:
+            Normalized domain -> row indices, in order of first appearance
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, (domain, _) in enumerate(rows):
+            groups.setdefault(self.normalize_domain(domain), []).append(index)
+        return groups
+
+    async def find_emails_for_domain_async(
+        self,
+        domain: str,
+        full_names: List[str],
+        fresh: bool = False
+    ) -> List[EmailFinderResponse]:
+        """
+        Find the email addresses of several people at the same domain.
 
-            if is_connection_error:
-                connection_errors.append(f"MX{idx + 1} ({mx}): {log}")
-                continue  # Try next MX
+        The MX lookup and the catch-all probe run once for the whole group,
+        and every member's patterns are verified over one shared session.
+        A catch-all domain short-circuits every member at once. The probe
+        is skipped entirely while the domain's verdict is in catch_all_cache,
+        and addresses with a verdict in verdict_cache are not re-verified.
 
-            # Got a response (valid or invalid) - use this MX
-            mx_host = mx
+        Args:
+            domain: Company domain (URLs are accepted)
+            full_names: Full names of the people to look up
+            fresh: Ignore cached catch-all and address verdicts (new results are still cached)
 
-            if is_valid:
-                # Server accepts all emails (Catch-All)
-                response.catchAll = True
-                response.status = "catch_all"
-                response.debugInfo = f"MX: {mx_host} | Catch-all detected (low confidence)"
-                # Return best guess (first.last)
-                if patterns:
-                    response.email = patterns[0]
-                return response
+        Returns:
+            One EmailFinderResponse per name, in the same order
+        """
+        domain = self.normalize_domain(domain)
+        mx_records = await self._resolve_mx(domain)
+        provider = self.scheduler.provider_for_host(mx_records[0]) if mx_records else None
+        pattern_lists = [
+            self.generate_patterns(*self.normalize_name(full_name), domain, provider)
+            for full_name in full_names
+        ]
+
+        responses = [
+            EmailFinderResponse(status="unknown", patternsTested=patterns, mxRecords=mx_records)
+            for patterns in pattern_lists
+        ]
 
-            # Catch-all rejected - proceed to pattern testing with this MX
-            break
+        if not mx_records:
+            message = await self._cache_io(self.no_mx_message, domain)
+            for response in responses:
+                response.status = "error"
+                response.errorMessage = message
+            return responses
 
-        # If all MX servers had connection errors
-        if mx_host is None:
-            response.status = "error"
-            response.errorMessage = f"All MX servers unreachable: {'; '.join(connection_errors)}"
-            return response
+        # Try up to MAX_MX_SERVERS MX records with fallback
+        mx_hosts_to_try = mx_records[:config.MAX_MX_SERVERS]
+        mx_host = None
+        session = None
+        connection_errors = []
+        # Address -> (is_valid, log, code), shared by the group (members may share patterns)
+        verified = {} if fresh else await self._cache_io(self._cached_verdicts, pattern_lists)
 
-        # STEP 2: Pattern Testing (Only if server is "Honest" - rejected catch-all)
-        for i, pattern in enumerate(patterns):
-            # Politeness: 1s delay between checks
-            if i > 0:
-                time.sleep(1)
+        try:
+            # STEP 1: Catch-All Check (CRUCIAL - Must be first), once per domain
+            cached = None if fresh else await self._cache_io(self.catch_all_cache.get, domain)
+            if cached is not None and cached[1] is not None and cached[1] not in mx_hosts_to_try:
+                # MX set changed since the verdict was stored
+                await self._cache_io(self.catch_all_cache.invalidate, domain)
+                cached = None
+
+            honest = False  # Server known to reject unknown addresses: its 250s are worth caching
+            if cached is not None:
+                verdict, mx_host = cached
+                honest = verdict == HONEST
+                for response in responses:
+                    response.smtpLogs.append(
+                        f"Catch-all check: cached verdict '{verdict}'" + (f" ({mx_host})" if mx_host else "")
+                    )
+
+                if verdict == CATCH_ALL:
+                    self._mark_catch_all(responses, pattern_lists, mx_host, cached=True)
+                    return responses
+
+                if verdict == UNREACHABLE:
+                    for response in responses:
+                        response.status = "error"
+                        response.errorMessage = "All MX servers unreachable (cached)"
+                    return responses
+
+                # Honest server: straight to pattern testing, no probe
+                session = await self.acquire_session(mx_host)
 
-            is_valid, log, code = self.verify_email_with_retry(pattern, mx_host)
+            else:
+                catch_all_email = self.generate_random_email(domain)
+                first_patterns = [p for p in (pattern_lists[0] if pattern_lists else []) if p not in verified]
+
+                for idx, mx in enumerate(mx_hosts_to_try):
+                    # One (pooled, possibly warm) session per MX host: the probe and every member's patterns share it
+                    session = await self.acquire_session(mx)
+                    # With PIPELINING on an open session, the first member's patterns ride along with the probe
+                    results = await self.verify_emails_with_retry_async([catch_all_email] + first_patterns, mx, session)
+                    is_valid, log, code = results[0]
+                    probe_results = dict(zip(first_patterns, results[1:]))
+                    for response in responses:
+                        response.smtpLogs.append(f"Catch-all check ({catch_all_email}) on MX{idx + 1} ({mx}): {log}")
+
+                    # Check if it's a connection error (should try next MX)
+                    is_connection_error = any(err in log.lower() for err in [
+                        "timeout", "connection refused", "connection reset", "connection closed"
+                    ])
+
+                    if is_connection_error:
+                        connection_errors.append(f"MX{idx + 1} ({mx}): {log}")
+                        await self.release_session(session, reusable=False)
+                        session = None
+                        continue  # Try next MX
+
+                    # Got a response (valid or invalid) - use this MX
+                    mx_host = mx
+
+                    if is_valid:
+                        # Server accepts all emails (Catch-All): no need to test anyone in the group
+                        await self._cache_io(self.catch_all_cache.set, domain, CATCH_ALL, mx_host)
+                        self._mark_catch_all(responses, pattern_lists, mx_host)
+                        return responses
+
+                    if 500 <= code < 600:
+                        # Catch-all rejected - proceed to pattern testing with this MX
+                        await self._cache_io(self.catch_all_cache.set, domain, HONEST, mx_host)
+                        honest = True
+                        verified.update(probe_results)
+                        await self._cache_io(self._remember_verdicts, probe_results, mx_host)
+                    else:
+                        # Probe deferred (4xx, e.g. greylisting): catch-all status undetermined, not cached
+                        for response in responses:
+                            response.smtpLogs.append("Catch-all check: undetermined (probe not rejected)")
+                    break
+
+                # If all MX servers had connection errors
+                if mx_host is None:
+                    await self._cache_io(self.catch_all_cache.set, domain, UNREACHABLE)
+                    for response in responses:
+                        response.status = "error"
+                        response.errorMessage = f"All MX servers unreachable: {'; '.join(connection_errors)}"
+                    return responses
+
+            # STEP 2: Pattern Testing (Only if server is "Honest" - rejected catch-all)
+            for response, patterns in zip(responses, pattern_lists):
+                await self._test_patterns(response, patterns, verified, mx_host, session, honest)
+
+            # Confirmed formats move to the front of the next lookups on this domain/provider
+            for full_name, response in zip(full_names, responses):
+                if response.status == "valid":
+                    self.learn_pattern(domain, full_name, response.email, mx_host)
+            return responses
+
+        finally:
+            if session is not None:
+                await self.release_session(session)
+
+    def _mark_catch_all(
+        self,
+        responses: List[EmailFinderResponse],
+        pattern_lists: List[List[str]],
+        mx_host: str,
+        cached: bool = False
+    ) -> None:
+        """Answer every member of a catch-all domain with its best guess (first.last)."""
+        note = ", cached" if cached else ""
+        for response, patterns in zip(responses, pattern_lists):
+            response.catchAll = True
+            response.status = "catch_all"
+            response.debugInfo = f"MX: {mx_host} | Catch-all detected (low confidence{note})"
+            if patterns:
+                response.email = patterns[0]
+
+    async def _test_patterns(
+        self,
+        response: EmailFinderResponse,
+        patterns: List[str],
+        verified: Dict[str, Tuple[bool, str, int]],
+        mx_host: str,
+        session: AsyncSMTPSession,
+        honest: bool = True
+    ) -> None:
+        """
+        Verify patterns in order until one is accepted, filling in `response`.
+        Accepted addresses are cached only if the server is known to be honest.
+        """
+        for i, pattern in enumerate(patterns):
+            if pattern not in verified:
+                # One RCPT, or all remaining unverified patterns at once if the server pipelines
+                remaining = [p for p in patterns[i:] if p not in verified]
+                results = dict(zip(remaining, await self.verify_emails_with_retry_async(remaining, mx_host, session)))
+                verified.update(results)
+                await self._cache_io(self._remember_verdicts, results, mx_host, honest)
+
+            is_valid, log, code = verified[pattern]
             response.smtpLogs.append(log)
 
             if is_valid:
                 response.status = "valid"
                 response.email = pattern
                 response.debugInfo = f"MX: {mx_host} | Match: {pattern} (high confidence)"
-                return response
+                return
 
         # No match found
         response.status = "not_found"
         response.debugInfo = f"MX: {mx_host} | {len(patterns)} patterns tested | No match"
-        return response
 
-    def check_email(self, email: str, full_name: str = None) -> EmailFinderResponse:
+    def learn_pattern(self, domain: str, full_name: str, email: str, mx_host: Optional[str] = None) -> bool:
+        """
+        Record the template of a confirmed address in pattern_priors.
+
+        Args:
+            domain: Normalized domain
+            full_name: Person's full name
+            email: Confirmed address (not a catch-all guess)
+            mx_host: MX that confirmed it, used to find the provider
+
+        Returns:
+            True if the address matched a known template
+        """
+        template = template_of(email, *self.normalize_name(full_name))
+        if template is None:
+            return False
+        provider = self.scheduler.provider_for_host(mx_host) if mx_host else None
+        self.pattern_priors.record(domain, template, provider)
+        return True
+
+    def _cached_verdicts(self, pattern_lists: List[List[str]]) -> Dict[str, Tuple[bool, str, int]]:
+        """Verdicts already in verdict_cache for any of the patterns."""
+        verified = {}
+        for patterns in pattern_lists:
+            for pattern in patterns:
+                if pattern not in verified:
+                    cached = self.verdict_cache.get(pattern)
+                    if cached is not None:
+                        verified[pattern] = cached[:3]
+        return verified
+
+    def _remember_verdicts(self, results: Dict[str, Tuple[bool, str, int]], mx_host: str, honest: bool = True) -> None:
+        """
+        Store fresh RCPT results in verdict_cache (uncacheable codes are skipped).
+        Acceptances from a catch-all or undetermined server prove nothing and are
+        not stored unless honest is True.
+        """
+        for email, (is_valid, log, code) in results.items():
+            if is_valid and not honest:
+                continue
+            self.verdict_cache.set(email, code, mx_host, log)
+
+    def check_email(self, email: str, full_name: str = None, fresh: bool = False) -> EmailFinderResponse:
+        """Blocking wrapper around check_email_async()."""
+        return run_sync(self.check_email_async(email, full_name, fresh))
+
+    async def check_email_async(self, email: str, full_name: str = None, fresh: bool = False) -> EmailFinderResponse:
         """
-        Check if a specific email address is valid.
+        Check if a specific email address is valid (async engine).
         If invalid and fullName is provided, fallback to domain search.
 
         Args:
             email: Email address to verify
             full_name: Optional full name for fallback search
+            fresh: Ignore cached verdicts and verify over SMTP
 
         Returns:
             EmailFinderResponse with validation result
@@ -318,7 +857,7 @@ class EmailFinder:
         domain = self.normalize_domain(domain)
 
         # Get MX records
-        mx_records = self.get_mx_records(domain)
+        mx_records = await self._resolve_mx(domain)
         response = EmailFinderResponse(
             status="unknown",
             patternsTested=[email],
@@ -327,15 +866,30 @@ class EmailFinder:
 
         if not mx_records:
             response.status = "error"
-            response.errorMessage = "No MX records found"
+            response.errorMessage = await self._cache_io(self.no_mx_message, domain)
             return response
 
         # Try up to MAX_MX_SERVERS MX records with fallback
         mx_hosts_to_try = mx_records[:config.MAX_MX_SERVERS]
         mx_host = None
+        cached = None if fresh else await self._cache_io(self.verdict_cache.get, email)
+        domain_verdict = await self._cache_io(self.catch_all_cache.get, domain)
+        honest = domain_verdict is not None and domain_verdict[0] == HONEST
+        if cached is not None and cached[0] and not honest:
+            # Accepted while the domain's catch-all status was unknown, or since found catch-all
+            cached = None
 
         for idx, mx in enumerate(mx_hosts_to_try):
-            is_valid, log, code = self.verify_email_with_retry(email, mx)
+            if cached is not None:
+                # Verified recently: reuse the verdict instead of an SMTP conversation
+                is_valid, log, code, mx = cached
+            else:
+                session = await self.acquire_session(mx)
+                try:
+                    is_valid, log, code = await self.verify_email_with_retry_async(email, mx, session)
+                finally:
+                    await self.release_session(session)
+                await self._cache_io(self._remember_verdicts, {email: (is_valid, log, code)}, mx, honest)
             response.smtpLogs.append(f"Direct check ({email}) on MX{idx + 1} ({mx}): {log}")
 
             # Check if it's a connection error (should try next MX)
@@ -370,7 +924,7 @@ class EmailFinder:
             logger.info(f"Email {email} invalid, attempting fallback search with name: {full_name}")
             response.smtpLogs.append(f"Fallback: Trying domain search with name '{full_name}'")
 
-            fallback_response = self.find_email(domain, full_name)
+            fallback_response = await self.find_email_async(domain, full_name, fresh)
 
             # Merge logs and info
             response.smtpLogs.extend(fallback_response.smtpLogs)
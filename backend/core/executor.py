@@ -0,0 +1,170 @@
+"""
+Bounded executor for blocking work (DNS cache misses, database access).
+Keeps the event loop free for /health and other requests, with a hard
+limit on queued work so overload is reported instead of piling up.
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from config import config
+
+
+class ExecutorSaturated(Exception):
+    """Every worker is busy and the queue is full (reported to clients as a 503)."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a bounded queue.
+
+    At most max_workers calls run at once and max_queue more may wait.
+    Request handlers check `saturated` (or use try_run()) to shed load;
+    background work uses run(), which waits for a free slot instead.
+
+    Usage:
+        executor = BoundedExecutor()
+        records = await executor.run(finder.get_mx_records, "example.com")
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        """
+        Initialize executor.
+
+        Args:
+            max_workers: Worker threads (default: from config)
+            max_queue: Calls allowed to wait for a worker (default: from config)
+        """
+        self.max_workers = max_workers or config.BLOCKING_EXECUTOR_WORKERS
+        self.max_queue = max_queue if max_queue is not None else config.BLOCKING_EXECUTOR_QUEUE
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        # Slots are counted under a thread lock; run() calls waiting for one
+        # park a future on their own loop (the API loop or run_sync's loop)
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._waited = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def saturated(self) -> bool:
+        """True if a new call would exceed the queue limit."""
+        return self._in_flight >= self.capacity
+
+    async def _acquire(self, wait: bool) -> bool:
+        """Take a slot; with wait=False, False if none is free (or run() calls are queued)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self.capacity and not self._waiters:
+                self._in_flight += 1
+                return True
+            if not wait:
+                return False
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+            self._waited += 1
+        try:
+            await waiter  # Resolved by _grant(): the freed slot is handed over, already counted
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = (loop, waiter) in self._waiters
+                if queued:
+                    self._waiters.remove((loop, waiter))
+            if not queued and waiter.done() and not waiter.cancelled():
+                self._free()  # Slot granted just before the cancellation: pass it on
+            raise
+        return True
+
+    def _free(self) -> None:
+        """Hand a slot to the oldest waiting run(), on its own loop, or give it back."""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._in_flight -= 1
+                    return
+                loop, waiter = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._grant, waiter)
+                return
+            except RuntimeError:
+                continue  # Waiter's loop is closed: next one
+
+    def _grant(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            self._free()  # Cancelled while the slot was on its way
+        else:
+            waiter.set_result(None)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._completed += 1
+        self._free()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="blocking")
+            return self._pool
+
+    async def _submit(self, fn: Callable, *args):
+        """Run fn(*args) on the pool; the caller holds a slot, freed when the call is done."""
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # Freed when the thread finishes, not when the awaiter does: a
+        # cancelled caller keeps its slot until its call really stops running
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def try_run(self, fn: Callable, *args):
+        """
+        Run fn(*args) in a worker thread, or fail fast if the executor is full.
+
+        Raises:
+            ExecutorSaturated: No worker or queue slot available
+        """
+        if not await self._acquire(wait=False):
+            self._rejected += 1
+            raise ExecutorSaturated(
+                f"Server busy: {self.max_workers} workers and {self.max_queue} queued calls in use"
+            )
+        return await self._submit(fn, *args)
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in a worker thread, waiting for a slot if the executor is full."""
+        await self._acquire(wait=True)
+        return await self._submit(fn, *args)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads (queued calls are cancelled); the next call starts new ones."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        """
+        Get executor statistics.
+
+        Returns:
+            Dict with in-flight calls, limits and completed/rejected/waited counters
+        """
+        return {
+            "in_flight": self._in_flight,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "saturated": self.saturated,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "waited": self._waited
+        }
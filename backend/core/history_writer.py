@@ -0,0 +1,279 @@
+"""
+Batched search history writer.
+Lookups hand their results to a bounded queue; a dedicated writer thread
+writes them with one transaction per batch instead of one commit (and fsync)
+per row, so request handlers never wait on disk I/O.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from config import config
+from core.logger import StructuredLogger
+from database import SessionLocal, build_history_entry
+
+logger = StructuredLogger("history", json_format=False)
+
+PendingEntry = Tuple[str, str, object]  # (domain, full_name, EmailFinderResponse)
+
+
+def _wake_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class HistoryWriter:
+    """
+    Queues SearchHistory rows and writes them in batches from one thread.
+
+    A batch is written when batch_size rows are queued or every
+    flush_interval_ms, whichever comes first, and on drain()/stop().
+    put() is the backpressure point: while max_pending rows are queued it
+    waits until a flush makes room; after put_timeout seconds the caller
+    writes its own row instead, and keeps waiting if that write fails too.
+    No row is ever dropped: add() (for sync callers) and failed flushes may
+    take the queue past max_pending, and rows stay queued until the
+    database accepts them.
+
+    Usage:
+        writer = HistoryWriter()
+        writer.start()
+        await writer.put("example.com", "John Doe", result)
+        await writer.drain()   # e.g. when a bulk job completes
+        writer.stop()          # final flush on shutdown
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        put_timeout: Optional[float] = None
+    ):
+        """
+        Initialize writer.
+
+        Args:
+            session_factory: SQLAlchemy session factory (default: database.SessionLocal)
+            batch_size: Rows per transaction (default: from config)
+            flush_interval_ms: Max milliseconds a row waits before being written (default: from config)
+            max_pending: Queue depth at which put() waits (default: from config)
+            put_timeout: Seconds put() waits for room before writing its row itself (default: from config)
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size or config.HISTORY_BATCH_SIZE
+        self.flush_interval_ms = flush_interval_ms or config.HISTORY_FLUSH_INTERVAL_MS
+        self.max_pending = max_pending or config.HISTORY_MAX_PENDING
+        self.put_timeout = put_timeout if put_timeout is not None else config.HISTORY_PUT_TIMEOUT
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Deque[PendingEntry] = deque()
+        self._wake = threading.Event()
+        self._room_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._in_flight = 0
+        self._backpressure_waits = 0
+        self._written = 0
+        self._batches = 0
+        self._failures = 0
+        self._direct_writes = 0
+        self._last_flush_ms = 0.0
+
+    def add(self, domain: str, full_name: str, result) -> None:
+        """
+        Queue one search for the history without waiting, even past
+        max_pending. Async callers should use put(), which waits for room.
+
+        Args:
+            domain: Searched domain
+            full_name: Searched name (or the checked address)
+            result: EmailFinderResponse
+        """
+        with self._lock:
+            self._pending.append((domain, full_name, result))
+            full = len(self._pending) >= self.batch_size
+
+        if full:
+            if self.running:
+                self._wake.set()
+            else:
+                self.flush()
+
+    @property
+    def depth(self) -> int:
+        """Rows waiting to be written."""
+        return len(self._pending)
+
+    async def put(self, domain: str, full_name: str, result) -> None:
+        """
+        Queue one search for the history, waiting while the queue is full.
+        If the queue is still full after put_timeout, the row is written
+        directly (in a worker thread) rather than dropping a queued one.
+
+        Args:
+            domain: Searched domain
+            full_name: Searched name (or the checked address)
+            result: EmailFinderResponse
+        """
+        if self.depth >= self.max_pending:
+            self._backpressure_waits += 1
+            deadline = time.monotonic() + self.put_timeout
+            while self.depth >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    await self._wait_for_room(remaining)
+                    continue
+                # Writer stuck behind the database: write this row ourselves
+                if await asyncio.to_thread(self._write, [(domain, full_name, result)], False):
+                    self._direct_writes += 1
+                    return
+                deadline = time.monotonic() + self.put_timeout
+        self.add(domain, full_name, result)
+
+    async def _wait_for_room(self, timeout: float) -> None:
+        """Wait until a flush frees queue room (woken by the writer thread) or timeout."""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        with self._lock:
+            if len(self._pending) < self.max_pending:
+                return
+            self._room_waiters.append((loop, waiter))
+        self._wake.set()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if (loop, waiter) in self._room_waiters:
+                    self._room_waiters.remove((loop, waiter))
+
+    def _notify_room(self) -> None:
+        """Wake every put() waiting for room, on its own loop."""
+        with self._lock:
+            waiters, self._room_waiters = self._room_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake_waiter, waiter)
+            except RuntimeError:
+                pass  # Loop closed: nobody is waiting any more
+
+    async def drain(self, timeout: float = 30) -> bool:
+        """
+        Wait until every queued row is written (or the write failed).
+
+        Args:
+            timeout: Max seconds to wait
+
+        Returns:
+            True if the queue is empty
+        """
+        if not self.running:
+            await asyncio.to_thread(self.flush)
+            return self.depth == 0
+
+        failures = self._failures
+        deadline = time.monotonic() + timeout
+        while (self.depth or self._in_flight) and self._failures == failures and time.monotonic() < deadline:
+            self._wake.set()
+            await asyncio.sleep(0.01)
+        return self.depth == 0
+
+    def flush(self) -> int:
+        """
+        Write every pending row, batch_size rows per transaction.
+
+        Returns:
+            Number of rows written
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                    self._in_flight = len(batch)
+                if not batch:
+                    return written
+                try:
+                    if not self._write(batch):
+                        return written
+                finally:
+                    self._in_flight = 0
+                written += len(batch)
+                self._notify_room()
+
+    def _write(self, batch, requeue: bool = True) -> bool:
+        started = time.monotonic()
+        try:
+            with self.session_factory() as db:
+                db.add_all([build_history_entry(domain, full_name, result) for domain, full_name, result in batch])
+                db.commit()
+        except Exception as e:
+            # Put the batch back in front (oldest first) for the next flush,
+            # even past max_pending: put() holds new rows back meanwhile
+            if requeue:
+                with self._lock:
+                    self._pending.extendleft(reversed(batch))
+            self._failures += 1
+            logger.error("History flush failed", rows=len(batch), error=str(e))
+            return False
+
+        self._written += len(batch)
+        self._batches += 1
+        self._last_flush_ms = (time.monotonic() - started) * 1000
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Flush in a daemon thread every flush_interval_ms (or as soon as a batch is full)."""
+        if self.running:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_interval_ms / 1000)
+                self._wake.clear()
+                self.flush()
+
+        self._thread = threading.Thread(target=run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher thread and write what is left (e.g. on shutdown)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict:
+        """
+        Get writer statistics.
+
+        Returns:
+            Dict with queue depth, written rows/batches, failures and settings
+        """
+        return {
+            "queue_depth": self.depth,
+            "queue_size": self.max_pending,
+            "in_flight": self._in_flight,
+            "backpressure_waits": self._backpressure_waits,
+            "written": self._written,
+            "batches": self._batches,
+            "failures": self._failures,
+            "direct_writes": self._direct_writes,
+            "last_flush_ms": round(self._last_flush_ms, 1),
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval_ms
+        }
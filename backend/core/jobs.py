@@ -0,0 +1,388 @@
+"""
+Background bulk jobs.
+Submitting a bulk search returns a job ID right away; worker tasks process
+the rows concurrently (or a coordinator hands them to worker processes)
+and persist progress and results in SQLite.
+"""
+import asyncio
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+from core.distributed import Coordinator, shard_by_provider
+from core.logger import StructuredLogger
+from core.history_writer import HistoryWriter
+from database import SessionLocal, BulkJob, BulkJobItem
+
+logger = StructuredLogger("jobs", json_format=False)
+
+# Stop a job after this many lookup errors in a row (possible ban or network issue)
+MAX_CONSECUTIVE_ERRORS = 5
+
+
+class JobManager:
+    """
+    Runs bulk searches as background jobs on the server's event loop.
+    Database writes run on the finder's bounded executor, off the loop.
+
+    Rows are grouped by domain and each group is looked up in one go. Each
+    job gets JOB_WORKERS_PER_JOB worker tasks (one group at a time each),
+    and all jobs share a JOB_MAX_CONCURRENT_LOOKUPS budget of in-flight
+    groups; per-host pacing is left to the finder's politeness scheduler.
+
+    With a coordinator, groups are sharded by mail provider and processed
+    by the connected worker processes instead; results are stored here the
+    same way.
+
+    Usage:
+        jobs = JobManager(finder)
+        job_id = jobs.submit([("example.com", "John Doe")], source="json")
+        jobs.get_job(job_id)        # progress
+        jobs.get_results(job_id)    # partial or final results
+    """
+
+    def __init__(
+        self,
+        finder,
+        session_factory: Callable = SessionLocal,
+        workers_per_job: Optional[int] = None,
+        max_concurrent_lookups: Optional[int] = None,
+        history_writer: Optional[HistoryWriter] = None,
+        coordinator: Optional[Coordinator] = None
+    ):
+        """
+        Initialize job manager.
+
+        Args:
+            finder: EmailFinder used for the lookups
+            session_factory: SQLAlchemy session factory (default: database.SessionLocal)
+            workers_per_job: Concurrent rows per job (default: from config)
+            max_concurrent_lookups: Concurrent rows across all jobs (default: from config)
+            history_writer: Shared search history writer (default: a new one on session_factory)
+            coordinator: Started Coordinator to run jobs on worker processes (default: in-process)
+        """
+        self.finder = finder
+        self.session_factory = session_factory
+        self.workers_per_job = workers_per_job or config.JOB_WORKERS_PER_JOB
+        self.max_concurrent_lookups = max_concurrent_lookups or config.JOB_MAX_CONCURRENT_LOOKUPS
+        self.history_writer = history_writer or HistoryWriter(session_factory)
+        self.executor = finder.executor
+        self.coordinator = coordinator
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, rows: Iterable[Tuple[str, str]], source: str = "json", fresh: bool = False) -> str:
+        """
+        Persist a new job and start processing it in the background.
+        Must be called from the event loop (e.g. an async endpoint).
+
+        Args:
+            rows: (domain, full_name) pairs, list or iterator
+            source: Where the rows came from (filename or "json")
+            fresh: Ignore cached verdicts for this job
+
+        Returns:
+            Job ID
+        """
+        job_id = self._create_job(rows, source, fresh)
+        self._start(job_id)
+        return job_id
+
+    async def submit_async(self, rows: Iterable[Tuple[str, str]], source: str = "json", fresh: bool = False) -> str:
+        """
+        submit() with the row inserts on the executor instead of the event loop.
+        rows may be a lazy iterator (e.g. core.bulk_upload.iter_upload_rows):
+        it is consumed on the executor thread.
+
+        Raises:
+            ExecutorSaturated: The executor has no room for the insert
+        """
+        job_id = await self.executor.try_run(self._create_job, rows, source, fresh)
+        self._start(job_id)
+        return job_id
+
+    def _create_job(self, rows: Iterable[Tuple[str, str]], source: str, fresh: bool) -> str:
+        job_id = uuid.uuid4().hex
+        batch_rows = config.BULK_UPLOAD_BATCH_ROWS
+        with self.session_factory() as db:
+            job = BulkJob(id=job_id, source=source, status="queued", total=0, fresh=fresh)
+            db.add(job)
+            # Rows may be read lazily from an upload: insert them as they come
+            total = 0
+            for domain, full_name in rows:
+                db.add(BulkJobItem(job_id=job_id, row_index=total, domain=domain, full_name=full_name))
+                total += 1
+                if total % batch_rows == 0:
+                    db.flush()
+            job.total = total
+            db.commit()
+        logger.info("Bulk job submitted", job_id=job_id, rows=total, source=source)
+        return job_id
+
+    def resume_pending(self) -> int:
+        """
+        Restart jobs left queued/running by a previous process (call on startup).
+
+        Returns:
+            Number of jobs resumed
+        """
+        with self.session_factory() as db:
+            job_ids = [
+                job_id for (job_id,) in db.query(BulkJob.id)
+                .filter(BulkJob.status.in_(["queued", "running"]))
+                .all()
+            ]
+        for job_id in job_ids:
+            self._start(job_id)
+        return len(job_ids)
+
+    def _start(self, job_id: str) -> None:
+        task = asyncio.get_running_loop().create_task(self._run_job(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_lookups)
+        return self._semaphore
+
+    def _load_job(self, job_id: str) -> Tuple[bool, List[Tuple[int, str, str]]]:
+        """Mark a job running and return (fresh, pending items)."""
+        with self.session_factory() as db:
+            job = db.get(BulkJob, job_id)
+            job.status = "running"
+            job.started_at = job.started_at or datetime.utcnow()
+            fresh = bool(job.fresh)
+            items = [
+                (item.id, item.domain, item.full_name)
+                for item in db.query(BulkJobItem)
+                .filter(BulkJobItem.job_id == job_id, BulkJobItem.status == "pending")
+                .order_by(BulkJobItem.row_index)
+            ]
+            db.commit()
+        return fresh, items
+
+    async def _run_job(self, job_id: str) -> None:
+        fresh, items = await self.executor.run(self._load_job, job_id)
+
+        # One unit of work per domain: shared MX lookup, catch-all probe and session
+        groups = self.finder.group_by_domain([(domain, full_name) for _, domain, full_name in items])
+        pending = deque(
+            (group_domain, [items[index] for index in indices])
+            for group_domain, indices in groups.items()
+        )
+
+        state = {"consecutive_errors": 0, "stopped": False, "fresh": fresh}
+        try:
+            # Resolve every distinct domain up front, before any worker takes a group
+            mx_records = await self.finder.prefetch_mx_records(list(groups))
+            if self.coordinator is not None:
+                await self._run_distributed(job_id, pending, mx_records, state)
+            else:
+                workers = min(self.workers_per_job, len(pending))
+                await asyncio.gather(*(self._worker(job_id, pending, state) for _ in range(workers)))
+            # A finished job's rows are all in the history
+            if not await self.history_writer.drain():
+                raise RuntimeError(
+                    f"Search history not saved ({self.history_writer.depth} rows still queued)"
+                )
+            await self.executor.run(self._finish_job, job_id, "stopped" if state["stopped"] else "completed")
+        except asyncio.CancelledError:
+            raise  # Shutdown: job stays "running" and is resumed on next startup
+        except Exception as e:
+            logger.error("Bulk job failed", job_id=job_id, error=str(e))
+            await self.executor.run(self._finish_job, job_id, "failed", str(e))
+
+    async def _worker(self, job_id: str, pending: Deque[Tuple[str, List[Tuple[int, str, str]]]], state: Dict) -> None:
+        while pending and not state["stopped"]:
+            group_domain, items = pending.popleft()
+
+            async with self._get_semaphore():
+                try:
+                    results = await self.finder.find_emails_for_domain_async(
+                        group_domain, [full_name for _, _, full_name in items], state["fresh"]
+                    )
+                except Exception as e:
+                    if not state["stopped"]:
+                        await self._record_failure(job_id, items, e, state)
+                    continue
+
+            for item, result in zip(items, results):
+                if state["stopped"]:
+                    break  # Rest of the group is marked skipped
+                await self._record(job_id, item, result, state)
+
+    async def _run_distributed(
+        self,
+        job_id: str,
+        groups: Deque[Tuple[str, List[Tuple[int, str, str]]]],
+        mx_records: Dict[str, List[str]],
+        state: Dict
+    ) -> None:
+        """Shard the groups by mail provider and process them on the coordinator's workers."""
+        def provider_of(domain: str) -> str:
+            mx_list = mx_records.get(domain)
+            return self.finder.scheduler.provider_for_host(mx_list[0]) if mx_list else ""
+
+        async def on_result(item: Tuple[int, str, str], result) -> bool:
+            if not state["stopped"]:
+                await self._record(job_id, item, result, state)
+            return not state["stopped"]
+
+        async def on_group_error(items: List[Tuple[int, str, str]], error: Exception) -> bool:
+            if not state["stopped"]:
+                await self._record_failure(job_id, items, error, state)
+            return not state["stopped"]
+
+        shards = shard_by_provider(list(groups), provider_of)
+        logger.info("Bulk job sharded", job_id=job_id, shards=len(shards))
+        await self.coordinator.run(shards, state["fresh"], on_result, on_group_error)
+
+    async def _record(self, job_id: str, item: Tuple[int, str, str], result, state: Dict) -> None:
+        """Store one row's result (or exception); stop the job after too many errors in a row."""
+        item_id, domain, full_name = item
+        if isinstance(result, Exception):
+            await self._record_failure(job_id, [item], result, state)
+            return
+
+        state["consecutive_errors"] = 0
+        await self.history_writer.put(domain, full_name, result)
+        await self.executor.run(self._record_result, job_id, item_id, result)
+
+    async def _record_failure(self, job_id: str, items: List[Tuple[int, str, str]], error: Exception, state: Dict) -> None:
+        """Mark the rows of one failed lookup (a row, or a whole domain group) as errors; counts as one error."""
+        state["consecutive_errors"] += 1
+        await self.executor.run(self._record_error, job_id, [item_id for item_id, _, _ in items], str(error))
+        if state["consecutive_errors"] >= MAX_CONSECUTIVE_ERRORS:
+            state["stopped"] = True
+
+    def _record_result(self, job_id: str, item_id: int, result) -> None:
+        with self.session_factory() as db:
+            item = db.get(BulkJobItem, item_id)
+            item.status = result.status
+            item.email = result.email
+            item.catch_all = result.catchAll
+            item.debug_info = result.debugInfo
+            item.finished_at = datetime.utcnow()
+
+            job = db.get(BulkJob, job_id)
+            job.processed += 1
+            if result.status == "valid":
+                job.found += 1
+            db.commit()
+
+    def _record_error(self, job_id: str, item_ids: List[int], error_msg: str) -> None:
+        # Check for ban indicators
+        if "blocked" in error_msg.lower() or "access denied" in error_msg.lower():
+            error_msg = f"⚠️ Possible ban detected: {error_msg}"
+
+        with self.session_factory() as db:
+            finished_at = datetime.utcnow()
+            for item_id in item_ids:
+                item = db.get(BulkJobItem, item_id)
+                item.status = "error"
+                item.debug_info = f"Error: {error_msg}"[:500]
+                item.finished_at = finished_at
+
+            job = db.get(BulkJob, job_id)
+            job.processed += len(item_ids)
+            job.errors += 1
+            db.commit()
+
+    def _finish_job(self, job_id: str, status: str, error_message: Optional[str] = None) -> None:
+        with self.session_factory() as db:
+            job = db.get(BulkJob, job_id)
+            job.status = status
+            job.finished_at = datetime.utcnow()
+            if status == "stopped":
+                job.error_message = (
+                    f"⛔ Stopped after {MAX_CONSECUTIVE_ERRORS} consecutive errors (possible ban or network issue)"
+                )
+                db.query(BulkJobItem)\
+                    .filter(BulkJobItem.job_id == job_id, BulkJobItem.status == "pending")\
+                    .update({BulkJobItem.status: "skipped"})
+            elif error_message:
+                job.error_message = error_message[:500]
+            db.commit()
+        logger.info("Bulk job finished", job_id=job_id, status=status)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """
+        Get job progress.
+
+        Returns:
+            Job dict, or None if the job does not exist
+        """
+        with self.session_factory() as db:
+            job = db.get(BulkJob, job_id)
+            return self._job_to_dict(job) if job else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        """Most recent jobs first."""
+        with self.session_factory() as db:
+            jobs = db.query(BulkJob).order_by(BulkJob.created_at.desc()).limit(limit).all()
+            return [self._job_to_dict(job) for job in jobs]
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 500) -> Optional[Dict]:
+        """
+        Get processed rows of a job (partial while it runs, final once done).
+
+        Args:
+            job_id: Job ID
+            offset: Number of processed rows to skip (in row order)
+            limit: Max rows to return
+
+        Returns:
+            Dict with job progress and results, or None if the job does not exist
+        """
+        with self.session_factory() as db:
+            job = db.get(BulkJob, job_id)
+            if job is None:
+                return None
+            items = db.query(BulkJobItem)\
+                .filter(BulkJobItem.job_id == job_id, BulkJobItem.status != "pending")\
+                .order_by(BulkJobItem.row_index)\
+                .offset(offset)\
+                .limit(limit)\
+                .all()
+
+            return {
+                "job": self._job_to_dict(job),
+                "offset": offset,
+                "results": [{
+                    "row": item.row_index,
+                    "domain": item.domain,
+                    "fullName": item.full_name,
+                    "status": item.status,
+                    "email": item.email,
+                    "catchAll": item.catch_all,
+                    "debugInfo": item.debug_info or ""
+                } for item in items]
+            }
+
+    async def shutdown(self) -> None:
+        """Cancel running job tasks (they resume on next startup)."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _job_to_dict(job: BulkJob) -> Dict:
+        progress = (job.processed / job.total * 100) if job.total else 100
+        return {
+            "jobId": job.id,
+            "status": job.status,
+            "source": job.source,
+            "total": job.total,
+            "processed": job.processed,
+            "found": job.found,
+            "errors": job.errors,
+            "progress": f"{progress:.1f}%",
+            "createdAt": job.created_at.isoformat() if job.created_at else None,
+            "startedAt": job.started_at.isoformat() if job.started_at else None,
+            "finishedAt": job.finished_at.isoformat() if job.finished_at else None,
+            "errorMessage": job.error_message
+        }
@@ -0,0 +1,31 @@
+"""
+Run coroutines from synchronous code.
+Keeps one background event loop so the blocking API shares the async engine.
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting its thread on first use."""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="email-finder-loop", daemon=True)
+            thread.start()
+        return _loop
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """
+    Run a coroutine to completion and return its result (blocking).
+
+    Safe to call from plain threads and from inside another running loop
+    (e.g. a FastAPI handler), since the coroutine runs on the background loop.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop()).result()
@@ -1,34 +1,221 @@
 """
 MX Records caching layer to reduce DNS lookups.
-Simple in-memory cache with TTL (Time To Live).
+In-memory cache with TTL (Time To Live), optionally backed by a shared
+on-disk tier (see mx_cache_store.py) that survives restarts.
 """
+import sys
+import threading
 import time
-from typing import List, Optional, Dict, Tuple
+from collections import OrderedDict
+from typing import Callable, List, Optional, Dict, Set, Tuple
+
+from core.mx_cache_store import MXCacheStore
+
+# Negative entries: why a domain has no usable MX records
+NXDOMAIN = "nxdomain"    # Domain does not exist
+NO_ANSWER = "no_answer"  # Domain exists but has no MX records
+NULL_MX = "null_mx"      # Domain explicitly accepts no mail (RFC 7505 "MX 0 .")
+TIMEOUT = "timeout"      # DNS query timed out
+SERVFAIL = "servfail"    # No nameserver could answer
+
+FAILURES = (NXDOMAIN, NO_ANSWER, NULL_MX, TIMEOUT, SERVFAIL)
+# Failures that may clear up on their own get the shortest TTL
+TRANSIENT_FAILURES = (TIMEOUT, SERVFAIL)
+
+CacheEntry = Tuple[List[str], float, Optional[str], Optional[float]]  # (records, timestamp, failure, ttl)
+
+# Per-entry bytes not covered by sys.getsizeof of key/records (tuple, dict slots, size bookkeeping)
+ENTRY_OVERHEAD = 200
 
 
 class MXCache:
     """
-    Simple in-memory cache for MX records with TTL.
+    Bounded, thread-safe LRU cache for MX records with TTL.
+
+    Size is capped by entry count and by approximate memory; the least
+    recently used entries are evicted first. Expired entries are removed
+    when read and by an optional background sweeper (start_sweeper()).
+
+    With a store, memory misses are read through from disk (keeping the
+    entry's original timestamp, so the TTL is unchanged) and every set() is
+    written through.
+
+    Each entry keeps its own TTL: the DNS answer's TTL clamped to
+    [min_ttl, max_ttl], or `ttl` when the answer has none. With a refresher,
+    a hit in the last (1 - refresh_ahead) of an entry's lifetime asks for a
+    background refresh, so hot domains are renewed before they expire and
+    lookups on them never wait for DNS.
+
+    DNS failures are cached too (set_failure), as entries with no records:
+    NXDOMAIN / NoAnswer / null MX use negative_ttl, timeouts and SERVFAIL
+    use the shorter transient_ttl.
 
     Usage:
         cache = MXCache(ttl=3600)  # 1 hour TTL
+        cache = MXCache(ttl=3600, store=MXCacheStore("./mx_cache.db"))  # + disk tier
         records = cache.get("example.com")
         if records is None:
             records = fetch_from_dns("example.com")
             cache.set("example.com", records)
     """
 
-    def __init__(self, ttl: int = 3600):
+    def __init__(
+        self,
+        ttl: int = 3600,
+        store: Optional[MXCacheStore] = None,
+        negative_ttl: int = 600,
+        transient_ttl: int = 60,
+        max_entries: int = 100000,
+        max_bytes: int = 64 * 1024 * 1024,
+        min_ttl: int = 300,
+        max_ttl: int = 86400,
+        refresh_ahead: float = 0.8,
+        refresher: Optional[Callable[[str], None]] = None
+    ):
         """
         Initialize cache.
 
         Args:
-            ttl: Time to live in seconds (default: 1 hour)
+            ttl: Time to live in seconds when the DNS answer has none (default: 1 hour)
+            store: Optional disk tier shared across processes and restarts
+            negative_ttl: TTL for NXDOMAIN / NoAnswer / null MX entries
+            transient_ttl: TTL for timeout / SERVFAIL entries
+            max_entries: Max cached domains (0 = unbounded)
+            max_bytes: Max approximate memory of the entries (0 = unbounded)
+            min_ttl: Lower clamp for TTLs taken from DNS answers
+            max_ttl: Upper clamp for TTLs taken from DNS answers
+            refresh_ahead: Share of an entry's lifetime after which a hit triggers a refresh (>= 1 disables)
+            refresher: Called with a domain to refresh it in the background
+                (it must not block; the new answer comes back through set())
         """
         self.ttl = ttl
-        self._cache: Dict[str, Tuple[List[str], float]] = {}
+        self.store = store
+        self.negative_ttl = negative_ttl
+        self.transient_ttl = transient_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.refresh_ahead = refresh_ahead
+        self.refresher = refresher
+        self._refreshing: Set[str] = set()
+        self._refreshes = 0
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()  # LRU order, most recent last
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
         self._hits = 0
         self._misses = 0
+        self._disk_hits = 0
+        self._negative_hits = {failure: 0 for failure in FAILURES}
+        self._evictions = 0
+        self._expired = 0
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+
+    def _ttl_for(self, failure: Optional[str]) -> int:
+        if failure is None:
+            return self.ttl
+        if failure in TRANSIENT_FAILURES:
+            return self.transient_ttl
+        return self.negative_ttl
+
+    def _entry_ttl(self, entry: CacheEntry) -> float:
+        # Entries without a TTL (older disk rows) use the defaults
+        return entry[3] if entry[3] is not None else self._ttl_for(entry[2])
+
+    def _is_expired(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry[1] > self._entry_ttl(entry)
+
+    def _clamp_ttl(self, ttl: Optional[float]) -> float:
+        if ttl is None:
+            return self.ttl
+        return min(max(ttl, self.min_ttl), self.max_ttl)
+
+    @staticmethod
+    def _entry_size(domain: str, records: List[str]) -> int:
+        """Approximate memory of one entry (key, record strings, containers)."""
+        return (
+            ENTRY_OVERHEAD
+            + sys.getsizeof(domain)
+            + sys.getsizeof(records)
+            + sum(sys.getsizeof(record) for record in records)
+        )
+
+    def _insert(self, domain: str, entry: CacheEntry) -> None:
+        """Add or replace an entry as most recently used, then evict (caller holds the lock)."""
+        self._remove(domain)
+        size = self._entry_size(domain, entry[0])
+        self._cache[domain] = entry
+        self._sizes[domain] = size
+        self._bytes += size
+
+        while self._cache and (
+            (self.max_entries and len(self._cache) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._cache))
+            self._remove(oldest)
+            self._evictions += 1
+
+    def _remove(self, domain: str) -> bool:
+        """Drop an entry if present (caller holds the lock)."""
+        if self._cache.pop(domain, None) is None:
+            return False
+        self._bytes -= self._sizes.pop(domain, 0)
+        return True
+
+    def _lookup(self, domain: str) -> Optional[CacheEntry]:
+        """Unexpired entry for a normalized domain, from memory or disk (no stats)."""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(domain)
+            if entry is not None:
+                if self._is_expired(entry, now):
+                    # Expired - remove from cache
+                    self._remove(domain)
+                    self._expired += 1
+                    return None
+                self._cache.move_to_end(domain)
+                self._maybe_refresh(domain, entry, now)
+                return entry
+
+        if self.store is None:
+            return None
+
+        # Memory miss - another worker or a previous run may have stored it
+        entry = self.store.get(domain)
+        if entry is None or self._is_expired(entry, now):
+            return None
+        with self._lock:
+            self._insert(domain, entry)
+            self._disk_hits += 1
+            self._maybe_refresh(domain, entry, now)
+        return entry
+
+    def _maybe_refresh(self, domain: str, entry: CacheEntry, now: float) -> None:
+        """Ask for a background refresh of an entry close to expiry (caller holds the lock)."""
+        if (
+            self.refresher is None
+            or entry[2] is not None  # Negative entries just expire
+            or domain in self._refreshing
+            or now - entry[1] < self._entry_ttl(entry) * self.refresh_ahead
+        ):
+            return
+        self._refreshing.add(domain)
+        self._refreshes += 1
+        try:
+            self.refresher(domain)
+        except Exception:
+            self._refreshing.discard(domain)
+
+    def refresh_failed(self, domain: str) -> None:
+        """
+        Report a failed background refresh: the current entry is kept until it
+        expires, and a later hit may ask again.
+        """
+        with self._lock:
+            self._refreshing.discard(domain.lower().strip())
 
     def get(self, domain: str) -> Optional[List[str]]:
         """
@@ -38,76 +225,301 @@ class MXCache:
             domain: Domain name
 
         Returns:
-            List of MX records or None if not in cache or expired
+            List of MX records ([] for a cached DNS failure, see failure_reason())
+            or None if not in cache or expired
         """
-        domain = domain.lower().strip()
+        entry = self._lookup(domain.lower().strip())
 
-        if domain not in self._cache:
-            self._misses += 1
-            return None
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
 
-        records, timestamp = self._cache[domain]
-        age = time.time() - timestamp
+            records, _, failure, _ = entry
+            self._hits += 1
+            if failure is not None:
+                self._negative_hits[failure] += 1
+        return records
 
-        if age > self.ttl:
-            # Expired - remove from cache
-            del self._cache[domain]
-            self._misses += 1
-            return None
+    def failure_reason(self, domain: str) -> Optional[str]:
+        """
+        Why a domain has no MX records (does not count as a cache access).
 
-        self._hits += 1
-        return records
+        Returns:
+            One of FAILURES, or None if the domain has records or is not cached
+        """
+        entry = self._lookup(domain.lower().strip())
+        return entry[2] if entry is not None else None
 
-    def set(self, domain: str, records: List[str]) -> None:
+    def set(self, domain: str, records: List[str], ttl: Optional[float] = None) -> None:
         """
         Store MX records in cache.
 
         Args:
             domain: Domain name
             records: List of MX server hostnames
+            ttl: TTL of the DNS answer, clamped to [min_ttl, max_ttl] (default: self.ttl)
+        """
+        self._store(domain, records, None, self._clamp_ttl(ttl))
+
+    def set_failure(self, domain: str, failure: str) -> None:
         """
+        Store a DNS failure (negative entry).
+
+        Args:
+            domain: Domain name
+            failure: One of FAILURES
+        """
+        if failure not in FAILURES:
+            raise ValueError(f"Unknown DNS failure: {failure}")
+        self._store(domain, [], failure, self._ttl_for(failure))
+
+    def _store(self, domain: str, records: List[str], failure: Optional[str], ttl: float) -> None:
         domain = domain.lower().strip()
-        self._cache[domain] = (records, time.time())
+        timestamp = time.time()
+        with self._lock:
+            self._insert(domain, (records, timestamp, failure, ttl))
+            self._refreshing.discard(domain)
+        if self.store is not None:
+            self.store.set(domain, records, timestamp, failure, ttl)
 
     def clear(self) -> None:
-        """Clear all cached records."""
-        self._cache.clear()
-        self._hits = 0
-        self._misses = 0
+        """Clear all cached records (both tiers)."""
+        with self._lock:
+            self._cache.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._disk_hits = 0
+            self._negative_hits = {failure: 0 for failure in FAILURES}
+            self._evictions = 0
+            self._expired = 0
+            self._refreshes = 0
+            self._refreshing.clear()
+        if self.store is not None:
+            self.store.clear()
 
-    def stats(self) -> Dict:
+    def stats(self, include_store: bool = True) -> Dict:
         """
         Get cache statistics.
 
+        Args:
+            include_store: Also query the disk/shared tier (blocking I/O);
+                False reports in-memory counters only
+
         Returns:
-            Dict with hits, misses, hit_rate, and size
+            Dict with hits, misses, hit_rate, size, eviction counters and
+            negative entries/hits per failure
         """
-        total = self._hits + self._misses
-        hit_rate = (self._hits / total * 100) if total > 0 else 0
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            negative_entries = {failure: 0 for failure in FAILURES}
+            for _, _, failure, _ in self._cache.values():
+                if failure is not None:
+                    negative_entries[failure] += 1
 
-        return {
-            "hits": self._hits,
-            "misses": self._misses,
-            "hit_rate": f"{hit_rate:.1f}%",
-            "cached_domains": len(self._cache),
-            "ttl_seconds": self.ttl
-        }
+            stats = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": f"{hit_rate:.1f}%",
+                "cached_domains": len(self._cache),
+                "ttl_seconds": self.ttl,
+                "approx_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "expired_removed": self._expired,
+                "negative_entries": negative_entries,
+                "negative_hits": dict(self._negative_hits),
+                "negative_ttl_seconds": self.negative_ttl,
+                "transient_ttl_seconds": self.transient_ttl,
+                "min_ttl_seconds": self.min_ttl,
+                "max_ttl_seconds": self.max_ttl,
+                "refreshes": self._refreshes,
+                "refreshing": len(self._refreshing),
+                "disk_hits": self._disk_hits
+            }
+        stats["persistent"] = self.store.stats() if include_store and self.store is not None else None
+        return stats
 
     def cleanup_expired(self) -> int:
         """
-        Remove expired entries from cache.
+        Remove expired entries from memory (use compact() for the disk tier).
 
         Returns:
             Number of entries removed
         """
         now = time.time()
-        expired = [
-            domain
-            for domain, (_, timestamp) in self._cache.items()
-            if now - timestamp > self.ttl
-        ]
+        with self._lock:
+            expired = [
+                domain
+                for domain, entry in self._cache.items()
+                if self._is_expired(entry, now)
+            ]
 
-        for domain in expired:
-            del self._cache[domain]
+            for domain in expired:
+                self._remove(domain)
+            self._expired += len(expired)
 
         return len(expired)
+
+    def start_sweeper(self, interval: float = 60, also_sweep: Tuple = ()) -> None:
+        """
+        Run cleanup_expired() every `interval` seconds in a daemon thread.
+
+        Args:
+            interval: Seconds between sweeps
+            also_sweep: Other caches (e.g. HostAddressCache) whose
+                cleanup_expired() runs on the same thread
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._sweeper_stop.clear()
+
+        def sweep():
+            while not self._sweeper_stop.wait(interval):
+                self.cleanup_expired()
+                for cache in also_sweep:
+                    cache.cleanup_expired()
+
+        self._sweeper = threading.Thread(target=sweep, name="mx-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Stop the sweeper thread (e.g. on shutdown)."""
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def compact(self, vacuum: bool = False) -> int:
+        """
+        Remove expired entries from both tiers.
+
+        Args:
+            vacuum: Also shrink the disk tier's file
+
+        Returns:
+            Number of disk entries removed
+        """
+        self.cleanup_expired()
+        if self.store is None:
+            return 0
+        return self.store.compact(
+            self.ttl,
+            negative_ttl=max(self.negative_ttl, self.transient_ttl),
+            vacuum=vacuum
+        )
+
+
+class HostAddressCache:
+    """
+    In-memory cache of MX host IP addresses with TTL and an LRU size cap.
+    Filled by the bulk DNS prefetch so SMTP connects skip the host lookup.
+    Expired entries are dropped on access and by cleanup_expired(), which
+    the MXCache sweeper runs alongside its own (see MXCache.start_sweeper).
+
+    Usage:
+        addresses = HostAddressCache(ttl=3600, max_entries=50000)
+        addresses.set("mx.example.com", ["192.0.2.10", "2001:db8::10"])
+        addresses.get("mx.example.com")  # "192.0.2.10" (first address)
+    """
+
+    def __init__(self, ttl: int = 3600, max_entries: int = 50000):
+        """
+        Initialize cache.
+
+        Args:
+            ttl: Time to live in seconds (default: 1 hour)
+            max_entries: Max cached hosts (0 = unbounded)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[List[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+
+    def _is_expired(self, entry: Tuple[List[str], float], now: float) -> bool:
+        return now - entry[1] > self.ttl
+
+    def get(self, host: str) -> Optional[str]:
+        """
+        Get the preferred address of a host if cached and not expired.
+
+        Returns:
+            IP address string, or None (connect by hostname)
+        """
+        host = host.lower().rstrip(".")
+        with self._lock:
+            entry = self._cache.get(host)
+            if entry is not None and self._is_expired(entry, time.time()):
+                del self._cache[host]
+                self._expired += 1
+                entry = None
+            if entry is None or not entry[0]:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(host)
+            self._hits += 1
+            return entry[0][0]
+
+    def has(self, host: str) -> bool:
+        """True if the host was resolved recently (does not count as an access)."""
+        with self._lock:
+            entry = self._cache.get(host.lower().rstrip("."))
+            return entry is not None and not self._is_expired(entry, time.time())
+
+    def set(self, host: str, addresses: List[str]) -> None:
+        """
+        Store a host's addresses (preferred first), evicting the least
+        recently used hosts beyond max_entries.
+
+        Args:
+            host: MX server hostname
+            addresses: IP addresses (empty if the host did not resolve)
+        """
+        host = host.lower().rstrip(".")
+        with self._lock:
+            self._cache.pop(host, None)
+            self._cache[host] = (addresses, time.time())
+            while self.max_entries and len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+
+    def cleanup_expired(self) -> int:
+        """
+        Remove expired entries.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [host for host, entry in self._cache.items() if self._is_expired(entry, now)]
+            for host in expired:
+                del self._cache[host]
+            self._expired += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with hits, misses, cached host count and eviction counters
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "cached_hosts": len(self._cache),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "expired_removed": self._expired,
+                "ttl_seconds": self.ttl
+            }
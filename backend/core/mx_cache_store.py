@@ -0,0 +1,190 @@
+"""
+Disk-backed second tier for MXCache.
+A small SQLite file shared by every worker process, so MX records survive
+restarts and one worker's DNS lookups benefit the others.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class MXCacheStore:
+    """
+    SQLite store of MX records (domain -> records, stored_at, failure, ttl).
+
+    The database is opened lazily on first use and runs in WAL mode so
+    several processes can read while one writes. Entries keep the time they
+    were stored, so TTLs are enforced exactly as in the memory tier.
+
+    Usage:
+        store = MXCacheStore("./mx_cache.db")
+        store.set("example.com", ["mx1.example.com"])
+        records, stored_at = store.get("example.com")
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """
+        Initialize store (no file access until first use).
+
+        Args:
+            path: SQLite database file
+            busy_timeout: Seconds to wait for another process's write lock
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._reads = 0
+        self._writes = 0
+        self._errors = 0
+        self._compacted = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and create the table (caller holds the lock)."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS mx_cache ("
+                "domain TEXT PRIMARY KEY, records TEXT NOT NULL, stored_at REAL NOT NULL, failure TEXT, ttl REAL)"
+            )
+            # Files written by older versions
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(mx_cache)")]
+            if "failure" not in columns:
+                conn.execute("ALTER TABLE mx_cache ADD COLUMN failure TEXT")
+            if "ttl" not in columns:
+                conn.execute("ALTER TABLE mx_cache ADD COLUMN ttl REAL")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, domain: str) -> Optional[Tuple[List[str], float, Optional[str], Optional[float]]]:
+        """
+        Read an entry.
+
+        Args:
+            domain: Domain name (already normalized)
+
+        Returns:
+            (records, stored_at, failure, ttl) or None if absent or the store is unavailable
+        """
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT records, stored_at, failure, ttl FROM mx_cache WHERE domain = ?", (domain,)
+                ).fetchone()
+                self._reads += 1
+        except sqlite3.Error:
+            self._errors += 1
+            return None
+
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2], row[3]
+
+    def set(
+        self,
+        domain: str,
+        records: List[str],
+        stored_at: Optional[float] = None,
+        failure: Optional[str] = None,
+        ttl: Optional[float] = None
+    ) -> None:
+        """
+        Write an entry through to disk (errors are counted, never raised).
+
+        Args:
+            domain: Domain name (already normalized)
+            records: List of MX server hostnames
+            stored_at: Store time (default: now)
+            failure: DNS failure for negative entries (records is then empty)
+            ttl: Entry TTL in seconds (default: the reader's defaults)
+        """
+        stored_at = stored_at if stored_at is not None else time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO mx_cache (domain, records, stored_at, failure, ttl) VALUES (?, ?, ?, ?, ?)",
+                    (domain, json.dumps(records), stored_at, failure, ttl)
+                )
+                conn.commit()
+                self._writes += 1
+        except sqlite3.Error:
+            self._errors += 1
+
+    def compact(self, ttl: float, negative_ttl: Optional[float] = None, vacuum: bool = False) -> int:
+        """
+        Delete expired entries (per-entry TTL when stored, else the defaults).
+
+        Args:
+            ttl: Default max age in seconds of entries with records
+            negative_ttl: Default max age of negative entries (default: ttl)
+            vacuum: Also give the freed pages back to the filesystem
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        negative_ttl = negative_ttl if negative_ttl is not None else ttl
+        try:
+            with self._lock:
+                conn = self._connect()
+                removed = conn.execute(
+                    "DELETE FROM mx_cache WHERE (ttl IS NOT NULL AND stored_at + ttl < ?) "
+                    "OR (ttl IS NULL AND failure IS NULL AND stored_at < ?) "
+                    "OR (ttl IS NULL AND failure IS NOT NULL AND stored_at < ?)",
+                    (now, now - ttl, now - negative_ttl)
+                ).rowcount
+                conn.commit()
+                if vacuum:
+                    conn.execute("VACUUM")
+        except sqlite3.Error:
+            self._errors += 1
+            return 0
+
+        self._compacted += removed
+        return removed
+
+    def clear(self) -> None:
+        """Delete every entry."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM mx_cache")
+                conn.commit()
+        except sqlite3.Error:
+            self._errors += 1
+
+    def close(self) -> None:
+        """Close the database connection (reopened on next use)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict:
+        """
+        Get store statistics.
+
+        Returns:
+            Dict with path, entry count and read/write/error counters
+        """
+        try:
+            with self._lock:
+                entries = self._connect().execute("SELECT COUNT(*) FROM mx_cache").fetchone()[0]
+        except sqlite3.Error:
+            self._errors += 1
+            entries = None
+
+        return {
+            "path": self.path,
+            "entries": entries,
+            "reads": self._reads,
+            "writes": self._writes,
+            "errors": self._errors,
+            "compacted": self._compacted
+        }
@@ -0,0 +1,165 @@
+"""
+Learned email-format priors.
+Counts which pattern template (first.last, flast...) produced confirmed
+addresses, per domain, per mail provider and overall, so the most likely
+pattern is verified first.
+"""
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import config
+
+# Template name -> local part builder, in the default (historical) priority order
+TEMPLATES = {
+    "first.last": lambda f, l: f"{f}.{l}",   # john.doe@
+    "firstlast": lambda f, l: f"{f}{l}",     # johndoe@
+    "f.last": lambda f, l: f"{f[0]}.{l}",    # j.doe@
+    "first.l": lambda f, l: f"{f}.{l[0]}",   # john.d@
+    "first": lambda f, l: f,                 # john@
+    "last": lambda f, l: l,                  # doe@
+    "flast": lambda f, l: f"{f[0]}{l}",      # jdoe@
+    "lastf": lambda f, l: f"{l}{f[0]}",      # doej@
+    "firstl": lambda f, l: f"{f}{l[0]}",     # johnd@
+}
+DEFAULT_ORDER = list(TEMPLATES)
+
+
+def template_of(email: str, first_variants: List[str], last_variants: List[str]) -> Optional[str]:
+    """
+    Find the template that produces an address for a given name.
+
+    Args:
+        email: Confirmed address
+        first_variants: First-name variants (see EmailFinder.normalize_name)
+        last_variants: Last-name variants
+
+    Returns:
+        Template name, or None if the address matches no template
+    """
+    local = email.split("@")[0].lower()
+    for first in first_variants:
+        for last in last_variants:
+            if not (first and last):
+                continue
+            for name, build in TEMPLATES.items():
+                if build(first, last) == local:
+                    return name
+    return None
+
+
+class PatternPriors:
+    """
+    Per-domain, per-provider and global counts of confirmed templates.
+
+    A domain with at least one confirmed address gets its own templates
+    first (most frequent first). Other templates follow in provider order
+    once the provider has min_samples hits, else in global order once that
+    has min_samples hits, else in DEFAULT_ORDER.
+
+    Usage:
+        priors = PatternPriors()
+        priors.record("example.com", "flast", provider="google")
+        priors.order("example.com")   # ["flast", "first.last", ...]
+    """
+
+    def __init__(self, min_samples: Optional[int] = None, max_domains: Optional[int] = None):
+        """
+        Initialize priors.
+
+        Args:
+            min_samples: Hits needed before provider/global counts reorder templates (default: from config)
+            max_domains: Max domains remembered, oldest dropped first (default: from config)
+        """
+        self.min_samples = min_samples if min_samples is not None else config.PATTERN_PRIORS_MIN_SAMPLES
+        self.max_domains = max_domains if max_domains is not None else config.PATTERN_PRIORS_MAX_DOMAINS
+
+        self._lock = threading.Lock()
+        self._domains: Dict[str, Counter] = {}
+        self._providers: Dict[str, Counter] = {}
+        self._global: Counter = Counter()
+        self._recorded = 0
+
+    def record(self, domain: str, template: str, provider: Optional[str] = None) -> None:
+        """
+        Count one confirmed address.
+
+        Args:
+            domain: Normalized domain
+            template: Template name (see TEMPLATES)
+            provider: Mail provider of the domain's MX (see PolitenessScheduler.provider_for_host)
+        """
+        if template not in TEMPLATES:
+            raise ValueError(f"Unknown pattern template: {template}")
+        domain = domain.lower()
+
+        with self._lock:
+            counts = self._domains.pop(domain, None) or Counter()
+            counts[template] += 1
+            self._domains[domain] = counts  # Re-insert: most recently confirmed last
+            if self.max_domains and len(self._domains) > self.max_domains:
+                del self._domains[next(iter(self._domains))]
+
+            if provider:
+                self._providers.setdefault(provider, Counter())[template] += 1
+            self._global[template] += 1
+            self._recorded += 1
+
+    def order(self, domain: str, provider: Optional[str] = None) -> List[str]:
+        """
+        Template names, most likely first, for a domain.
+
+        Args:
+            domain: Normalized domain
+            provider: Mail provider of the domain's MX, if known
+
+        Returns:
+            Every template name exactly once
+        """
+        with self._lock:
+            known = self._domains.get(domain.lower(), Counter())
+            fallback = self._providers.get(provider, Counter()) if provider else Counter()
+            if sum(fallback.values()) < self.min_samples:
+                fallback = self._global if sum(self._global.values()) >= self.min_samples else Counter()
+
+            def rank(name: str) -> Tuple[int, int, int]:
+                return -known[name], -fallback[name], DEFAULT_ORDER.index(name)
+
+            return sorted(DEFAULT_ORDER, key=rank)
+
+    def load(self, rows: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """
+        Record many (domain, template, provider) hits, e.g. from search history.
+
+        Returns:
+            Number of hits recorded
+        """
+        count = 0
+        for domain, template, provider in rows:
+            self.record(domain, template, provider)
+            count += 1
+        return count
+
+    def clear(self) -> None:
+        """Forget every count."""
+        with self._lock:
+            self._domains.clear()
+            self._providers.clear()
+            self._global.clear()
+            self._recorded = 0
+
+    def stats(self) -> Dict:
+        """
+        Get priors statistics.
+
+        Returns:
+            Dict with known domains, hit counts and the current global order
+        """
+        with self._lock:
+            return {
+                "domains": len(self._domains),
+                "providers": {provider: sum(counts.values()) for provider, counts in self._providers.items()},
+                "recorded": self._recorded,
+                "global": dict(self._global.most_common()),
+                "min_samples": self.min_samples
+            }
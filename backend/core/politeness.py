@@ -0,0 +1,211 @@
+"""
+Politeness scheduler: per-MX-host and per-provider token buckets.
+Replaces global sleeps, so checks against different providers run at full
+concurrency while each host still sees a bounded RCPT rate.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from config import config
+
+
+class TokenBucket:
+    """
+    Token bucket with reservation semantics.
+
+    reserve() takes the tokens immediately (the balance may go negative) and
+    returns how long the caller must wait before using them, so concurrent
+    callers are spaced out without holding a lock while they sleep.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        """
+        Initialize bucket (starts full).
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity
+        """
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Take tokens from the bucket.
+
+        Returns:
+            Seconds to wait before the tokens may be used (0 if available now)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def slow_down(self, factor: float, min_rate: float) -> None:
+        """Cut the rate (multiplicative decrease) and empty the bucket."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.rate * factor, min_rate)
+            self._tokens = min(self._tokens, 0)
+
+    def recover(self, step: float) -> None:
+        """Move the rate back towards base_rate (additive increase)."""
+        with self._lock:
+            if self.rate < self.base_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.rate + step, self.base_rate)
+
+
+class PolitenessScheduler:
+    """
+    Rate limits RCPT commands per MX host and per mail provider.
+
+    Limits apply per outbound source IP: with a source address, the host and
+    provider buckets are that IP's own (providers throttle by sending IP).
+
+    Usage:
+        scheduler = PolitenessScheduler()
+        await scheduler.acquire("aspmx.l.google.com")       # waits if needed
+        code, message = await session.rcpt(email)
+        scheduler.report("aspmx.l.google.com", code)        # adapts to 421/450
+    """
+
+    def __init__(
+        self,
+        host_rate: Optional[float] = None,
+        host_burst: Optional[float] = None,
+        provider_rate: Optional[float] = None,
+        provider_burst: Optional[float] = None,
+        providers: Optional[Dict[str, str]] = None
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            host_rate: RCPTs per second per MX host (default: from config)
+            host_burst: Burst size per MX host (default: from config)
+            provider_rate: RCPTs per second per provider (default: from config)
+            provider_burst: Burst size per provider (default: from config)
+            providers: MX hostname suffix -> provider name (default: from config)
+        """
+        self.host_rate = host_rate or config.POLITENESS_HOST_RATE
+        self.host_burst = host_burst or config.POLITENESS_HOST_BURST
+        self.provider_rate = provider_rate or config.POLITENESS_PROVIDER_RATE
+        self.provider_burst = provider_burst or config.POLITENESS_PROVIDER_BURST
+        self.providers = providers if providers is not None else config.get_provider_suffixes()
+
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, TokenBucket] = {}
+        self._providers: Dict[str, TokenBucket] = {}
+
+        self._acquired = 0
+        self._delayed = 0
+        self._waited_seconds = 0.0
+        self._rate_limited = 0
+
+    def provider_for_host(self, mx_host: str) -> str:
+        """
+        Map an MX hostname to a provider name.
+
+        Known suffixes (e.g. mail.protection.outlook.com -> microsoft) come
+        from config; unknown hosts are grouped by their last two labels.
+        """
+        host = mx_host.lower().rstrip(".")
+        for suffix, provider in self.providers.items():
+            if host == suffix or host.endswith("." + suffix):
+                return provider
+        return ".".join(host.split(".")[-2:])
+
+    def _bucket(self, buckets: Dict[str, TokenBucket], key: str, rate: float, burst: float) -> TokenBucket:
+        with self._lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TokenBucket(rate, burst)
+            return bucket
+
+    def _buckets_for(self, mx_host: str, source: Optional[str] = None):
+        suffix = f"@{source}" if source else ""
+        host = self._bucket(self._hosts, mx_host.lower() + suffix, self.host_rate, self.host_burst)
+        provider = self._bucket(
+            self._providers, self.provider_for_host(mx_host) + suffix, self.provider_rate, self.provider_burst
+        )
+        return host, provider
+
+    async def acquire(self, mx_host: str, tokens: int = 1, source: Optional[str] = None) -> float:
+        """
+        Wait until `tokens` RCPTs may be sent to `mx_host`.
+
+        Args:
+            mx_host: MX server hostname
+            tokens: Number of RCPT commands about to be sent
+            source: Outbound source IP of the session (None: default address)
+
+        Returns:
+            Seconds waited
+        """
+        host_bucket, provider_bucket = self._buckets_for(mx_host, source)
+        delay = max(host_bucket.reserve(tokens), provider_bucket.reserve(tokens))
+
+        self._acquired += 1
+        if delay > 0:
+            self._delayed += 1
+            self._waited_seconds += delay
+            await asyncio.sleep(delay)
+        return delay
+
+    def report(self, mx_host: str, code: int, source: Optional[str] = None) -> None:
+        """
+        Feed an SMTP reply code back into the scheduler.
+
+        Rate-limit style replies (421/450/451 by default) halve the host and
+        provider rates (of that source IP); other replies slowly restore them.
+        """
+        host_bucket, provider_bucket = self._buckets_for(mx_host, source)
+        if code in config.POLITENESS_RATE_LIMIT_CODES:
+            self._rate_limited += 1
+            host_bucket.slow_down(config.POLITENESS_BACKOFF_FACTOR, config.POLITENESS_MIN_RATE)
+            provider_bucket.slow_down(config.POLITENESS_BACKOFF_FACTOR, config.POLITENESS_MIN_RATE)
+        elif code:
+            host_bucket.recover(self.host_rate * config.POLITENESS_RECOVERY_STEP)
+            provider_bucket.recover(self.provider_rate * config.POLITENESS_RECOVERY_STEP)
+
+    def stats(self) -> Dict:
+        """
+        Get scheduler statistics.
+
+        Returns:
+            Dict with tracked hosts/providers, wait counters and throttled hosts
+        """
+        with self._lock:
+            throttled = {
+                host: round(bucket.rate, 3)
+                for host, bucket in self._hosts.items()
+                if bucket.rate < bucket.base_rate
+            }
+            hosts = len(self._hosts)
+            providers = len(self._providers)
+
+        return {
+            "hosts": hosts,
+            "providers": providers,
+            "acquired": self._acquired,
+            "delayed": self._delayed,
+            "waited_seconds": round(self._waited_seconds, 3),
+            "rate_limited_replies": self._rate_limited,
+            "throttled_hosts": throttled,
+            "host_rate": self.host_rate,
+            "provider_rate": self.provider_rate
+        }
@@ -0,0 +1,275 @@
+"""
+Per-MX-host pool of warm SMTP sessions.
+Keeps EHLO'd connections open between lookups so shared MX front ends
+(Google Workspace, Microsoft 365...) don't pay a new handshake per lookup.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from config import config
+from core.smtp_session import AsyncSMTPSession
+
+PoolKey = Tuple[str, Optional[str]]  # (mx_host, source_address)
+
+
+class SMTPPool:
+    """
+    Pool of AsyncSMTPSession keyed by MX host and source IP.
+
+    Sessions are bound to the event loop that opened them, so idle sessions
+    are only handed out to callers running on the same loop. A caller that
+    hits max_sessions_per_host while another loop's session sits idle closes
+    that session and opens its own in its slot.
+
+    Usage:
+        pool = SMTPPool("vps.auraia.ch", "verify@vps.auraia.ch")
+        session = await pool.acquire("mx.example.com")
+        try:
+            code, message = await session.rcpt("john.doe@example.com")
+        finally:
+            await pool.release(session)
+    """
+
+    def __init__(
+        self,
+        helo_hostname: str,
+        from_email: str,
+        max_sessions_per_host: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        max_recipients_per_session: Optional[int] = None,
+        health_check_after: Optional[float] = None,
+        address_lookup: Optional[Callable[[str], Optional[str]]] = None,
+        helo_hostnames: Optional[Dict[str, str]] = None
+    ):
+        """
+        Initialize pool.
+
+        Args:
+            helo_hostname: Hostname announced in EHLO
+            from_email: Envelope sender for MAIL FROM
+            max_sessions_per_host: Open sessions (idle + in use) per key (default: from config)
+            idle_timeout: Seconds before an idle session is closed (default: from config)
+            max_recipients_per_session: Lifetime RCPTs before a session is retired (default: from config)
+            health_check_after: Idle seconds after which a NOOP is sent before reuse (default: from config)
+            address_lookup: Returns a pre-resolved IP for an MX host, or None to connect by name
+            helo_hostnames: EHLO hostname per source address (others announce helo_hostname)
+        """
+        self.helo_hostname = helo_hostname
+        self.from_email = from_email
+        self.max_sessions_per_host = max_sessions_per_host or config.SMTP_POOL_MAX_SESSIONS_PER_HOST
+        self.idle_timeout = idle_timeout if idle_timeout is not None else config.SMTP_POOL_IDLE_TIMEOUT
+        self.max_recipients_per_session = max_recipients_per_session or config.SMTP_POOL_MAX_RECIPIENTS_PER_SESSION
+        self.health_check_after = (
+            health_check_after if health_check_after is not None else config.SMTP_POOL_HEALTH_CHECK_AFTER
+        )
+
+        self.address_lookup = address_lookup
+        self.helo_hostnames = helo_hostnames or {}
+
+        self._lock = threading.Lock()
+        self._idle: Dict[PoolKey, List[Tuple[AsyncSMTPSession, float]]] = {}
+        self._open: Dict[PoolKey, int] = {}
+        self._waiters: Dict[PoolKey, Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+
+        self._created = 0
+        self._reused = 0
+        self._evicted = 0
+        self._health_check_failures = 0
+
+    async def acquire(self, mx_host: str, source_address: Optional[str] = None) -> AsyncSMTPSession:
+        """
+        Get a session for an MX host: a warm idle one if available, else a new
+        (lazily connected) one. Waits if the host is at max_sessions_per_host.
+
+        Args:
+            mx_host: MX server hostname
+            source_address: Local IP the session must be bound to
+
+        Returns:
+            AsyncSMTPSession to give back with release()
+        """
+        key = (mx_host, source_address)
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._close_sessions(self._pop_expired())
+
+            foreign = None
+            with self._lock:
+                session, idle_since = self._pop_idle(key, loop)
+                if session is None:
+                    if self._open.get(key, 0) < self.max_sessions_per_host:
+                        self._open[key] = self._open.get(key, 0) + 1
+                        self._created += 1
+                        return self._new_session(mx_host, source_address)
+                    # At the cap: an idle session of another loop is of no use
+                    # here, close it and take over its slot instead of waiting
+                    foreign = self._pop_foreign_idle(key, loop)
+                    if foreign is not None:
+                        self._created += 1
+                        self._evicted += 1
+                    else:
+                        waiter = loop.create_future()
+                        self._waiters.setdefault(key, deque()).append((loop, waiter))
+
+            if foreign is not None:
+                await self._close_sessions([foreign])
+                return self._new_session(mx_host, source_address)
+
+            if session is None:
+                await waiter
+                continue
+
+            if time.monotonic() - idle_since >= self.health_check_after and not await session.noop():
+                self._health_check_failures += 1
+                self._discard(key)
+                continue
+
+            self._reused += 1
+            return session
+
+    async def release(self, session: AsyncSMTPSession, reusable: bool = True) -> None:
+        """
+        Return a session to the pool.
+
+        Args:
+            session: Session obtained from acquire()
+            reusable: False to close it instead (e.g. after a connection error)
+        """
+        key = (session.mx_host, session.source_address)
+        retire = (
+            not reusable
+            or not session.connected
+            or session.recipients_total >= self.max_recipients_per_session
+            or self.idle_timeout <= 0
+        )
+
+        if retire:
+            await session.close()
+            self._discard(key)
+            return
+
+        # Next user starts a clean transaction (RSET sent lazily with its RCPTs)
+        session.new_transaction()
+        with self._lock:
+            self._idle.setdefault(key, []).append((session, time.monotonic()))
+            self._wake_waiter(key)
+
+    def _new_session(self, mx_host: str, source_address: Optional[str]) -> AsyncSMTPSession:
+        address = self.address_lookup(mx_host) if self.address_lookup else None
+        helo_hostname = self.helo_hostnames.get(source_address, self.helo_hostname)
+        return AsyncSMTPSession(
+            mx_host, helo_hostname, self.from_email, source_address=source_address, address=address
+        )
+
+    def _pop_idle(self, key: PoolKey, loop: asyncio.AbstractEventLoop) -> Tuple[Optional[AsyncSMTPSession], float]:
+        """Most recently used idle session owned by `loop` (caller holds the lock)."""
+        idle = self._idle.get(key, [])
+        for i in range(len(idle) - 1, -1, -1):
+            session, idle_since = idle[i]
+            if session.loop is loop:
+                del idle[i]
+                return session, idle_since
+        return None, 0.0
+
+    def _pop_foreign_idle(self, key: PoolKey, loop: asyncio.AbstractEventLoop) -> Optional[AsyncSMTPSession]:
+        """Least recently used idle session owned by another loop (caller holds the lock)."""
+        idle = self._idle.get(key, [])
+        for i, (session, _) in enumerate(idle):
+            if session.loop is not loop:
+                del idle[i]
+                return session
+        return None
+
+    def _discard(self, key: PoolKey) -> None:
+        """Forget one open session for `key` and let a waiter take its slot."""
+        with self._lock:
+            self._open[key] = max(self._open.get(key, 0) - 1, 0)
+            self._wake_waiter(key)
+
+    def _wake_waiter(self, key: PoolKey) -> None:
+        """Wake the oldest waiter on `key`, whichever loop it runs on (caller holds the lock)."""
+        waiters = self._waiters.get(key)
+        while waiters:
+            loop, waiter = waiters.popleft()
+            if not waiter.done():
+                loop.call_soon_threadsafe(lambda w=waiter: w.done() or w.set_result(None))
+                return
+
+    def _pop_expired(self) -> List[AsyncSMTPSession]:
+        """Remove idle sessions past idle_timeout and return them for closing."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = []
+                for session, idle_since in idle:
+                    if now - idle_since > self.idle_timeout or not session.connected:
+                        expired.append(session)
+                        self._open[key] = max(self._open.get(key, 0) - 1, 0)
+                        self._wake_waiter(key)
+                    else:
+                        keep.append((session, idle_since))
+                self._idle[key] = keep
+            self._evicted += len(expired)
+        return expired
+
+    async def _close_sessions(self, sessions: List[AsyncSMTPSession]) -> None:
+        """QUIT sessions owned by the current loop, abort the others on theirs."""
+        loop = asyncio.get_running_loop()
+        for session in sessions:
+            if session.loop is loop or session.loop is None:
+                await session.close()
+            elif not session.loop.is_closed():
+                session.loop.call_soon_threadsafe(session.abort)
+
+    async def evict_idle(self) -> int:
+        """
+        Close idle sessions past idle_timeout.
+
+        Returns:
+            Number of sessions closed
+        """
+        expired = self._pop_expired()
+        await self._close_sessions(expired)
+        return len(expired)
+
+    async def close_all(self) -> None:
+        """Close every idle session (e.g. on shutdown)."""
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session, _ in idle]
+            for key, idle in self._idle.items():
+                self._open[key] = max(self._open.get(key, 0) - len(idle), 0)
+            self._idle.clear()
+        await self._close_sessions(sessions)
+
+    def stats(self) -> Dict:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dict with open/idle session counts, reuse counters and limits
+        """
+        with self._lock:
+            open_sessions = sum(self._open.values())
+            idle_sessions = sum(len(idle) for idle in self._idle.values())
+            hosts = sum(1 for count in self._open.values() if count > 0)
+
+        total = self._created + self._reused
+        reuse_rate = (self._reused / total * 100) if total > 0 else 0
+
+        return {
+            "hosts": hosts,
+            "open_sessions": open_sessions,
+            "idle_sessions": idle_sessions,
+            "created": self._created,
+            "reused": self._reused,
+            "reuse_rate": f"{reuse_rate:.1f}%",
+            "evicted": self._evicted,
+            "health_check_failures": self._health_check_failures,
+            "max_sessions_per_host": self.max_sessions_per_host,
+            "idle_timeout_seconds": self.idle_timeout
+        }
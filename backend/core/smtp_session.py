@@ -0,0 +1,428 @@
+"""
+Reusable SMTP session for recipient verification.
+Connects once per MX host (EHLO + MAIL FROM), then checks many RCPT TO on the same session.
+
+SMTPSession is the blocking smtplib version, AsyncSMTPSession the asyncio one
+used by the async verification engine.
+"""
+import asyncio
+import smtplib
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+
+# 452 4.5.3 "Too many recipients" - per-transaction/session recipient limit reached
+RECIPIENT_LIMIT_CODES = (452,)
+# 421 Service not available, closing transmission channel
+SESSION_CLOSED_CODES = (421,)
+
+
+class SMTPSession:
+    """
+    One SMTP conversation with an MX host, reused for several RCPT TO checks.
+
+    The connection is opened lazily on the first rcpt() and re-opened only
+    when the server drops it or refuses more recipients.
+
+    Usage:
+        with SMTPSession("mx.example.com", "vps.auraia.ch", "verify@vps.auraia.ch") as session:
+            code, message = session.rcpt("john.doe@example.com")
+            code, message = session.rcpt("jdoe@example.com")
+    """
+
+    def __init__(
+        self,
+        mx_host: str,
+        helo_hostname: str,
+        from_email: str,
+        timeout: Optional[int] = None,
+        max_recipients: Optional[int] = None,
+        source_address: Optional[str] = None
+    ):
+        """
+        Initialize session (does not connect yet).
+
+        Args:
+            mx_host: MX server hostname
+            helo_hostname: Hostname announced in EHLO
+            from_email: Envelope sender for MAIL FROM
+            timeout: Socket timeout in seconds (default: from config)
+            max_recipients: RCPTs per transaction before RSET (default: from config)
+            source_address: Local IP to bind outbound connections to (default: OS choice)
+        """
+        self.mx_host = mx_host
+        self.helo_hostname = helo_hostname
+        self.from_email = from_email
+        self.timeout = timeout or config.SMTP_TIMEOUT
+        self.max_recipients = max_recipients or config.SMTP_SESSION_MAX_RECIPIENTS
+        self.source_address = source_address
+        self.connections = 0  # Number of TCP+EHLO handshakes performed
+        self._server: Optional[smtplib.SMTP] = None
+        self._recipients = 0  # RCPTs sent in the current transaction
+
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+
+    def connect(self) -> None:
+        """Open connection, EHLO and start a transaction with MAIL FROM."""
+        source = (self.source_address, 0) if self.source_address else None
+        server = smtplib.SMTP(timeout=self.timeout, source_address=source)
+        server.set_debuglevel(0)
+        server.connect(self.mx_host, config.SMTP_PORT)
+        self._server = server
+        self.connections += 1
+        server.ehlo(self.helo_hostname)
+        self._begin_transaction()
+
+    def _begin_transaction(self) -> None:
+        self._server.mail(self.from_email)
+        self._recipients = 0
+
+    def reset(self) -> None:
+        """RSET the current transaction and issue a fresh MAIL FROM."""
+        self._server.rset()
+        self._begin_transaction()
+
+    def reconnect(self) -> None:
+        """Drop the current connection and open a new one."""
+        self.close()
+        self.connect()
+
+    def rcpt(self, email: str) -> Tuple[int, bytes]:
+        """
+        Send RCPT TO for one address on this session.
+
+        Reconnects if the server dropped the session, and resets (then
+        reconnects) if it enforces a recipient limit.
+
+        Args:
+            email: Recipient address to check
+
+        Returns:
+            Tuple of (smtp_code, message)
+        """
+        if not self.connected:
+            self.connect()
+        elif self._recipients >= self.max_recipients:
+            self.reset()
+
+        try:
+            code, message = self._server.rcpt(email)
+        except smtplib.SMTPServerDisconnected:
+            # Server closed an idle/used session - one fresh attempt
+            self.reconnect()
+            code, message = self._server.rcpt(email)
+
+        if code in RECIPIENT_LIMIT_CODES:
+            # Limit hit: new transaction first, new connection if that is not enough
+            self.reset()
+            code, message = self._server.rcpt(email)
+            if code in RECIPIENT_LIMIT_CODES:
+                self.reconnect()
+                code, message = self._server.rcpt(email)
+        elif code in SESSION_CLOSED_CODES:
+            self.reconnect()
+            code, message = self._server.rcpt(email)
+
+        self._recipients += 1
+        return code, message
+
+    def close(self) -> None:
+        """QUIT and forget the connection (errors are ignored)."""
+        server, self._server = self._server, None
+        self._recipients = 0
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "SMTPSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class AsyncSMTPSession:
+    """
+    Asyncio counterpart of SMTPSession: same reuse/reconnect rules, but every
+    command is awaited with its own timeout so a slow MX never blocks the loop.
+
+    Usage:
+        async with AsyncSMTPSession("mx.example.com", "vps.auraia.ch", "verify@vps.auraia.ch") as session:
+            code, message = await session.rcpt("john.doe@example.com")
+    """
+
+    def __init__(
+        self,
+        mx_host: str,
+        helo_hostname: str,
+        from_email: str,
+        timeout: Optional[int] = None,
+        command_timeout: Optional[int] = None,
+        max_recipients: Optional[int] = None,
+        source_address: Optional[str] = None,
+        address: Optional[str] = None
+    ):
+        """
+        Initialize session (does not connect yet).
+
+        Args:
+            mx_host: MX server hostname
+            helo_hostname: Hostname announced in EHLO
+            from_email: Envelope sender for MAIL FROM
+            timeout: Connect timeout in seconds (default: from config)
+            command_timeout: Per-command reply timeout in seconds (default: from config)
+            max_recipients: RCPTs per transaction before RSET (default: from config)
+            source_address: Local IP to bind outbound connections to (default: OS choice)
+            address: Pre-resolved IP of mx_host (default: resolve mx_host on connect)
+        """
+        self.mx_host = mx_host
+        self.address = address
+        self.helo_hostname = helo_hostname
+        self.from_email = from_email
+        self.timeout = timeout or config.SMTP_TIMEOUT
+        self.command_timeout = command_timeout or config.SMTP_COMMAND_TIMEOUT
+        self.max_recipients = max_recipients or config.SMTP_SESSION_MAX_RECIPIENTS
+        self.source_address = source_address
+        self.connections = 0  # Number of TCP+EHLO handshakes performed
+        self.recipients_total = 0  # RCPTs sent over the session's lifetime
+        self.extensions: Dict[str, str] = {}  # EHLO keywords -> parameters
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # Loop owning the streams
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._recipients = 0  # RCPTs sent in the current transaction
+        self._needs_reset = False  # RSET + MAIL FROM before the next RCPT
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    @property
+    def supports_pipelining(self) -> bool:
+        """True if the server advertised PIPELINING (RFC 2920) in its EHLO reply."""
+        return "PIPELINING" in self.extensions
+
+    async def connect(self) -> None:
+        """Open connection, read greeting, EHLO and start a transaction."""
+        local_addr = (self.source_address, 0) if self.source_address else None
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.address or self.mx_host, config.SMTP_PORT, local_addr=local_addr),
+            timeout=self.timeout
+        )
+        self.loop = asyncio.get_running_loop()
+        self.connections += 1
+
+        code, message = await self._read_reply()
+        if code != 220:
+            self.abort()
+            raise smtplib.SMTPConnectError(code, message)
+
+        code, message = await self.command(f"EHLO {self.helo_hostname}")
+        if code == 250:
+            self.extensions = self._parse_extensions(message)
+        else:
+            # Very old servers: plain HELO, no extensions
+            self.extensions = {}
+            await self.command(f"HELO {self.helo_hostname}")
+
+        await self._begin_transaction()
+
+    @staticmethod
+    def _parse_extensions(message: bytes) -> Dict[str, str]:
+        extensions = {}
+        # First line is the server greeting, the rest are keywords
+        for line in message.decode("ascii", errors="ignore").splitlines()[1:]:
+            keyword, _, params = line.strip().partition(" ")
+            if keyword:
+                extensions[keyword.upper()] = params
+        return extensions
+
+    async def _read_reply(self) -> Tuple[int, bytes]:
+        """Read a (possibly multi-line) reply."""
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self._reader.readline(), timeout=self.command_timeout)
+            if not line:
+                self.abort()
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            try:
+                code = int(line[:3])
+            except ValueError:
+                self.abort()
+                raise smtplib.SMTPResponseException(-1, line.strip())
+            lines.append(line[4:].strip())
+            if line[3:4] != b"-":
+                return code, b"\n".join(lines)
+
+    async def command(self, line: str) -> Tuple[int, bytes]:
+        """Send one command line and await its reply."""
+        if not self.connected:
+            raise smtplib.SMTPServerDisconnected("Not connected")
+        self._writer.write(line.encode("utf-8") + b"\r\n")
+        await asyncio.wait_for(self._writer.drain(), timeout=self.command_timeout)
+        return await self._read_reply()
+
+    async def _begin_transaction(self) -> None:
+        await self.command(f"MAIL FROM:<{self.from_email}>")
+        self._recipients = 0
+        self._needs_reset = False
+
+    def new_transaction(self) -> None:
+        """Start a fresh transaction before the next RCPT (sent lazily, with it)."""
+        if self.connected:
+            self._needs_reset = True
+
+    async def noop(self) -> bool:
+        """NOOP health check. Returns False (and drops the connection) if it fails."""
+        try:
+            code, _ = await self.command("NOOP")
+        except Exception:
+            self.abort()
+            return False
+        if code != 250:
+            self.abort()
+            return False
+        return True
+
+    async def reset(self) -> None:
+        """RSET the current transaction and issue a fresh MAIL FROM."""
+        await self.command("RSET")
+        await self._begin_transaction()
+
+    async def reconnect(self) -> None:
+        """Drop the current connection and open a new one."""
+        await self.close()
+        await self.connect()
+
+    async def rcpt(self, email: str) -> Tuple[int, bytes]:
+        """
+        Send RCPT TO for one address on this session.
+
+        Reconnects if the server dropped the session, and resets (then
+        reconnects) if it enforces a recipient limit.
+
+        Args:
+            email: Recipient address to check
+
+        Returns:
+            Tuple of (smtp_code, message)
+        """
+        if not self.connected:
+            await self.connect()
+        elif self._needs_reset or self._recipients >= self.max_recipients:
+            await self.reset()
+
+        try:
+            code, message = await self.command(f"RCPT TO:<{email}>")
+        except smtplib.SMTPServerDisconnected:
+            # Server closed an idle/used session - one fresh attempt
+            await self.reconnect()
+            code, message = await self.command(f"RCPT TO:<{email}>")
+
+        if code in RECIPIENT_LIMIT_CODES:
+            # Limit hit: new transaction first, new connection if that is not enough
+            await self.reset()
+            code, message = await self.command(f"RCPT TO:<{email}>")
+            if code in RECIPIENT_LIMIT_CODES:
+                await self.reconnect()
+                code, message = await self.command(f"RCPT TO:<{email}>")
+        elif code in SESSION_CLOSED_CODES:
+            await self.reconnect()
+            code, message = await self.command(f"RCPT TO:<{email}>")
+
+        self._recipients += 1
+        self.recipients_total += 1
+        return code, message
+
+    async def rcpt_many(self, emails: List[str]) -> List[Tuple[int, bytes]]:
+        """
+        Send RCPT TO for several addresses, replies returned in the same order.
+
+        With PIPELINING (RFC 2920) all commands of a transaction go out in one
+        write and the replies are read back in order, so a whole batch costs
+        one round trip. Without it, falls back to sequential rcpt() calls.
+
+        Args:
+            emails: Recipient addresses to check
+
+        Returns:
+            List of (smtp_code, message), one per address
+        """
+        if not self.connected:
+            await self.connect()
+        if not self.supports_pipelining:
+            return [await self.rcpt(email) for email in emails]
+
+        replies = []
+        remaining = list(emails)
+        while remaining:
+            lines = []
+            budget = self.max_recipients - self._recipients
+            if self._needs_reset or budget <= 0:
+                # RSET + MAIL FROM travel in the same write as the RCPTs
+                lines = ["RSET", f"MAIL FROM:<{self.from_email}>"]
+                budget = self.max_recipients
+            chunk, remaining = remaining[:budget], remaining[budget:]
+            lines += [f"RCPT TO:<{email}>" for email in chunk]
+
+            self._writer.write(b"".join(line.encode("utf-8") + b"\r\n" for line in lines))
+            await asyncio.wait_for(self._writer.drain(), timeout=self.command_timeout)
+
+            chunk_replies = []
+            try:
+                for _ in range(len(lines) - len(chunk)):
+                    await self._read_reply()  # RSET / MAIL FROM
+                if len(lines) > len(chunk):
+                    self._recipients = 0
+                    self._needs_reset = False
+                for _ in chunk:
+                    chunk_replies.append(await self._read_reply())
+            except smtplib.SMTPServerDisconnected:
+                pass  # Unanswered addresses are retried one by one below
+            self._recipients += len(chunk_replies)
+            self.recipients_total += len(chunk_replies)
+
+            for i, email in enumerate(chunk):
+                code, message = chunk_replies[i] if i < len(chunk_replies) else (None, b"")
+                if code is None or code in RECIPIENT_LIMIT_CODES or code in SESSION_CLOSED_CODES:
+                    # Server limit lower than ours, or session dropped: rcpt() resets/reconnects
+                    code, message = await self.rcpt(email)
+                replies.append((code, message))
+
+        return replies
+
+    def abort(self) -> None:
+        """Close the transport immediately without QUIT."""
+        writer, self._writer, self._reader = self._writer, None, None
+        self._recipients = 0
+        self._needs_reset = False
+        if writer is not None:
+            writer.close()
+
+    async def close(self) -> None:
+        """QUIT and forget the connection (errors are ignored)."""
+        if not self.connected:
+            return
+        writer = self._writer
+        try:
+            await self.command("QUIT")
+        except Exception:
+            pass
+        self.abort()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), timeout=self.command_timeout)
+        except Exception:
+            pass
+
+    async def __aenter__(self) -> "AsyncSMTPSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
@@ -0,0 +1,214 @@
+"""
+Pool of outbound source addresses for SMTP connections.
+Each local IP announces its own EHLO hostname, has its own RCPT budget and
+keeps its own block/greylist statistics, so throughput per provider grows
+with the number of IPs and a blocked IP is set aside instead of burning
+every lookup.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import config
+from core.politeness import TokenBucket
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+STRATEGIES = (ROUND_ROBIN, LEAST_LOADED)
+
+# Temporary replies typical of greylisting / per-IP throttling
+GREYLIST_CODES = (450, 451)
+RATE_LIMIT_CODES = (421,)
+# Permanent rejections of the connecting IP (not of the recipient)
+BLOCK_KEYWORDS = (
+    "blocked", "blacklist", "blocklist", "spamhaus", "spamcop", "barracuda", "rbl",
+    "reputation", "banned", "client host rejected", "access denied", "poor reputation"
+)
+
+
+def is_block_reply(code: int, message: str) -> bool:
+    """True if an SMTP reply rejects the sending IP rather than the address."""
+    if not 500 <= code < 600:
+        return False
+    message = message.lower()
+    return any(keyword in message for keyword in BLOCK_KEYWORDS)
+
+
+class SourceAddress:
+    """One outbound IP: EHLO hostname, RCPT budget, load and reply statistics."""
+
+    def __init__(self, address: str, helo_hostname: str, rate: float, burst: float):
+        self.address = address
+        self.helo_hostname = helo_hostname
+        self.bucket = TokenBucket(rate, burst)
+        self.in_use = 0  # Sessions currently bound to this IP
+        self.selected = 0
+        self.rcpts = 0
+        self.greylisted = 0
+        self.rate_limited = 0
+        self.blocked = 0
+        self.last_block: Optional[str] = None
+        self.cooldown_until = 0.0  # monotonic time until which the IP is avoided
+
+    def stats(self) -> Dict:
+        return {
+            "helo_hostname": self.helo_hostname,
+            "in_use": self.in_use,
+            "selected": self.selected,
+            "rcpts": self.rcpts,
+            "greylisted": self.greylisted,
+            "rate_limited": self.rate_limited,
+            "blocked": self.blocked,
+            "last_block": self.last_block,
+            "cooling_down": self.cooldown_until > time.monotonic()
+        }
+
+
+class SourcePool:
+    """
+    Selects the local address (and EHLO hostname) of each outbound session.
+
+    Addresses are picked round-robin or least-loaded (fewest sessions in
+    use). An address whose replies show it is blocked (5xx naming a
+    blocklist, reputation...) is skipped for block_cooldown seconds, unless
+    every address is cooling down.
+
+    Without configured addresses the pool is empty: select() returns None
+    and sessions leave from the OS default address with SMTP_HOSTNAME.
+
+    Usage:
+        pool = SourcePool({"127.0.0.2": "mx1.test", "127.0.0.3": "mx2.test"})
+        source = pool.select()
+        session = await smtp_pool.acquire(mx_host, source.address)
+        await pool.acquire(source.address)        # per-IP RCPT budget
+        code, message = await session.rcpt(email)
+        pool.report(source.address, code, message)
+        pool.release(source.address)
+    """
+
+    def __init__(
+        self,
+        sources: Optional[Dict[str, str]] = None,
+        strategy: Optional[str] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        block_cooldown: Optional[float] = None
+    ):
+        """
+        Initialize pool.
+
+        Args:
+            sources: Source IP -> EHLO hostname (default: from config)
+            strategy: "round_robin" or "least_loaded" (default: from config)
+            rate: RCPTs per second per IP (default: from config)
+            burst: Burst size per IP (default: from config)
+            block_cooldown: Seconds a blocked IP is avoided (default: from config)
+        """
+        sources = sources if sources is not None else config.get_source_addresses()
+        self.strategy = strategy or config.SMTP_SOURCE_STRATEGY
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown source selection strategy: {self.strategy}")
+        self.rate = rate or config.SMTP_SOURCE_RATE
+        self.burst = burst or config.SMTP_SOURCE_BURST
+        self.block_cooldown = block_cooldown if block_cooldown is not None else config.SMTP_SOURCE_BLOCK_COOLDOWN
+
+        self._lock = threading.Lock()
+        self._sources: Dict[str, SourceAddress] = {
+            address: SourceAddress(address, helo_hostname, self.rate, self.burst)
+            for address, helo_hostname in sources.items()
+        }
+        self._order: List[SourceAddress] = list(self._sources.values())
+        self._next = 0
+        self.hostnames = {source.address: source.helo_hostname for source in self._order}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def helo_for(self, address: Optional[str], default: str) -> str:
+        """EHLO hostname of a source address (default for unknown / None)."""
+        source = self._sources.get(address) if address else None
+        return source.helo_hostname if source else default
+
+    def select(self) -> Optional[SourceAddress]:
+        """
+        Pick the address of the next session and count it as in use
+        (give it back with release()).
+
+        Returns:
+            SourceAddress, or None if no addresses are configured
+        """
+        if not self._order:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            candidates = [source for source in self._order if source.cooldown_until <= now] or self._order
+            if self.strategy == LEAST_LOADED:
+                source = min(candidates, key=lambda s: (s.in_use, s.selected))
+            else:
+                # Round robin over the whole list, skipping addresses that are cooling down
+                for _ in range(len(self._order)):
+                    source = self._order[self._next % len(self._order)]
+                    self._next += 1
+                    if source in candidates:
+                        break
+            source.in_use += 1
+            source.selected += 1
+            return source
+
+    def release(self, address: Optional[str]) -> None:
+        """A session bound to address was closed or returned to the SMTP pool."""
+        source = self._sources.get(address) if address else None
+        if source is not None:
+            with self._lock:
+                source.in_use = max(0, source.in_use - 1)
+
+    async def acquire(self, address: Optional[str], tokens: int = 1) -> float:
+        """
+        Wait until `tokens` RCPTs may be sent from address.
+
+        Returns:
+            Seconds waited
+        """
+        source = self._sources.get(address) if address else None
+        if source is None:
+            return 0.0
+        delay = source.bucket.reserve(tokens)
+        source.rcpts += tokens
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def report(self, address: Optional[str], code: int, message: str = "") -> None:
+        """
+        Feed a reply received on address into its statistics.
+
+        A block reply puts the address in cooldown so the next sessions leave
+        from the other addresses. (Greylisting / 421 backoff is applied per
+        host and source IP by the politeness scheduler.)
+        """
+        source = self._sources.get(address) if address else None
+        if source is None or not code:
+            return
+        if code in GREYLIST_CODES:
+            source.greylisted += 1
+        elif code in RATE_LIMIT_CODES:
+            source.rate_limited += 1
+        elif is_block_reply(code, message):
+            source.blocked += 1
+            source.last_block = f"{code} {message}"[:200]
+            source.cooldown_until = time.monotonic() + self.block_cooldown
+
+    def stats(self) -> Dict:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dict with the strategy and per-address load, budget and reply counters
+        """
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "rate": self.rate,
+                "addresses": {source.address: source.stats() for source in self._order}
+            }
@@ -0,0 +1,228 @@
+"""
+Email-level verification result cache.
+Repeat checks of an address reuse the last SMTP verdict instead of a new
+RCPT conversation.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from core.cache_backend import CacheBackend, NS_VERDICTS
+
+# Outcomes
+VALID = "valid"        # 250 / 251
+INVALID = "invalid"    # 5xx (e.g. 550 user unknown)
+TEMPFAIL = "tempfail"  # 4xx (greylisting, rate limiting...)
+
+OUTCOMES = (VALID, INVALID, TEMPFAIL)
+
+# (outcome, code, mx_host, log, timestamp)
+VerdictEntry = Tuple[str, int, str, str, float]
+
+
+def outcome_for_code(code: int) -> Optional[str]:
+    """Map an SMTP reply code to an outcome (None: not cacheable, e.g. connection error)."""
+    if code in (250, 251):
+        return VALID
+    if 500 <= code < 600:
+        return INVALID
+    if 400 <= code < 500:
+        return TEMPFAIL
+    return None
+
+
+class VerdictCache:
+    """
+    Bounded, thread-safe LRU cache of RCPT verdicts keyed by normalized address.
+
+    Each outcome has its own TTL: long for definitive answers (250 / 5xx),
+    short for temporary failures (4xx). Connection errors are not cached.
+    With a backend, memory misses are read through from the shared tier
+    (other workers' verdicts) and every set() is written through.
+
+    Usage:
+        cache = VerdictCache(valid_ttl=604800, invalid_ttl=604800, tempfail_ttl=900)
+        cached = cache.get("John.Doe@example.com")   # (is_valid, log, code, mx_host) or None
+        if cached is None:
+            is_valid, log, code = verify(...)
+            cache.set("john.doe@example.com", code, "mx.example.com", log)
+    """
+
+    def __init__(
+        self,
+        valid_ttl: int = 604800,
+        invalid_ttl: int = 604800,
+        tempfail_ttl: int = 900,
+        max_entries: int = 200000,
+        backend: Optional[CacheBackend] = None
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            valid_ttl: TTL in seconds for accepted addresses (250/251)
+            invalid_ttl: TTL in seconds for rejected addresses (5xx)
+            tempfail_ttl: TTL in seconds for temporary failures (4xx)
+            max_entries: Max cached addresses (0 = unbounded)
+            backend: Optional tier shared across worker processes
+        """
+        self.ttls = {VALID: valid_ttl, INVALID: invalid_ttl, TEMPFAIL: tempfail_ttl}
+        self.max_entries = max_entries
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, VerdictEntry]" = OrderedDict()  # LRU order, most recent last
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._shared_hits = 0
+
+    @staticmethod
+    def normalize(email: str) -> str:
+        return email.strip().lower()
+
+    def get(self, email: str) -> Optional[Tuple[bool, str, int, str]]:
+        """
+        Get the cached verdict of an address if available and not expired.
+
+        Args:
+            email: Email address
+
+        Returns:
+            (is_valid, log_message, smtp_code, mx_host), or None
+        """
+        email = self.normalize(email)
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(email)
+            if entry is not None and now - entry[4] > self.ttls[entry[0]]:
+                # Expired - remove from cache
+                del self._cache[email]
+                entry = None
+            if entry is not None:
+                self._cache.move_to_end(email)
+                self._hits += 1
+
+        if entry is None:
+            # Memory miss - another worker may have verified it
+            entry = self._shared_get(email, now)
+            with self._lock:
+                if entry is None:
+                    self._misses += 1
+                    return None
+                self._insert(email, entry)
+                self._hits += 1
+                self._shared_hits += 1
+
+        outcome, code, mx_host, log, timestamp = entry
+        return outcome == VALID, f"{log} (cached {int(now - timestamp)}s ago)", code, mx_host
+
+    def _shared_get(self, email: str, now: float) -> Optional[VerdictEntry]:
+        """Unexpired entry from the shared tier, if any."""
+        if self.backend is None:
+            return None
+        value = self.backend.get(NS_VERDICTS, email)
+        if not value or value[0] not in self.ttls:
+            return None
+        entry = tuple(value)
+        if now - entry[4] > self.ttls[entry[0]]:
+            return None
+        return entry
+
+    def _insert(self, email: str, entry: VerdictEntry) -> None:
+        """Add or replace an entry as most recently used, then evict (caller holds the lock)."""
+        self._cache.pop(email, None)
+        self._cache[email] = entry
+        while self.max_entries and len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self._evictions += 1
+
+    def set(self, email: str, code: int, mx_host: str, log: str) -> bool:
+        """
+        Store the verdict of an RCPT.
+
+        Args:
+            email: Email address
+            code: SMTP reply code
+            mx_host: MX server that answered
+            log: Log line of the verification
+
+        Returns:
+            True if stored, False if the code is not cacheable
+        """
+        outcome = outcome_for_code(code)
+        if outcome is None:
+            return False
+
+        email = self.normalize(email)
+        entry = (outcome, code, mx_host, log, time.time())
+        with self._lock:
+            self._insert(email, entry)
+        if self.backend is not None:
+            self.backend.set(NS_VERDICTS, email, list(entry), self.ttls[outcome])
+        return True
+
+    def invalidate(self, email: str) -> None:
+        """Forget an address's verdict (both tiers)."""
+        email = self.normalize(email)
+        with self._lock:
+            self._cache.pop(email, None)
+        if self.backend is not None:
+            self.backend.delete(NS_VERDICTS, email)
+
+    def clear(self) -> None:
+        """Clear all cached verdicts (both tiers)."""
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._shared_hits = 0
+        if self.backend is not None:
+            self.backend.clear(NS_VERDICTS)
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict with hits, misses, hit_rate, size, per-outcome counts and TTLs
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            outcomes = {outcome: 0 for outcome in OUTCOMES}
+            for entry in self._cache.values():
+                outcomes[entry[0]] += 1
+
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": f"{hit_rate:.1f}%",
+                "cached_addresses": len(self._cache),
+                "outcomes": outcomes,
+                "evictions": self._evictions,
+                "shared_hits": self._shared_hits,
+                "max_entries": self.max_entries,
+                "ttl_seconds": dict(self.ttls)
+            }
+
+    def cleanup_expired(self) -> int:
+        """
+        Remove expired entries from cache.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [
+                email
+                for email, (outcome, _, _, _, timestamp) in self._cache.items()
+                if now - timestamp > self.ttls[outcome]
+            ]
+
+            for email in expired:
+                del self._cache[email]
+
+        return len(expired)
@@ -1,8 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, create_engine
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, LargeBinary, ForeignKey, Index, and_, create_engine, event, inspect, or_
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import base64
+import json
 import os
+import zlib
+
+from config import config
+from core.logger import StructuredLogger
+
+logger = StructuredLogger("database", json_format=False)
 
 Base = declarative_base()
 
@@ -21,21 +30,251 @@ class SearchHistory(Base):
     email = Column(String(255), nullable=True)
     catch_all = Column(Boolean, default=False)
     
-    # Additional info
-    patterns_tested = Column(Text)  # JSON string
-    mx_records = Column(Text)  # JSON string
-    smtp_logs = Column(Text)  # JSON string
+    # Additional info (patterns, MX records and SMTP logs live in SearchTranscript)
+    mx_host = Column(String(255), nullable=True)  # First MX record
     debug_info = Column(String(500), nullable=True)
     error_message = Column(String(500), nullable=True)
 
+    transcript = relationship("SearchTranscript", uselist=False, cascade="all, delete-orphan")
+
+    # Keyset pagination on (created_at, id), see query_history_page()
+    __table_args__ = (Index("ix_search_history_created_at_id", "created_at", "id"),)
+
+class SearchTranscript(Base):
+    __tablename__ = "search_transcripts"
+
+    history_id = Column(Integer, ForeignKey("search_history.id"), primary_key=True)
+    payload = Column(LargeBinary)  # zlib-compressed JSON: patternsTested, mxRecords, smtpLogs
+
+class BulkJob(Base):
+    __tablename__ = "bulk_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    status = Column(String(20), default="queued", index=True)  # queued | running | completed | stopped | failed
+    source = Column(String(255))  # Uploaded filename or "json"
+    fresh = Column(Boolean, default=False)  # Bypass cached verdicts
+
+    # Progress counters
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    found = Column(Integer, default=0)
+    errors = Column(Integer, default=0)
+    error_message = Column(String(500), nullable=True)
+
+class BulkJobItem(Base):
+    __tablename__ = "bulk_job_items"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(32), ForeignKey("bulk_jobs.id"), index=True)
+    row_index = Column(Integer)
+
+    # Request data
+    domain = Column(String(255))
+    full_name = Column(String(255))
+
+    # Result (status stays "pending" until processed, "skipped" if the job stopped)
+    status = Column(String(50), default="pending", index=True)
+    email = Column(String(255), nullable=True)
+    catch_all = Column(Boolean, default=False)
+    debug_info = Column(String(500), nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./email_finder.db")
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+def configure_sqlite(engine) -> None:
+    """
+    Apply SQLite pragmas on every new connection: WAL journal (readers and
+    the writer no longer block each other), synchronous level and busy timeout.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config.DB_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={config.DB_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+def pack_transcript(patterns_tested, mx_records, smtp_logs) -> bytes:
+    """Compress a lookup transcript for SearchTranscript.payload."""
+    return zlib.compress(json.dumps({
+        "patternsTested": patterns_tested or [],
+        "mxRecords": mx_records or [],
+        "smtpLogs": smtp_logs or []
+    }).encode())
+
+def unpack_transcript(payload) -> Dict:
+    """Inverse of pack_transcript() (empty lists if there is no transcript)."""
+    if not payload:
+        return {"patternsTested": [], "mxRecords": [], "smtpLogs": []}
+    return json.loads(zlib.decompress(payload))
+
+def build_history_entry(domain: str, full_name: str, result) -> SearchHistory:
+    """Build a SearchHistory row (and its compressed transcript) from an EmailFinderResponse."""
+    return SearchHistory(
+        domain=domain,
+        full_name=full_name,
+        status=result.status,
+        email=result.email,
+        catch_all=result.catchAll,
+        mx_host=result.mxRecords[0] if result.mxRecords else None,
+        debug_info=result.debugInfo,
+        error_message=result.errorMessage,
+        transcript=SearchTranscript(
+            payload=pack_transcript(result.patternsTested, result.mxRecords, result.smtpLogs)
+        )
+    )
+
+def iter_confirmed_searches(db):
+    """
+    Yield (domain, full_name, email, mx_host) for every pattern-matched valid search.
+    Direct checks are skipped: on a catch-all server they prove nothing about the format.
+    """
+    rows = db.query(SearchHistory.domain, SearchHistory.full_name, SearchHistory.email, SearchHistory.mx_host)\
+        .filter(SearchHistory.status == "valid", SearchHistory.debug_info.like("%| Match:%"))\
+        .order_by(SearchHistory.id)\
+        .yield_per(1000)
+    for row in rows:
+        yield tuple(row)
+
+# Columns returned by the history list (no transcript)
+HISTORY_LIST_COLUMNS = (
+    SearchHistory.id, SearchHistory.created_at, SearchHistory.domain, SearchHistory.full_name,
+    SearchHistory.status, SearchHistory.email, SearchHistory.catch_all, SearchHistory.mx_host,
+    SearchHistory.debug_info, SearchHistory.error_message
+)
+
+def encode_history_cursor(created_at: datetime, history_id: int) -> str:
+    """Opaque cursor for the row after which the next page starts."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{history_id}".encode()).decode()
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Inverse of encode_history_cursor().
+
+    Raises:
+        ValueError: Malformed cursor
+    """
+    try:
+        created_at, history_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(history_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def query_history_page(
+    db,
+    limit: int,
+    cursor: Optional[str] = None,
+    since_id: Optional[int] = None
+) -> Tuple[List, Optional[str]]:
+    """
+    One page of history, most recent first, loading only HISTORY_LIST_COLUMNS.
+
+    Args:
+        db: SQLAlchemy session
+        limit: Max rows
+        cursor: Continue after this cursor (from a previous page)
+        since_id: Only rows with a greater id (delta polling)
+
+    Returns:
+        (rows, cursor of the next page or None if this is the last one)
+
+    Raises:
+        ValueError: Malformed cursor
+    """
+    query = db.query(*HISTORY_LIST_COLUMNS)
+    if cursor:
+        created_at, history_id = decode_history_cursor(cursor)
+        query = query.filter(or_(
+            SearchHistory.created_at < created_at,
+            and_(SearchHistory.created_at == created_at, SearchHistory.id < history_id)
+        ))
+    if since_id is not None:
+        query = query.filter(SearchHistory.id > since_id)
+
+    rows = query.order_by(SearchHistory.created_at.desc(), SearchHistory.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_history_cursor(rows[-1].created_at, rows[-1].id)
+
+def _migrate_legacy_transcripts(bind, batch_size: int = 1000) -> int:
+    """
+    Move JSON transcripts stored inline by older releases into search_transcripts.
+    The legacy columns are emptied (VACUUM reclaims the space). Each batch is
+    committed on its own, so an interrupted migration resumes where it stopped;
+    rows whose JSON does not decode are logged and left as they are.
+
+    Args:
+        bind: Engine (not a connection: batches open their own transactions)
+        batch_size: Rows per transaction
+
+    Returns:
+        Number of rows moved
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            rows = conn.exec_driver_sql(
+                "SELECT id, patterns_tested, mx_records, smtp_logs FROM search_history "
+                "WHERE id > ? AND (patterns_tested IS NOT NULL OR mx_records IS NOT NULL OR smtp_logs IS NOT NULL) "
+                f"ORDER BY id LIMIT {int(batch_size)}",
+                (last_id,)
+            ).fetchall()
+            if not rows:
+                return moved
+            for history_id, patterns_tested, mx_records, smtp_logs in rows:
+                last_id = history_id
+                try:
+                    mx_hosts = json.loads(mx_records) if mx_records else []
+                    payload = pack_transcript(
+                        json.loads(patterns_tested) if patterns_tested else [],
+                        mx_hosts,
+                        json.loads(smtp_logs) if smtp_logs else []
+                    )
+                except (ValueError, TypeError) as e:
+                    logger.warning("Legacy transcript not migrated", history_id=history_id, error=str(e))
+                    continue
+                conn.exec_driver_sql(
+                    "INSERT OR IGNORE INTO search_transcripts (history_id, payload) VALUES (?, ?)",
+                    (history_id, payload)
+                )
+                conn.exec_driver_sql(
+                    "UPDATE search_history SET mx_host = ?, patterns_tested = NULL, mx_records = NULL, "
+                    "smtp_logs = NULL WHERE id = ?",
+                    (mx_hosts[0] if mx_hosts else None, history_id)
+                )
+                moved += 1
+
+def init_db(bind=None):
+    """Initialize database tables (and migrate databases from older releases)"""
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    # Columns added after the first release (create_all does not alter tables)
+    columns = {table: [column["name"] for column in inspect(bind).get_columns(table)]
+               for table in ("bulk_jobs", "search_history")}
+    with bind.begin() as conn:
+        if "fresh" not in columns["bulk_jobs"]:
+            conn.exec_driver_sql("ALTER TABLE bulk_jobs ADD COLUMN fresh BOOLEAN DEFAULT 0")
+        if "mx_host" not in columns["search_history"]:
+            conn.exec_driver_sql("ALTER TABLE search_history ADD COLUMN mx_host VARCHAR(255)")
+    if "smtp_logs" in columns["search_history"]:
+        _migrate_legacy_transcripts(bind)
+    # Indexes added after the table was created
+    for index in SearchHistory.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
 
 def get_db():
     """Dependency for getting database session"""
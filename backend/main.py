@@ -1,23 +1,65 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
 import json
 import platform
 from datetime import datetime
 
 from models import EmailFinderRequest, CheckEmailRequest, EmailFinderResponse, BulkSearchJsonRequest
 from core.email_finder import EmailFinder
-from database import init_db, get_db, SearchHistory
+from core.jobs import JobManager
+from core.distributed import Coordinator
+from core.executor import ExecutorSaturated
+from core.history_writer import HistoryWriter
+from core.logger import StructuredLogger
+from core.bulk_upload import UploadFormatError, iter_upload_rows, read_upload_batch
+from database import (
+    init_db, get_db, SessionLocal, SearchHistory, iter_confirmed_searches, unpack_transcript,
+    query_history_page
+)
 from config import config
 
 app = FastAPI(title="Email Finder MVP")
+logger = StructuredLogger("api", json_format=False)
 
 # Initialize database on startup
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     init_db()
     print("Database initialized")
+    with SessionLocal() as db:
+        learned = sum(finder.learn_pattern(*row) for row in iter_confirmed_searches(db))
+    print(f"Pattern priors loaded ({learned} confirmed addresses)")
+    history_writer.start()
+    finder.mx_cache.start_sweeper(config.MX_CACHE_SWEEP_INTERVAL, also_sweep=(finder.host_addresses,))
+    if finder.mx_cache.store is not None:
+        removed = finder.mx_cache.compact()
+        print(f"MX cache disk tier compacted ({removed} expired entries removed)")
+    if coordinator is not None:
+        await coordinator.start()
+        print(f"Coordinator listening on {coordinator.address} (bulk jobs run on workers)")
+    resumed = job_manager.resume_pending()
+    if resumed:
+        print(f"Resumed {resumed} bulk job(s)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Unfinished jobs stay "running" in the database and resume on next startup
+    await job_manager.shutdown()
+    if coordinator is not None:
+        await coordinator.stop()
+    # Write buffered search history before exiting
+    history_writer.stop()
+    finder.executor.shutdown()
+    # QUIT pooled SMTP sessions instead of dropping them
+    await finder.smtp_pool.close_all()
+    finder.mx_cache.stop_sweeper()
+    if finder.mx_cache.store is not None:
+        finder.mx_cache.store.close()
 
 # CORS
 app.add_middleware(
@@ -29,6 +71,26 @@ app.add_middleware(
 )
 
 finder = EmailFinder()
+history_writer = HistoryWriter()
+# Distributed mode: bulk jobs are sharded to worker processes (python -m core.distributed)
+coordinator = Coordinator() if config.COORDINATOR_ADDRESS else None
+job_manager = JobManager(finder, history_writer=history_writer, coordinator=coordinator)
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+def require_capacity():
+    """
+    Reject new work with 503 while the blocking executor is full, instead of
+    queueing it behind running lookups (see BLOCKING_EXECUTOR_QUEUE).
+    """
+    if finder.executor.saturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": "1"}
+        )
 
 @app.get("/health")
 async def health_check():
@@ -40,8 +102,9 @@ async def health_check():
         # Check database connectivity (simplified for now)
         database_status = "ok"
 
-        # Get cache stats
-        cache_stats = finder.mx_cache.stats()
+        # Get cache stats (in-memory counters: liveness never waits on the shared/disk tier)
+        cache_stats = finder.mx_cache.stats(include_store=False)
+        pool_stats = finder.smtp_pool.stats()
 
         # System info
         import sys
@@ -63,12 +126,22 @@ async def health_check():
                 "hits": cache_stats["hits"],
                 "misses": cache_stats["misses"]
             },
+            "smtp_pool": pool_stats,
+            "politeness": finder.scheduler.stats(),
+            "sources": finder.sources.stats(),
+            "history_writer": history_writer.stats(),
+            "executor": finder.executor.stats(),
+            "coordinator": coordinator.stats() if coordinator is not None else None,
             "version": config.APP_VERSION,
             "config": {
                 "max_retries": config.SMTP_MAX_RETRIES,
                 "max_mx_servers": config.MAX_MX_SERVERS,
-                "rate_limit_delay": config.RATE_LIMIT_DELAY,
-                "mx_cache_ttl": config.MX_CACHE_TTL
+                "politeness_host_rate": config.POLITENESS_HOST_RATE,
+                "politeness_provider_rate": config.POLITENESS_PROVIDER_RATE,
+                "mx_cache_ttl": config.MX_CACHE_TTL,
+                "mx_cache_negative_ttl": config.MX_CACHE_NEGATIVE_TTL,
+                "catch_all_cache_positive_ttl": config.CATCH_ALL_CACHE_POSITIVE_TTL,
+                "catch_all_cache_negative_ttl": config.CATCH_ALL_CACHE_NEGATIVE_TTL
             },
             "system": system_info
         }
@@ -79,8 +152,8 @@ async def health_check():
             "error": str(e)
         }
 
-@app.post("/api/find-email", response_model=EmailFinderResponse)
-async def find_email(request: EmailFinderRequest, db: Session = Depends(get_db)):
+@app.post("/api/find-email", response_model=EmailFinderResponse, dependencies=[Depends(require_capacity)])
+async def find_email(request: EmailFinderRequest):
     if not request.domain:
         raise HTTPException(status_code=400, detail="Domain is required")
         
@@ -88,23 +161,10 @@ async def find_email(request: EmailFinderRequest, db: Session = Depends(get_db))
         raise HTTPException(status_code=400, detail="Full name is required")
 
     try:
-        result = finder.find_email(request.domain, request.fullName)
+        result = await finder.find_email_async(request.domain, request.fullName, request.fresh)
         
-        # Save to database
-        history_entry = SearchHistory(
-            domain=request.domain,
-            full_name=request.fullName,
-            status=result.status,
-            email=result.email,
-            catch_all=result.catchAll,
-            patterns_tested=json.dumps(result.patternsTested),
-            mx_records=json.dumps(result.mxRecords),
-            smtp_logs=json.dumps(result.smtpLogs),
-            debug_info=result.debugInfo,
-            error_message=result.errorMessage
-        )
-        db.add(history_entry)
-        db.commit()
+        # Save to database (batched, see history_writer)
+        await history_writer.put(request.domain, request.fullName, result)
         
         return result
     except Exception as e:
@@ -114,8 +174,8 @@ async def find_email(request: EmailFinderRequest, db: Session = Depends(get_db))
             debugInfo="Internal Server Error"
         )
 
-@app.post("/api/check-email", response_model=EmailFinderResponse)
-async def check_email(request: CheckEmailRequest, db: Session = Depends(get_db)):
+@app.post("/api/check-email", response_model=EmailFinderResponse, dependencies=[Depends(require_capacity)])
+async def check_email(request: CheckEmailRequest):
     """
     Check if a specific email address is valid.
     If invalid and fullName is provided, fallback to domain search.
@@ -131,30 +191,13 @@ async def check_email(request: CheckEmailRequest, db: Session = Depends(get_db))
         raise HTTPException(status_code=400, detail="Email is required")
 
     try:
-        result = finder.check_email(request.email, request.fullName)
+        result = await finder.check_email_async(request.email, request.fullName, request.fresh)
 
-        # Save to database
+        # Save to database (batched, see history_writer)
         # Extract domain from email for database record
         domain = request.email.split('@')[1] if '@' in request.email else "unknown"
-
-        history_entry = SearchHistory(
-            domain=domain,
-            full_name=request.fullName or request.email,  # Use email if no name provided
-            status=result.status,
-            email=result.email,
-            catch_all=result.catchAll,
-            patterns_tested=json.dumps(result.patternsTested),
-            mx_records=json.dumps(result.mxRecords),
-            smtp_logs=json.dumps(result.smtpLogs),
-            debug_info=result.debugInfo,
-            error_message=result.errorMessage
-        )
-        db.add(history_entry)
-        db.commit()
-
-        # Add 1s delay to respect rate limiting (same as find-email)
-        import time
-        time.sleep(1)
+        # Use email if no name provided
+        await history_writer.put(domain, request.fullName or request.email, result)
 
         return result
     except Exception as e:
@@ -168,264 +211,460 @@ async def check_email(request: CheckEmailRequest, db: Session = Depends(get_db))
 async def get_cache_stats():
     """
     Get MX cache statistics.
-    Returns hit rate and cached domains count.
+    Returns hit rate and cached domains count, plus catch-all verdict,
+    address verdict and learned pattern stats.
     """
-    return finder.mx_cache.stats()
+    # The disk/shared tier stats are blocking I/O: off the event loop
+    stats = await finder.executor.try_run(finder.mx_cache.stats)
+    stats["catch_all"] = finder.catch_all_cache.stats()
+    stats["verdicts"] = finder.verdict_cache.stats()
+    stats["pattern_priors"] = finder.pattern_priors.stats()
+    return stats
 
 @app.get("/api/history")
-async def get_history(limit: int = 50, db: Session = Depends(get_db)):
+async def get_history(
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    since_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
     """
     Get search history, ordered by most recent first.
-    Returns the last 50 searches by default.
+    Returns the last 50 searches by default (max HISTORY_MAX_PAGE_SIZE).
+    Transcripts (patterns, MX records, SMTP logs) are served by /api/history/{history_id}.
+
+    Paging: pass the X-Next-Cursor header of a page as ?cursor= for the next one.
+    Polling: ?since_id=<highest id seen> returns only newer searches, and
+    If-None-Match with the previous ETag returns 304 when nothing changed.
     """
+    limit = max(1, min(limit, config.HISTORY_MAX_PAGE_SIZE))
     try:
-        history = db.query(SearchHistory)\
-            .order_by(SearchHistory.created_at.desc())\
-            .limit(limit)\
-            .all()
-        
-        return [{
-            "id": h.id,
-            "date": h.created_at.isoformat(),
-            "request": {
-                "domain": h.domain,
-                "fullName": h.full_name
-            },
-            "status": h.status,
-            "email": h.email,
-            "catchAll": h.catch_all,
-            "patternsTested": json.loads(h.patterns_tested) if h.patterns_tested else [],
-            "mxRecords": json.loads(h.mx_records) if h.mx_records else [],
-            "smtpLogs": json.loads(h.smtp_logs) if h.smtp_logs else [],
-            "debugInfo": h.debug_info or "",
-            "errorMessage": h.error_message
-        } for h in history]
+        history, next_cursor = await finder.executor.try_run(query_history_page, db, limit, cursor, since_id)
+    except ExecutorSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@app.post("/api/bulk-search")
-async def bulk_search(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    # History rows are append-only: the ids bounding the page and its size version it
+    etag = f'W/"{history[0].id}-{history[-1].id}-{len(history)}"' if history else 'W/"0-0-0"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [{
+        "id": h.id,
+        "date": h.created_at.isoformat(),
+        "request": {
+            "domain": h.domain,
+            "fullName": h.full_name
+        },
+        "status": h.status,
+        "email": h.email,
+        "catchAll": h.catch_all,
+        "mxHost": h.mx_host,
+        "debugInfo": h.debug_info or "",
+        "errorMessage": h.error_message
+    } for h in history]
+
+def history_entry_detail(db: Session, history_id: int) -> Optional[dict]:
+    """Load one search with its transcript (blocking, run on the executor)."""
+    entry = db.get(SearchHistory, history_id)
+    if entry is None:
+        return None
+
+    return {
+        "id": entry.id,
+        "date": entry.created_at.isoformat(),
+        "request": {
+            "domain": entry.domain,
+            "fullName": entry.full_name
+        },
+        "status": entry.status,
+        "email": entry.email,
+        "catchAll": entry.catch_all,
+        "mxHost": entry.mx_host,
+        **unpack_transcript(entry.transcript.payload if entry.transcript else None),
+        "debugInfo": entry.debug_info or "",
+        "errorMessage": entry.error_message
+    }
+
+@app.get("/api/history/{history_id}")
+async def get_history_entry(history_id: int, db: Session = Depends(get_db)):
     """
-    Bulk email search from CSV/Excel file.
-    Expected columns: domain, fullName (or first_name, last_name, domain)
-    Returns list of search results.
+    Get one search with its full transcript (patterns tested, MX records, SMTP logs).
+    """
+    entry = await finder.executor.try_run(history_entry_detail, db, history_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="History entry not found")
+    return entry
+
+async def read_bulk_upload(file: UploadFile) -> AsyncIterator[List[Tuple[str, str]]]:
+    """
+    Parse an uploaded CSV/Excel file into batches of (domain, full_name) rows.
+    Expected columns: domain, fullName (or name, or first_name + last_name)
+    The file is read in a worker thread one batch (BULK_UPLOAD_BATCH_ROWS) at a
+    time as the search consumes it (see core.bulk_upload), never loaded whole.
+    The first batch is read up front, so HTTPException(400) is raised here on
+    unsupported files or missing columns.
     """
-    import pandas as pd
-    import time
-    from io import BytesIO
-    
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Determine file type and read with pandas
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(BytesIO(content))
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(BytesIO(content))
-        else:
-            raise HTTPException(status_code=400, detail="File must be CSV or Excel (.xlsx, .xls)")
-        
-        # Normalize column names to lowercase for case-insensitive matching
-        df.columns = df.columns.str.lower().str.strip()
-        
-        # Validate columns
-        if 'domain' not in df.columns:
-            raise HTTPException(status_code=400, detail="CSV must have 'domain' column")
-        
-        # Handle both fullname and first_name/last_name formats
-        if 'fullname' not in df.columns and 'name' not in df.columns:
-            if 'first_name' in df.columns and 'last_name' in df.columns:
-                df['fullname'] = df['first_name'] + ' ' + df['last_name']
-            else:
-                raise HTTPException(status_code=400, detail="CSV must have 'name', 'fullname', or 'first_name' + 'last_name' columns")
-        
-        # Rename 'name' to 'fullname' if it exists
-        if 'name' in df.columns and 'fullname' not in df.columns:
-            df['fullname'] = df['name']
-        
-        results = []
-        consecutive_errors = 0
-        MAX_CONSECUTIVE_ERRORS = 5  # Stop if 5 errors in a row (possible ban)
-        
-        # Process each row with 1s delay (CRITICAL: Politeness to avoid bans)
-        for index, row in df.iterrows():
-            domain = str(row['domain']).strip()
-            full_name = str(row['fullname']).strip()
-            
-            # Skip empty rows
-            if not domain or not full_name or domain == 'nan' or full_name == 'nan':
-                continue
-            
+        rows = iter_upload_rows(file.filename, file.file)
+        first = await run_in_threadpool(read_upload_batch, rows)
+    except UploadFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def batches() -> AsyncIterator[List[Tuple[str, str]]]:
+        batch = first
+        while batch:
+            yield batch
+            batch = await run_in_threadpool(read_upload_batch, rows)
+
+    return batches()
+
+async def row_batches(rows: List[Tuple[str, str]]) -> AsyncIterator[List[Tuple[str, str]]]:
+    """Rows already in memory (JSON requests) as a single batch."""
+    if rows:
+        yield rows
+
+MAX_CONSECUTIVE_ERRORS = 5  # Stop if 5 errors in a row (possible ban)
+
+def bulk_error_row(domain: str, full_name: str, error: Exception) -> dict:
+    """Result dict of a row whose lookup failed."""
+    error_msg = str(error)
+
+    # Check for ban indicators
+    if "blocked" in error_msg.lower() or "access denied" in error_msg.lower():
+        error_msg = f"⚠️ Possible ban detected: {error_msg}"
+
+    return {
+        "domain": domain,
+        "fullName": full_name,
+        "status": "error",
+        "email": None,
+        "catchAll": False,
+        "debugInfo": f"Error: {error_msg}"
+    }
+
+STOPPED_ROW = {
+    "domain": "STOPPED",
+    "fullName": "Processing halted",
+    "status": "error",
+    "email": None,
+    "catchAll": False,
+    "debugInfo": f"⛔ Stopped after {MAX_CONSECUTIVE_ERRORS} consecutive errors (possible ban or network issue)"
+}
+
+async def iter_bulk_search(
+    batches: AsyncIterator[List[Tuple[str, str]]],
+    fresh: bool = False
+) -> AsyncIterator[Tuple[Optional[int], dict]]:
+    """
+    Run a bulk search, one domain group at a time, yielding each row as soon as it is done.
+    Rows arrive in batches (an upload is read while earlier batches are searched).
+    MX records of a batch's domains are prefetched concurrently first, then rows
+    sharing a domain get a single MX lookup and catch-all probe.
+    Stops after MAX_CONSECUTIVE_ERRORS failed lookups in a row (possible ban); a
+    group whose lookup failed as a whole counts once, and each of its error rows
+    carries the input indexes of the whole group in "groupRows".
+    fresh=True ignores cached verdicts.
+    Yields (row index, result dict) in completion order, and (None, STOPPED row) if halted.
+    """
+    consecutive_errors = 0
+    offset = 0  # Index of the batch's first row in the whole input
+
+    async for rows in batches:
+        groups = finder.group_by_domain(rows)
+        # Resolve every distinct domain up front: DNS latency overlaps instead of adding up
+        await finder.prefetch_mx_records(list(groups))
+
+        # Politeness is enforced per MX host/provider by finder.scheduler
+        for group_domain, indices in groups.items():
             try:
-                # RÈGLE #1: Perform email search
-                result = finder.find_email(domain, full_name)
-                
-                # Reset error counter on success
-                consecutive_errors = 0
-                
-                # Save to database
-                history_entry = SearchHistory(
-                    domain=domain,
-                    full_name=full_name,
-                    status=result.status,
-                    email=result.email,
-                    catch_all=result.catchAll,
-                    patterns_tested=json.dumps(result.patternsTested),
-                    mx_records=json.dumps(result.mxRecords),
-                    smtp_logs=json.dumps(result.smtpLogs),
-                    debug_info=result.debugInfo,
-                    error_message=result.errorMessage
+                # RÈGLE #1: Perform email search for the whole group
+                group_results = await finder.find_emails_for_domain_async(
+                    group_domain, [rows[index][1] for index in indices], fresh
                 )
-                db.add(history_entry)
-                db.commit()
-                
-                # Add to results
-                results.append({
-                    "domain": domain,
-                    "fullName": full_name,
-                    "status": result.status,
-                    "email": result.email,
-                    "catchAll": result.catchAll,
-                    "debugInfo": result.debugInfo
-                })
-                
             except Exception as e:
                 # RÈGLE #2: Robust error handling - log error but CONTINUE
                 consecutive_errors += 1
-                error_msg = str(e)
-                
-                # Check for ban indicators
-                if "blocked" in error_msg.lower() or "access denied" in error_msg.lower():
-                    error_msg = f"⚠️ Possible ban detected: {error_msg}"
-                
-                results.append({
-                    "domain": domain,
-                    "fullName": full_name,
-                    "status": "error",
-                    "email": None,
-                    "catchAll": False,
-                    "debugInfo": f"Error: {error_msg}"
-                })
-                
+                group_rows = [offset + index for index in indices]
+                for index in indices:
+                    yield offset + index, {**bulk_error_row(*rows[index], e), "groupRows": group_rows}
+
                 # SAFETY: Stop if too many consecutive errors (likely ban or network issue)
                 if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
-                    results.append({
-                        "domain": "STOPPED",
-                        "fullName": "Processing halted",
-                        "status": "error",
-                        "email": None,
-                        "catchAll": False,
-                        "debugInfo": f"⛔ Stopped after {MAX_CONSECUTIVE_ERRORS} consecutive errors (possible ban or network issue)"
-                    })
-                    break
-            
-            finally:
-                # RÈGLE #1 (CRITICAL): Always sleep 1s between checks, even on error
-                # This is the PRIMARY anti-ban mechanism
-                time.sleep(1)
-        
-        return {"total": len(results), "results": results}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Bulk search error: {str(e)}")
+                    yield None, dict(STOPPED_ROW)
+                    return
+                continue
 
-@app.post("/api/bulk-search-json")
-async def bulk_search_json(request: BulkSearchJsonRequest, db: Session = Depends(get_db)):
-    """
-    Bulk email search from JSON (paste from spreadsheet).
-    Accepts list of {domain, fullName} objects.
-    Returns list of search results.
-    """
-    import time
+            for index, result in zip(indices, group_results):
+                domain, full_name = rows[index]
 
-    try:
-        results = []
-        consecutive_errors = 0
-        MAX_CONSECUTIVE_ERRORS = 5  # Stop if 5 errors in a row (possible ban)
+                try:
+                    # Save to database (batched, see history_writer)
+                    await history_writer.put(domain, full_name, result)
 
-        # Process each search with 1s delay (CRITICAL: Politeness to avoid bans)
-        for search in request.searches:
-            domain = search.domain.strip()
-            full_name = search.fullName.strip()
+                    # Reset error counter on success
+                    consecutive_errors = 0
 
-            # Skip empty entries
-            if not domain or not full_name:
-                continue
+                    yield offset + index, {
+                        "domain": domain,
+                        "fullName": full_name,
+                        "status": result.status,
+                        "email": result.email,
+                        "catchAll": result.catchAll,
+                        "debugInfo": result.debugInfo
+                    }
 
-            try:
-                # Perform email search
-                result = finder.find_email(domain, full_name)
-
-                # Reset error counter on success
-                consecutive_errors = 0
-
-                # Save to database
-                history_entry = SearchHistory(
-                    domain=domain,
-                    full_name=full_name,
-                    status=result.status,
-                    email=result.email,
-                    catch_all=result.catchAll,
-                    patterns_tested=json.dumps(result.patternsTested),
-                    mx_records=json.dumps(result.mxRecords),
-                    smtp_logs=json.dumps(result.smtpLogs),
-                    debug_info=result.debugInfo,
-                    error_message=result.errorMessage
-                )
-                db.add(history_entry)
-                db.commit()
-
-                # Add to results
-                results.append({
-                    "domain": domain,
-                    "fullName": full_name,
-                    "status": result.status,
-                    "email": result.email,
-                    "catchAll": result.catchAll,
-                    "debugInfo": result.debugInfo
-                })
+                except Exception as e:
+                    consecutive_errors += 1
+                    yield offset + index, bulk_error_row(domain, full_name, e)
 
-            except Exception as e:
-                # Robust error handling - log error but CONTINUE
-                consecutive_errors += 1
-                error_msg = str(e)
+                    # SAFETY: Stop if too many consecutive errors (likely ban or network issue)
+                    if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                        yield None, dict(STOPPED_ROW)
+                        return
 
-                # Check for ban indicators
-                if "blocked" in error_msg.lower() or "access denied" in error_msg.lower():
-                    error_msg = f"⚠️ Possible ban detected: {error_msg}"
+        offset += len(rows)
 
-                results.append({
-                    "domain": domain,
-                    "fullName": full_name,
-                    "status": "error",
-                    "email": None,
-                    "catchAll": False,
-                    "debugInfo": f"Error: {error_msg}"
-                })
+async def drain_history(context: str) -> bool:
+    """
+    Wait until the queued search history is written.
 
-                # SAFETY: Stop if too many consecutive errors (likely ban or network issue)
-                if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
-                    results.append({
-                        "domain": "STOPPED",
-                        "fullName": "Processing halted",
-                        "status": "error",
-                        "email": None,
-                        "catchAll": False,
-                        "debugInfo": f"⛔ Stopped after {MAX_CONSECUTIVE_ERRORS} consecutive errors (possible ban or network issue)"
-                    })
+    Args:
+        context: What is being finished, for the log
+
+    Returns:
+        False (and an error is logged) if rows are still unsaved
+    """
+    saved = await history_writer.drain()
+    if not saved:
+        logger.error("Search history not fully saved", context=context, queued=history_writer.depth)
+    return saved
+
+async def run_bulk_search(batches: AsyncIterator[List[Tuple[str, str]]], fresh: bool = False) -> dict:
+    """
+    Run a bulk search to completion (see iter_bulk_search).
+    Returns the response: result dicts in input order (plus a STOPPED row if
+    halted), and historySaved=false if the history could not be written.
+    """
+    results = {}
+    stopped = []
+    async for index, result in iter_bulk_search(batches, fresh):
+        if index is None:
+            stopped.append(result)
+        else:
+            results[index] = result
+    # The whole batch is in the history once the response is sent
+    history_saved = await drain_history("bulk search")
+    rows = [results[i] for i in sorted(results)] + stopped
+    return {"total": len(rows), "results": rows, "historySaved": history_saved}
+
+def stream_bulk_search(batches: AsyncIterator[List[Tuple[str, str]]], fresh: bool, fmt: str) -> StreamingResponse:
+    """
+    Stream a bulk search as NDJSON (one JSON object per line) or Server-Sent Events.
+
+    Events:
+        result: one finished row, with its input index in "row"
+        progress: counters, every BULK_STREAM_PROGRESS_EVERY rows and after
+            BULK_STREAM_HEARTBEAT_SECONDS without a result (keep-alive)
+        done: final counters (with "stopped": true if halted on errors and
+            "historySaved": false if the history could not be written)
+
+    Args:
+        batches: Batches of (domain, full_name) pairs ("total" counts the rows read so far)
+        fresh: Ignore cached verdicts
+        fmt: "ndjson" or "sse"
+    """
+    if fmt not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    def encode(event: str, data: dict) -> str:
+        if fmt == "sse":
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        return json.dumps({"type": event, **data}) + "\n"
+
+    async def events() -> AsyncIterator[str]:
+        counters = {"total": 0, "processed": 0, "found": 0, "errors": 0}
+        stopped = False
+
+        async def counted() -> AsyncIterator[List[Tuple[str, str]]]:
+            async for rows in batches:
+                counters["total"] += len(rows)
+                yield rows
+
+        results = iter_bulk_search(counted(), fresh)
+        pending = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(results.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=config.BULK_STREAM_HEARTBEAT_SECONDS or None)
+                if not done:
+                    # Slow group (SMTP timeouts, greylisting): keep proxies from closing the idle stream
+                    yield encode("progress", counters)
+                    continue
+                try:
+                    index, result = pending.result()
+                except StopAsyncIteration:
                     break
+                finally:
+                    pending = None
+
+                if index is None:
+                    stopped = True
+                    yield encode("result", {"row": None, **result})
+                    break
+
+                counters["processed"] += 1
+                if result["status"] == "valid":
+                    counters["found"] += 1
+                elif result["status"] == "error" and result.get("groupRows", [index])[0] == index:
+                    # A failed group counts as one error, on its first row
+                    counters["errors"] += 1
+                yield encode("result", {"row": index, **result})
+
+                if config.BULK_STREAM_PROGRESS_EVERY and counters["processed"] % config.BULK_STREAM_PROGRESS_EVERY == 0:
+                    yield encode("progress", counters)
+        finally:
+            # Client gone or search halted: stop the lookup in progress
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            await results.aclose()
+
+        history_saved = await drain_history("bulk stream")
+        yield encode("done", {**counters, "stopped": stopped, "historySaved": history_saved})
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/bulk-search", dependencies=[Depends(require_capacity)])
+async def bulk_search(file: UploadFile = File(...), fresh: bool = False):
+    """
+    Bulk email search from CSV/Excel file.
+    Expected columns: domain, fullName (or first_name, last_name, domain)
+    ?fresh=true ignores cached verdicts.
+    Returns list of search results.
+    """
+    try:
+        batches = await read_bulk_upload(file)
+        return await run_bulk_search(batches, fresh)
 
-            finally:
-                # CRITICAL: Always sleep 1s between checks, even on error
-                # This is the PRIMARY anti-ban mechanism
-                time.sleep(1)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk search error: {str(e)}")
 
-        return {"total": len(results), "results": results}
+@app.post("/api/bulk-search-json", dependencies=[Depends(require_capacity)])
+async def bulk_search_json(request: BulkSearchJsonRequest):
+    """
+    Bulk email search from JSON (paste from spreadsheet).
+    Accepts list of {domain, fullName} objects.
+    Returns list of search results.
+    """
+    try:
+        # Skip empty entries
+        rows = [
+            (search.domain.strip(), search.fullName.strip())
+            for search in request.searches
+            if search.domain.strip() and search.fullName.strip()
+        ]
+        return await run_bulk_search(row_batches(rows), request.fresh)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Bulk search error: {str(e)}")
 
+@app.post("/api/bulk-search/stream", dependencies=[Depends(require_capacity)])
+async def bulk_search_stream(file: UploadFile = File(...), fresh: bool = False, format: str = "ndjson"):
+    """
+    Streaming variant of /api/bulk-search: each row is sent as soon as it is done.
+    ?format=ndjson (default) or ?format=sse.
+    """
+    try:
+        batches = await read_bulk_upload(file)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read file: {str(e)}")
+    return stream_bulk_search(batches, fresh, format)
+
+@app.post("/api/bulk-search-json/stream", dependencies=[Depends(require_capacity)])
+async def bulk_search_json_stream(request: BulkSearchJsonRequest, format: str = "ndjson"):
+    """
+    Streaming variant of /api/bulk-search-json: each row is sent as soon as it is done.
+    ?format=ndjson (default) or ?format=sse.
+    """
+    rows = [
+        (search.domain.strip(), search.fullName.strip())
+        for search in request.searches
+        if search.domain.strip() and search.fullName.strip()
+    ]
+    return stream_bulk_search(row_batches(rows), request.fresh, format)
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: BulkSearchJsonRequest):
+    """
+    Submit a bulk search (JSON rows) as a background job.
+    Returns the job right away; poll /api/jobs/{job_id} for progress.
+    """
+    rows = [
+        (search.domain.strip(), search.fullName.strip())
+        for search in request.searches
+        if search.domain.strip() and search.fullName.strip()
+    ]
+    job_id = await job_manager.submit_async(rows, source="json", fresh=request.fresh)
+    return await finder.executor.try_run(job_manager.get_job, job_id)
+
+@app.post("/api/jobs/upload", status_code=202)
+async def submit_job_upload(file: UploadFile = File(...), fresh: bool = False):
+    """
+    Submit a bulk search (CSV/Excel file) as a background job.
+    Same columns and ?fresh flag as /api/bulk-search.
+    """
+    # Rows are read from the file while they are inserted (on the executor)
+    try:
+        job_id = await job_manager.submit_async(
+            iter_upload_rows(file.filename, file.file), source=file.filename, fresh=fresh
+        )
+    except UploadFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read file: {str(e)}")
+    return await finder.executor.try_run(job_manager.get_job, job_id)
+
+@app.get("/api/jobs")
+async def list_jobs(limit: int = 20):
+    """List the most recent bulk jobs with their progress."""
+    return await finder.executor.try_run(job_manager.list_jobs, limit)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get progress of a bulk job."""
+    job = await finder.executor.try_run(job_manager.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: int = 500):
+    """
+    Get processed rows of a bulk job, in row order.
+    Partial while the job runs, final once its status is completed/stopped.
+    """
+    results = await finder.executor.try_run(job_manager.get_results, job_id, offset, limit)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return results
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
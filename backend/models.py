@@ -4,10 +4,12 @@ from typing import List, Optional
 class EmailFinderRequest(BaseModel):
     domain: str
     fullName: str # Made required
+    fresh: bool = False  # Bypass cached verdicts
 
 class CheckEmailRequest(BaseModel):
     email: str
     fullName: Optional[str] = None  # Optional for fallback search
+    fresh: bool = False  # Bypass cached verdicts
 
 class BulkSearchItem(BaseModel):
     domain: str
@@ -15,6 +17,7 @@ class BulkSearchItem(BaseModel):
 
 class BulkSearchJsonRequest(BaseModel):
     searches: List[BulkSearchItem]
+    fresh: bool = False  # Bypass cached verdicts
 
 class EmailFinderResponse(BaseModel):
     status: str
@@ -9,6 +9,23 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base, configure_sqlite
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Fresh SQLite database file; each thread gets its own connection, as in production."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    configure_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
 
 @pytest.fixture(scope="session")
 def test_domain():
@@ -26,3 +43,123 @@ def test_full_name():
 def sample_mx_records():
     """Sample MX records for testing."""
     return ["mx1.example.com", "mx2.example.com"]
+
+
+class FakeSMTPServer:
+    """
+    Minimal scripted SMTP server for tests (runs its own loop in a thread).
+
+    RCPT TO is accepted (250) for addresses in `valid` or for everything when
+    `catch_all` is set, otherwise rejected with 550. Every session, peer
+    address and command is recorded so tests can count round trips.
+    """
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = None
+        self.valid = set()
+        self.catch_all = False
+        self.pipelining = False
+        self.max_recipients = None  # Per-transaction RCPT limit (452 when exceeded)
+        self.deferred_prefixes = ()  # Addresses starting with these get 450 (greylisting)
+        self.connections = 0
+        self.peers = []
+        self.commands = []
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._handlers = set()
+
+    def rcpt_commands(self):
+        return [c for c in self.commands if c.upper().startswith("RCPT TO")]
+
+    async def _handle(self, reader, writer):
+        import asyncio
+        self._handlers.add(asyncio.current_task())
+        self.connections += 1
+        self.peers.append(writer.get_extra_info("peername")[0])
+        writer.write(b"220 fake.smtp ESMTP ready\r\n")
+        recipients = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            self.commands.append(command)
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                extensions = ["PIPELINING"] if self.pipelining else []
+                lines = ["fake.smtp"] + extensions + ["8BITMIME"]
+                for ext in lines[:-1]:
+                    writer.write(f"250-{ext}\r\n".encode())
+                writer.write(f"250 {lines[-1]}\r\n".encode())
+            elif verb in ("HELO", "NOOP"):
+                writer.write(b"250 OK\r\n")
+            elif verb in ("MAIL", "RSET"):
+                recipients = 0
+                writer.write(b"250 OK\r\n")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>").lower()
+                if self.max_recipients is not None and recipients >= self.max_recipients:
+                    writer.write(b"452 4.5.3 Too many recipients\r\n")
+                elif address.startswith(tuple(self.deferred_prefixes)):
+                    recipients += 1
+                    writer.write(b"450 4.7.1 Greylisted, try again later\r\n")
+                elif self.catch_all or address in self.valid:
+                    recipients += 1
+                    writer.write(b"250 2.1.5 Recipient OK\r\n")
+                else:
+                    recipients += 1
+                    writer.write(b"550 5.1.1 User unknown\r\n")
+            elif verb == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"502 Command not implemented\r\n")
+            await writer.drain()
+        writer.close()
+
+    def start(self):
+        import asyncio
+        import threading
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+        async def _start():
+            return await asyncio.start_server(self._handle, self.host, 0)
+
+        self._server = asyncio.run_coroutine_threadsafe(_start(), self._loop).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        import asyncio
+
+        async def _stop():
+            self._server.close()
+            # Pooled client sessions may still be connected
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(_stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+@pytest.fixture
+def fake_smtp():
+    """Fake SMTP server on 127.0.0.1, with config.SMTP_PORT pointing at it."""
+    from config import config
+
+    server = FakeSMTPServer().start()
+    original_port = config.SMTP_PORT
+    config.SMTP_PORT = server.port
+    try:
+        yield server
+    finally:
+        config.SMTP_PORT = original_port
+        server.stop()
@@ -2,10 +2,13 @@
 Integration tests for FastAPI endpoints.
 Tests API endpoints with mocked EmailFinder to avoid real SMTP calls.
 """
+import asyncio
+import json
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from main import app
+from database import get_db
 from models import EmailFinderResponse
 
 
@@ -48,7 +51,7 @@ def mock_catch_all_response():
 class TestFindEmailEndpoint:
     """Test /api/find-email endpoint."""
 
-    @patch('main.finder.find_email')
+    @patch('main.finder.find_email_async')
     def test_find_email_success(self, mock_find, client, mock_valid_response):
         """Test successful email finding."""
         mock_find.return_value = mock_valid_response
@@ -64,7 +67,7 @@ class TestFindEmailEndpoint:
         assert data["email"] == "john.doe@example.com"
         assert data["catchAll"] is False
 
-    @patch('main.finder.find_email')
+    @patch('main.finder.find_email_async')
     def test_find_email_catch_all(self, mock_find, client, mock_catch_all_response):
         """Test catch-all detection."""
         mock_find.return_value = mock_catch_all_response
@@ -107,7 +110,7 @@ class TestFindEmailEndpoint:
         # Should return 400 because of custom validation in endpoint
         assert response.status_code == 400
 
-    @patch('main.finder.find_email')
+    @patch('main.finder.find_email_async')
     def test_find_email_exception_handling(self, mock_find, client):
         """Test exception handling in endpoint."""
         mock_find.side_effect = Exception("SMTP connection failed")
@@ -164,16 +167,22 @@ class TestHistoryEndpoint:
 class TestBulkSearchEndpoint:
     """Test /api/bulk-search endpoint."""
 
+    @pytest.fixture(autouse=True)
+    def mock_prefetch(self):
+        """No real DNS: the MX prefetch stage is mocked."""
+        with patch('main.finder.prefetch_mx_records', new_callable=AsyncMock) as mock:
+            yield mock
+
     def test_bulk_search_csv_missing_file(self, client):
         """Test bulk search without file."""
         response = client.post("/api/bulk-search")
 
         assert response.status_code == 422  # Missing required file
 
-    @patch('main.finder.find_email')
+    @patch('main.finder.find_emails_for_domain_async')
     def test_bulk_search_csv_success(self, mock_find, client, mock_valid_response):
         """Test bulk search with valid CSV."""
-        mock_find.return_value = mock_valid_response
+        mock_find.return_value = [mock_valid_response]
 
         csv_content = b"domain,fullName\nexample.com,John Doe"
         files = {"file": ("test.csv", csv_content, "text/csv")}
@@ -195,7 +204,7 @@ class TestBulkSearchEndpoint:
         assert response.status_code == 400
         assert "must be CSV or Excel" in response.json()["detail"]
 
-    @patch('main.finder.find_email')
+    @patch('main.finder.find_email_async')
     def test_bulk_search_missing_columns(self, mock_find, client):
         """Test bulk search with missing required columns."""
         csv_content = b"name,email\nJohn,john@example.com"
@@ -206,11 +215,11 @@ class TestBulkSearchEndpoint:
         assert response.status_code == 400
         assert "domain" in response.json()["detail"].lower()
 
-    @patch('main.finder.find_email')
-    @patch('time.sleep')  # Mock sleep to speed up tests
+    @patch('main.finder.find_emails_for_domain_async')
+    @patch('asyncio.sleep')  # Mock sleep to speed up tests
     def test_bulk_search_rate_limiting(self, mock_sleep, mock_find, client, mock_valid_response):
-        """Test that rate limiting (sleep) is applied."""
-        mock_find.return_value = mock_valid_response
+        """Test that rows are not throttled by a global sleep (pacing is per MX host)."""
+        mock_find.return_value = [mock_valid_response, mock_valid_response]
 
         csv_content = b"domain,fullName\nexample.com,John Doe\nexample.com,Jane Smith"
         files = {"file": ("test.csv", csv_content, "text/csv")}
@@ -218,18 +227,46 @@ class TestBulkSearchEndpoint:
         response = client.post("/api/bulk-search", files=files)
 
         assert response.status_code == 200
-        # Sleep should be called between requests
-        assert mock_sleep.call_count >= 1
-        mock_sleep.assert_called_with(1)
+        # Rate limiting lives in finder.scheduler, not in a fixed delay between rows
+        mock_sleep.assert_not_called()
+        # Both rows share a domain: one grouped lookup
+        mock_find.assert_called_once_with("example.com", ["John Doe", "Jane Smith"], False)
+
+    @patch('main.finder.find_emails_for_domain_async')
+    def test_bulk_search_groups_by_domain(self, mock_find, client, mock_prefetch):
+        """Rows are grouped by normalized domain; results keep input order."""
+        async def find_group(domain, full_names, fresh=False):
+            return [
+                EmailFinderResponse(status="valid", email=f"{name.split()[0].lower()}@{domain}")
+                for name in full_names
+            ]
+        mock_find.side_effect = find_group
+        app.dependency_overrides[get_db] = lambda: Mock()
+
+        csv_content = b"domain,fullName\nexample.com,John Doe\nother.com,Bob Lee\nEXAMPLE.com,Jane Smith"
+        files = {"file": ("test.csv", csv_content, "text/csv")}
+
+        try:
+            response = client.post("/api/bulk-search", files=files)
+        finally:
+            app.dependency_overrides.clear()
 
-    @patch('main.finder.find_email')
-    @patch('time.sleep')
-    def test_bulk_search_consecutive_errors_stop(self, mock_sleep, mock_find, client):
+        assert response.status_code == 200
+        assert mock_find.call_count == 2
+        # Distinct domains are resolved before any SMTP work
+        mock_prefetch.assert_awaited_once_with(["example.com", "other.com"])
+        emails = [r["email"] for r in response.json()["results"]]
+        assert emails == ["john@example.com", "bob@other.com", "jane@example.com"]
+
+    @patch('main.finder.prefetch_mx_records', new_callable=AsyncMock)
+    @patch('main.finder.find_emails_for_domain_async')
+    @patch('asyncio.sleep')
+    def test_bulk_search_consecutive_errors_stop(self, mock_sleep, mock_find, mock_prefetch, client):
         """Test that processing stops after too many consecutive errors."""
         mock_find.side_effect = Exception("Connection failed")
 
-        # Create CSV with 10 entries
-        csv_lines = ["domain,fullName"] + [f"example.com,Person {i}" for i in range(10)]
+        # Create CSV with 10 entries, one domain each (one failed lookup per row)
+        csv_lines = ["domain,fullName"] + [f"example{i}.com,Person {i}" for i in range(10)]
         csv_content = "\n".join(csv_lines).encode()
         files = {"file": ("test.csv", csv_content, "text/csv")}
 
@@ -245,6 +282,134 @@ class TestBulkSearchEndpoint:
         assert any("STOPPED" in str(r) for r in data["results"])
 
 
+class TestBulkSearchStreamEndpoint:
+    """Test the streaming bulk search endpoints."""
+
+    @pytest.fixture(autouse=True)
+    def mock_backend(self):
+        """No real DNS or database: prefetch and the history writer are mocked."""
+        async def find_group(domain, full_names, fresh=False):
+            return [
+                EmailFinderResponse(status="valid", email=f"{name.split()[0].lower()}@{domain}")
+                for name in full_names
+            ]
+        with patch('main.finder.prefetch_mx_records', new_callable=AsyncMock), \
+                patch('main.history_writer', new_callable=AsyncMock) as mock_writer, \
+                patch('main.finder.find_emails_for_domain_async', side_effect=find_group) as mock_find:
+            mock_writer.drain.return_value = True
+            self.history_writer = mock_writer
+            yield mock_find
+
+    def test_ndjson_stream(self, client):
+        """Each row is one JSON line with its input index, then a done event."""
+        csv_content = b"domain,fullName\nexample.com,John Doe\nother.com,Bob Lee\nexample.com,Jane Smith"
+        files = {"file": ("test.csv", csv_content, "text/csv")}
+
+        with patch('main.config.BULK_STREAM_PROGRESS_EVERY', 2):
+            response = client.post("/api/bulk-search/stream", files=files)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        results = [e for e in events if e["type"] == "result"]
+        # Completion order: the example.com group first, then other.com
+        assert [(r["row"], r["email"]) for r in results] == [
+            (0, "john@example.com"), (2, "jane@example.com"), (1, "bob@other.com")
+        ]
+        assert [e["processed"] for e in events if e["type"] == "progress"] == [2]
+        assert events[-1] == {
+            "type": "done", "total": 3, "processed": 3, "found": 3, "errors": 0,
+            "stopped": False, "historySaved": True
+        }
+
+    def test_unsaved_history_reported(self, client):
+        """The done event says so when the history could not be written."""
+        self.history_writer.drain.return_value = False
+
+        response = client.post("/api/bulk-search-json/stream", json={"searches": [
+            {"domain": "example.com", "fullName": "John Doe"}
+        ]})
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[-1]["historySaved"] is False
+
+    def test_upload_read_in_batches(self, client, mock_backend):
+        """An upload is searched batch by batch while the file is read, indices stay global."""
+        csv_content = b"domain,fullName\nexample.com,John Doe\nother.com,Bob Lee\nexample.com,Jane Smith"
+        files = {"file": ("test.csv", csv_content, "text/csv")}
+
+        with patch('main.config.BULK_UPLOAD_BATCH_ROWS', 2):
+            response = client.post("/api/bulk-search/stream", files=files)
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        results = [e for e in events if e["type"] == "result"]
+        assert [(r["row"], r["email"]) for r in results] == [
+            (0, "john@example.com"), (1, "bob@other.com"), (2, "jane@example.com")
+        ]
+        assert mock_backend.call_count == 3  # example.com is looked up once per batch
+        assert events[-1]["total"] == 3
+
+    def test_idle_stream_sends_progress(self, client, mock_backend):
+        """A slow domain group still produces progress events (keep-alive)."""
+        async def slow_group(domain, full_names, fresh=False):
+            await asyncio.sleep(0.3)
+            return [EmailFinderResponse(status="not_found") for _ in full_names]
+        mock_backend.side_effect = slow_group
+
+        with patch('main.config.BULK_STREAM_HEARTBEAT_SECONDS', 0.05):
+            response = client.post("/api/bulk-search-json/stream", json={"searches": [
+                {"domain": "example.com", "fullName": "John Doe"},
+            ]})
+
+        types = [json.loads(line)["type"] for line in response.text.splitlines()]
+        assert types[0] == "progress"
+        assert types[-2:] == ["result", "done"]
+
+    def test_sse_stream(self, client):
+        """format=sse sends Server-Sent Events."""
+        response = client.post("/api/bulk-search-json/stream?format=sse", json={"searches": [
+            {"domain": "example.com", "fullName": "John Doe"},
+        ]})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: result\ndata: " in response.text
+        assert response.text.rstrip().split("\n")[-2] == "event: done"
+
+    def test_stream_stops_on_errors(self, client, mock_backend):
+        """The STOPPED row is sent and the done event reports it."""
+        mock_backend.side_effect = Exception("Connection failed")
+        response = client.post("/api/bulk-search-json/stream", json={"searches": [
+            {"domain": f"example{i}.com", "fullName": f"Person {i}"} for i in range(10)
+        ]})
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[-2]["domain"] == "STOPPED"
+        assert events[-1]["stopped"] is True
+        assert events[-1]["errors"] == 5
+
+    def test_group_failure_counted_once(self, client, mock_backend):
+        """A domain group whose lookup fails is one error, reported on each of its rows."""
+        mock_backend.side_effect = Exception("Connection failed")
+        response = client.post("/api/bulk-search-json/stream", json={"searches": [
+            {"domain": "example.com", "fullName": f"Person {i}"} for i in range(10)
+        ]})
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        rows = [event for event in events if event["type"] == "result"]
+        assert len(rows) == 10
+        assert all(row["status"] == "error" and row["groupRows"] == list(range(10)) for row in rows)
+        assert events[-1]["processed"] == 10
+        assert events[-1]["errors"] == 1
+        assert events[-1]["stopped"] is False
+
+    def test_unknown_format(self, client):
+        """Only ndjson and sse are supported."""
+        response = client.post("/api/bulk-search-json/stream?format=xml", json={"searches": []})
+
+        assert response.status_code == 400
+
+
 class TestOpenAPISpec:
     """Test OpenAPI documentation generation."""
 
@@ -263,3 +428,40 @@ class TestOpenAPISpec:
 
         assert response.status_code == 200
         assert b"swagger" in response.content.lower()
+
+
+class TestHealthEndpoint:
+    """Test /health endpoint."""
+
+    def test_health_includes_pool_stats(self, client):
+        """SMTP pool stats are reported next to the MX cache stats."""
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "cache" in data
+        assert "open_sessions" in data["smtp_pool"]
+        assert "reuse_rate" in data["smtp_pool"]
+
+    def test_health_does_not_query_cache_tier(self, client):
+        """/health reports in-memory counters only, never waiting on the shared/disk tier."""
+        store = Mock()
+        with patch('main.finder.mx_cache.store', store):
+            response = client.get("/health")
+
+        assert response.status_code == 200
+        store.stats.assert_not_called()
+
+
+class TestCacheStatsEndpoint:
+    """Test /api/cache/stats endpoint."""
+
+    def test_cache_stats_include_catch_all(self, client):
+        """MX cache stats stay top-level; catch-all verdict stats are nested."""
+        response = client.get("/api/cache/stats")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "hit_rate" in data
+        assert "verdicts" in data["catch_all"]
+        assert "negative_ttl_seconds" in data["catch_all"]
@@ -0,0 +1,100 @@
+"""
+Tests for streaming CSV/Excel ingestion.
+"""
+import io
+import pytest
+from openpyxl import Workbook
+from core.bulk_upload import UploadFormatError, iter_csv_rows, iter_upload_rows, read_upload_batch
+
+
+def xlsx(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class TestCSVIngestion:
+    """Test incremental CSV parsing and column normalization."""
+
+    def test_fullname_column(self):
+        """Columns are matched case-insensitively; empty rows are skipped."""
+        content = b"Domain , FullName\nexample.com,John Doe\n,Nobody\nother.com, Jane Smith \n"
+        assert list(iter_upload_rows("leads.csv", io.BytesIO(content))) == [
+            ("example.com", "John Doe"),
+            ("other.com", "Jane Smith"),
+        ]
+
+    def test_name_and_first_last_columns(self):
+        """'name' and 'first_name' + 'last_name' are accepted too."""
+        by_name = b"domain,name\nexample.com,John Doe\n"
+        by_parts = b"\xef\xbb\xbfdomain,first_name,last_name\nexample.com,John,Doe\nexample.com,John,\n"
+
+        assert list(iter_upload_rows("a.csv", io.BytesIO(by_name))) == [("example.com", "John Doe")]
+        assert list(iter_upload_rows("b.csv", io.BytesIO(by_parts))) == [("example.com", "John Doe")]
+
+    def test_small_chunks(self):
+        """Rows and multi-byte characters split across chunks are reassembled."""
+        content = 'domain,fullName\nexample.com,"Mørck, Mads"\r\nother.com,André Müller\n'.encode()
+        rows = list(iter_csv_rows(io.BytesIO(content), chunk_size=3))
+
+        assert rows == [("example.com", "Mørck, Mads"), ("other.com", "André Müller")]
+
+    def test_separators_inside_quoted_fields(self):
+        """Form feeds, NEL and Unicode line separators in a quoted field do not split the row."""
+        content = 'domain,fullName\nexample.com,"John\x0c\u2028Doe\x85"\nother.com,Jane Smith\n'.encode()
+        rows = list(iter_csv_rows(io.BytesIO(content)))
+
+        assert rows == [("example.com", "John\x0c\u2028Doe"), ("other.com", "Jane Smith")]
+
+    def test_batches(self):
+        """Rows are handed out in batches as the file is read; the stream is left open."""
+        content = b"domain,fullName\n" + b"example.com,John Doe\n" * 5
+        stream = io.BytesIO(content)
+        rows = iter_upload_rows("leads.csv", stream)
+
+        assert len(read_upload_batch(rows, 2)) == 2
+        assert len(read_upload_batch(rows, 10)) == 3
+        assert read_upload_batch(rows, 10) == []
+        assert not stream.closed
+
+    def test_missing_columns(self):
+        """Missing domain or name columns are reported."""
+        with pytest.raises(UploadFormatError, match="domain"):
+            list(iter_upload_rows("a.csv", io.BytesIO(b"name,email\nJohn,john@example.com\n")))
+        with pytest.raises(UploadFormatError, match="fullname"):
+            list(iter_upload_rows("a.csv", io.BytesIO(b"domain,email\nexample.com,john@example.com\n")))
+
+    def test_lazy(self):
+        """Rows are produced as the file is read, not after loading it all."""
+        content = b"domain,fullName\n" + b"example.com,John Doe\n" * 10000
+        stream = io.BytesIO(content)
+        rows = iter_csv_rows(stream, chunk_size=1024)
+
+        assert next(rows) == ("example.com", "John Doe")
+        assert stream.tell() < len(content)
+
+
+class TestExcelIngestion:
+    """Test read-only Excel parsing."""
+
+    def test_xlsx(self):
+        """The first sheet is read; numbers and empty cells are handled."""
+        stream = xlsx([
+            ["domain", "first_name", "last_name"],
+            ["example.com", "John", "Doe"],
+            [None, "Jane", "Smith"],
+            ["example.com", "Agent", 7.0],
+        ])
+        assert list(iter_upload_rows("leads.xlsx", stream)) == [("example.com", "John Doe"), ("example.com", "Agent 7")]
+
+    def test_unsupported_types(self):
+        """Only CSV and .xlsx are accepted."""
+        with pytest.raises(UploadFormatError, match="must be CSV or Excel"):
+            iter_upload_rows("leads.txt", io.BytesIO(b""))
+        with pytest.raises(UploadFormatError, match=".xls"):
+            iter_upload_rows("leads.xls", io.BytesIO(b""))
@@ -0,0 +1,171 @@
+"""
+Tests for the shared cache backends (in-memory and local socket server).
+"""
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from config import config
+from core.cache_backend import CacheBackend, CacheServer, MemoryBackend, SocketBackend, create_backend
+from core.catch_all_cache import HONEST
+from core.email_finder import EmailFinder
+
+
+class TestMemoryBackend:
+    """Test the in-process backend."""
+
+    def test_get_set_delete(self):
+        """Values are stored per namespace."""
+        backend = MemoryBackend()
+        backend.set("mx", "example.com", [["mx.example.com"], 1.0, None, 3600])
+        backend.set("verdicts", "example.com", ["valid"])
+
+        assert backend.get("mx", "example.com") == [["mx.example.com"], 1.0, None, 3600]
+        backend.delete("mx", "example.com")
+        assert backend.get("mx", "example.com") is None
+        assert backend.get("verdicts", "example.com") == ["valid"]
+
+    def test_ttl_and_lru(self):
+        """Entries expire after their ttl; the least recently used go first."""
+        backend = MemoryBackend(max_entries=2)
+        backend.set("mx", "expired.com", ["x"], ttl=0.01)
+        time.sleep(0.02)
+        assert backend.get("mx", "expired.com") is None
+
+        backend.set("mx", "a.com", ["a"])
+        backend.set("mx", "b.com", ["b"])
+        backend.get("mx", "a.com")
+        backend.set("mx", "c.com", ["c"])
+
+        assert backend.get("mx", "b.com") is None
+        assert backend.get("mx", "a.com") == ["a"]
+        assert backend.stats()["evictions"] == 1
+
+    def test_clear_namespace(self):
+        """clear(namespace) leaves the other namespaces alone."""
+        backend = MemoryBackend()
+        backend.set("mx", "example.com", ["x"])
+        backend.set("catch_all", "example.com", ["honest"])
+        backend.clear("mx")
+
+        assert backend.stats()["namespaces"] == {"catch_all": 1}
+
+
+class TestSharedCaches:
+    """Two EmailFinder instances (two workers) sharing one cache server."""
+
+    @pytest.fixture(params=["tcp", "unix"])
+    def server(self, request, tmp_path):
+        address = "127.0.0.1:0" if request.param == "tcp" else f"unix:{tmp_path / 'cache.sock'}"
+        server = CacheServer(address)
+        server.start()
+        yield server
+        server.stop()
+
+    def test_workers_share_entries(self, server):
+        """MX records, catch-all verdicts and address verdicts found by one worker hit in the other."""
+        first = EmailFinder(cache_backend=SocketBackend(server.address))
+        second = EmailFinder(cache_backend=SocketBackend(server.address))
+
+        first.mx_cache.set("example.com", ["mx.example.com"])
+        first.catch_all_cache.set("example.com", HONEST, "mx.example.com")
+        first.verdict_cache.set("john.doe@example.com", 250, "mx.example.com", "250 OK")
+
+        assert second.mx_cache.get("example.com") == ["mx.example.com"]
+        assert second.catch_all_cache.get("example.com") == (HONEST, "mx.example.com")
+        is_valid, log, code, mx_host = second.verdict_cache.get("John.Doe@example.com")
+        assert (is_valid, code, mx_host) == (True, 250, "mx.example.com")
+
+        assert second.mx_cache.stats()["disk_hits"] == 1
+        assert second.catch_all_cache.stats()["shared_hits"] == 1
+        assert second.verdict_cache.stats()["shared_hits"] == 1
+
+    def test_invalidate_is_shared(self, server):
+        """A verdict invalidated by one worker is gone for the others."""
+        first = EmailFinder(cache_backend=SocketBackend(server.address))
+        second = EmailFinder(cache_backend=SocketBackend(server.address))
+
+        first.catch_all_cache.set("example.com", HONEST, "mx.example.com")
+        first.catch_all_cache.invalidate("example.com")
+
+        assert second.catch_all_cache.get("example.com") is None
+
+    def test_server_down(self, server):
+        """Without the server, caches fall back to per-worker memory."""
+        backend = SocketBackend(server.address, retry_interval=60)
+        finder = EmailFinder(cache_backend=backend)
+        server.stop()
+
+        finder.verdict_cache.set("john.doe@example.com", 550, "mx.example.com", "550 No such user")
+        assert finder.verdict_cache.get("john.doe@example.com")[2] == 550
+        assert finder.verdict_cache.get("jane@example.com") is None
+
+        stats = backend.stats()
+        assert stats["errors"] == 1
+        assert stats["skipped"] >= 1
+        assert stats["server"] is None
+
+    @pytest.mark.asyncio
+    async def test_backend_calls_off_the_loop(self, server, fake_smtp):
+        """With a shared backend, async lookups reach it from executor threads, never the loop."""
+        backend = SocketBackend(server.address)
+        finder = EmailFinder(cache_backend=backend)
+        finder.mx_cache.set("example.com", [fake_smtp.host])
+        threads = []
+        call = backend._call
+        backend._call = lambda request: threads.append(threading.current_thread().name) or call(request)
+
+        try:
+            result = await finder.check_email_async("john.doe@example.com")
+        finally:
+            finder.executor.shutdown()
+
+        assert result.status == "not_found"
+        assert threads
+        assert all(name.startswith("blocking") for name in threads)
+
+
+class TestServerToken:
+    """Test cache server authentication."""
+
+    def test_token_required_off_loopback(self):
+        """Without a token the server only binds loopback or a Unix socket."""
+        with pytest.raises(ValueError):
+            CacheServer("0.0.0.0:0", token="")
+
+    def test_clients_must_present_token(self):
+        """A client without the right token gets misses, never the stored entries."""
+        server = CacheServer("127.0.0.1:0", token="secret")
+        server.start()
+        try:
+            trusted = SocketBackend(server.address, token="secret")
+            trusted.set("verdicts", "john@example.com", [True])
+            intruder = SocketBackend(server.address, token="wrong")
+            anonymous = SocketBackend(server.address, token="")
+
+            assert trusted.get("verdicts", "john@example.com") == [True]
+            assert intruder.get("verdicts", "john@example.com") is None
+            assert anonymous.get("verdicts", "john@example.com") is None
+            assert intruder.stats()["errors"] == 1
+        finally:
+            server.stop()
+
+
+class TestCreateBackend:
+    """Test the backend chosen from config."""
+
+    def test_disk_tier_conflict_warns(self):
+        """MX_CACHE_DB_PATH is reported as ignored when a shared backend is configured."""
+        with patch.object(config, "CACHE_BACKEND_ADDRESS", "127.0.0.1:1"), \
+                patch.object(config, "MX_CACHE_DB_PATH", "/tmp/mx_cache.db"), \
+                patch("core.cache_backend.logger") as mock_logger:
+            backend = create_backend()
+
+        assert isinstance(backend, SocketBackend)
+        assert "MX_CACHE_DB_PATH ignored" in mock_logger.warning.call_args[0][0]
+
+    def test_backend_is_abstract(self):
+        """Backends must implement every operation."""
+        with pytest.raises(TypeError):
+            CacheBackend()
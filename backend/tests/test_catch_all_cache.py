@@ -0,0 +1,128 @@
+"""
+Tests for the per-domain catch-all verdict cache.
+"""
+import pytest
+from unittest.mock import patch
+from core.catch_all_cache import CatchAllCache
+from config import config
+from core.email_finder import EmailFinder
+
+
+class TestCatchAllCache:
+    """Test verdict storage and TTLs."""
+
+    def test_get_set(self):
+        """Stored verdicts come back with the MX that answered."""
+        cache = CatchAllCache()
+
+        assert cache.get("example.com") is None
+        cache.set("Example.com", "honest", "mx.example.com")
+
+        assert cache.get("example.com") == ("honest", "mx.example.com")
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["verdicts"] == {"catch_all": 0, "honest": 1, "unreachable": 0}
+
+    def test_separate_ttls(self):
+        """Unreachable verdicts expire on the negative TTL, others on the positive one."""
+        cache = CatchAllCache(positive_ttl=100, negative_ttl=10)
+        with patch('core.catch_all_cache.time.time', return_value=1000):
+            cache.set("up.com", "catch_all", "mx.up.com")
+            cache.set("down.com", "unreachable")
+
+        with patch('core.catch_all_cache.time.time', return_value=1050):
+            assert cache.get("up.com") == ("catch_all", "mx.up.com")
+            assert cache.get("down.com") is None
+
+        with patch('core.catch_all_cache.time.time', return_value=1200):
+            assert cache.cleanup_expired() == 1
+        assert cache.stats()["cached_domains"] == 0
+
+    def test_lru_eviction(self):
+        """The least recently used domain goes first once max_entries is reached."""
+        cache = CatchAllCache(max_entries=2)
+        cache.set("a.com", "honest", "mx.a.com")
+        cache.set("b.com", "honest", "mx.b.com")
+        cache.get("a.com")
+        cache.set("c.com", "catch_all", "mx.c.com")
+
+        assert cache.get("b.com") is None
+        assert cache.get("a.com") == ("honest", "mx.a.com")
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["cached_domains"] == 2
+
+    def test_unknown_verdict(self):
+        """Only the three known verdicts are accepted."""
+        with pytest.raises(ValueError):
+            CatchAllCache().set("example.com", "maybe")
+
+
+class TestFinderUsesCatchAllCache:
+    """Test that repeat lookups skip the random-address probe."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    @pytest.mark.asyncio
+    async def test_honest_verdict_skips_probe(self, fake_smtp):
+        """Second lookup on an honest domain sends no chk_ probe."""
+        fake_smtp.valid = {"john.doe@example.com", "jane.smith@example.com"}
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.find_email_async("example.com", "John Doe")
+            result = await self.finder.find_email_async("example.com", "Jane Smith")
+
+        assert result.status == "valid"
+        assert result.email == "jane.smith@example.com"
+        probes = [c for c in fake_smtp.rcpt_commands() if "chk_" in c]
+        assert len(probes) == 1
+        assert self.finder.catch_all_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_deferred_probe_not_cached(self, fake_smtp):
+        """A greylisted probe leaves the domain undetermined: no honest verdict is stored."""
+        fake_smtp.catch_all = True
+        fake_smtp.deferred_prefixes = ("chk_",)
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]), \
+                patch.object(config, 'SMTP_MAX_RETRIES', 1):
+            await self.finder.find_email_async("example.com", "John Doe")
+
+        assert self.finder.catch_all_cache.get("example.com") is None
+
+    @pytest.mark.asyncio
+    async def test_catch_all_verdict_skips_smtp(self, fake_smtp):
+        """A cached catch-all verdict answers without any RCPT."""
+        fake_smtp.catch_all = True
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.find_email_async("example.com", "John Doe")
+            rcpts_before = len(fake_smtp.rcpt_commands())
+            result = await self.finder.find_email_async("example.com", "Jane Smith")
+
+        assert result.status == "catch_all"
+        assert result.email == "jane.smith@example.com"
+        assert "cached" in result.debugInfo
+        assert len(fake_smtp.rcpt_commands()) == rcpts_before
+
+    @pytest.mark.asyncio
+    async def test_unreachable_verdict(self):
+        """A cached unreachable verdict fails fast without connecting."""
+        self.finder.catch_all_cache.set("example.com", "unreachable")
+        with patch.object(EmailFinder, 'get_mx_records', return_value=["mx.example.com"]), \
+                patch.object(self.finder.smtp_pool, 'acquire') as mock_acquire:
+            result = await self.finder.find_email_async("example.com", "John Doe")
+
+        assert result.status == "error"
+        assert "cached" in result.errorMessage
+        mock_acquire.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_changed_mx_ignores_verdict(self, fake_smtp):
+        """A verdict from an MX no longer listed for the domain is dropped."""
+        self.finder.catch_all_cache.set("example.com", "catch_all", "old-mx.example.com")
+        fake_smtp.valid = {"john.doe@example.com"}
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            result = await self.finder.find_email_async("example.com", "John Doe")
+
+        assert result.status == "valid"
+        assert self.finder.catch_all_cache.get("example.com") == ("honest", fake_smtp.host)
@@ -0,0 +1,253 @@
+"""
+Tests for the coordinator / worker mode of bulk jobs.
+Workers run as tasks on the test loop, connected over localhost TCP.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from config import config
+from core.distributed import Coordinator, Worker, shard_by_provider
+from core.email_finder import EmailFinder
+from core.jobs import JobManager
+from database import SearchHistory
+from models import EmailFinderResponse
+
+
+def make_finder(lookup=None):
+    """EmailFinder whose MX prefetch and grouped lookup are mocked."""
+    async def find_emails_for_domain_async(domain, full_names, fresh=False):
+        await asyncio.sleep(0)
+        return [
+            EmailFinderResponse(status="valid", email=f"{name.split()[0].lower()}@{domain}")
+            for name in full_names
+        ]
+
+    finder = EmailFinder()
+    finder.prefetch_mx_records = AsyncMock(side_effect=lambda domains: {
+        domain: ["aspmx.l.google.com"] if domain.startswith("g") else [f"mx.{domain}"]
+        for domain in domains
+    })
+    finder.find_emails_for_domain_async = AsyncMock(side_effect=lookup or find_emails_for_domain_async)
+    return finder
+
+
+async def hang(domain, full_names, fresh=False):
+    await asyncio.Event().wait()
+
+
+async def wait_for(condition, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Condition not met")
+
+
+async def start_coordinator(worker_timeout=5):
+    coordinator = Coordinator("127.0.0.1:0", token="secret", worker_timeout=worker_timeout)
+    await coordinator.start()
+    return coordinator
+
+
+def start_worker(coordinator, lookup=None, name="worker", **kwargs):
+    worker = Worker(coordinator.address, make_finder(lookup), name=name, token="secret", **kwargs)
+    return asyncio.ensure_future(worker.serve())
+
+
+async def stop_workers(*tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class TestSharding:
+    """Test grouping rows by mail provider."""
+
+    def test_shard_by_provider(self):
+        """Domains of one provider share shards; a domain group stays whole up to max_rows."""
+        groups = [
+            ("g1.com", [(1, "g1.com", "A"), (2, "g1.com", "B")]),
+            ("other.com", [(3, "other.com", "C")]),
+            ("g2.com", [(4, "g2.com", "D")]),
+            ("g3.com", [(5, "g3.com", "E"), (6, "g3.com", "F"), (7, "g3.com", "G")]),
+        ]
+
+        shards = shard_by_provider(groups, lambda d: "google" if d.startswith("g") else d, max_rows=3)
+
+        assert [(provider, [domain for domain, _ in shard]) for provider, shard in shards] == [
+            ("google", ["g1.com", "g2.com"]),
+            ("google", ["g3.com"]),
+            ("other.com", ["other.com"]),
+        ]
+
+    def test_large_domain_split(self):
+        """A domain with more than max_rows rows is cut into max_rows parts."""
+        items = [(i, "big.com", f"Person{i} Doe") for i in range(7)]
+
+        shards = shard_by_provider([("big.com", items)], lambda d: d, max_rows=3)
+
+        assert [[len(items) for _, items in shard] for _, shard in shards] == [[3], [3], [1]]
+
+
+class TestDistributedJobs:
+    """Jobs processed by worker processes through the coordinator."""
+
+    @pytest.mark.asyncio
+    async def test_job_runs_on_workers(self, session_factory):
+        """Shards are spread over the workers and every row reaches the job and history."""
+        coordinator = await start_coordinator()
+        workers = [start_worker(coordinator, name=f"w{i}") for i in range(3)]
+        await wait_for(lambda: len(coordinator.workers) == 3)
+        manager = JobManager(make_finder(), session_factory=session_factory, coordinator=coordinator)
+        rows = [(f"g{i}.com", f"Person{i} Doe") for i in range(6)] + [(f"corp{i}.com", "Jane Roe") for i in range(6)]
+
+        try:
+            with patch.object(config, "COORDINATOR_SHARD_MAX_ROWS", 2):
+                job_id = manager.submit(rows)
+                await wait_for(lambda: manager.get_job(job_id)["status"] == "completed")
+        finally:
+            await stop_workers(*workers)
+            await coordinator.stop()
+
+        job = manager.get_job(job_id)
+        assert job["processed"] == 12 and job["found"] == 12
+        results = manager.get_results(job_id)["results"]
+        assert results[0]["email"] == "person0@g0.com"
+        with session_factory() as db:
+            assert db.query(SearchHistory).count() == 12
+        stats = coordinator.stats()
+        assert stats["dispatched_shards"] == 9  # 3 google shards + 6 single-domain providers
+        assert stats["results"] == 12
+
+    @pytest.mark.asyncio
+    async def test_lost_worker_shard_requeued(self, session_factory):
+        """Rows held by a worker that disconnects are processed by another one."""
+        coordinator = await start_coordinator()
+        stuck = start_worker(coordinator, lookup=hang, name="stuck")
+        await wait_for(lambda: len(coordinator.workers) == 1)
+        manager = JobManager(make_finder(), session_factory=session_factory, coordinator=coordinator)
+        job_id = manager.submit([("g1.com", "John Doe"), ("g2.com", "Jane Roe")])
+        await wait_for(lambda: any(w["busy"] for w in coordinator.workers.values()))
+
+        healthy = start_worker(coordinator, name="healthy")
+        await stop_workers(stuck)
+        try:
+            await wait_for(lambda: manager.get_job(job_id)["status"] == "completed")
+        finally:
+            await stop_workers(healthy)
+            await coordinator.stop()
+
+        assert manager.get_job(job_id)["found"] == 2
+        stats = coordinator.stats()
+        assert stats["requeued_shards"] == 1
+        assert stats["workers_lost"] == 1
+
+    @pytest.mark.asyncio
+    async def test_silent_worker_times_out(self, session_factory):
+        """A worker that stops sending heartbeats is dropped and its shard re-queued."""
+        coordinator = await start_coordinator(worker_timeout=0.2)
+        stuck = start_worker(coordinator, lookup=hang, name="stuck", heartbeat_interval=60)
+        await wait_for(lambda: len(coordinator.workers) == 1)
+        manager = JobManager(make_finder(), session_factory=session_factory, coordinator=coordinator)
+        job_id = manager.submit([("g1.com", "John Doe")])
+
+        healthy = start_worker(coordinator, name="healthy")
+        try:
+            await wait_for(lambda: manager.get_job(job_id)["status"] == "completed")
+        finally:
+            await stop_workers(stuck, healthy)
+            await coordinator.stop()
+
+        assert coordinator.stats()["workers_lost"] == 1
+
+    @pytest.mark.asyncio
+    async def test_large_single_domain_job(self):
+        """Thousands of rows of one domain reach the workers in shards that fit the stream limit."""
+        coordinator = await start_coordinator()
+        workers = [start_worker(coordinator, name=f"w{i}") for i in range(2)]
+        await wait_for(lambda: len(coordinator.workers) == 2)
+        items = [(i, "big.com", f"Person{i} With-A-Rather-Long-Family-Name") for i in range(4000)]
+        results = {}
+
+        async def on_result(item, result):
+            results[item[0]] = result
+            return True
+
+        try:
+            shards = shard_by_provider([("big.com", items)], lambda d: d)
+            await asyncio.wait_for(coordinator.run(shards, False, on_result), timeout=30)
+        finally:
+            await stop_workers(*workers)
+            await coordinator.stop()
+
+        assert len(results) == 4000
+        assert all(isinstance(result, EmailFinderResponse) for result in results.values())
+        assert coordinator.stats()["workers_lost"] == 0
+
+    @pytest.mark.asyncio
+    async def test_group_failure_reported_once(self):
+        """A domain group that fails on a worker reaches on_group_error once, with all its rows."""
+        async def fail(domain, full_names, fresh=False):
+            raise Exception("Connection failed")
+
+        coordinator = await start_coordinator()
+        worker = start_worker(coordinator, lookup=fail)
+        await wait_for(lambda: len(coordinator.workers) == 1)
+        items = [(i, "example.com", f"P{i} X") for i in range(3)]
+        failures = []
+
+        async def on_result(item, result):
+            raise AssertionError("group failure reported row by row")
+
+        async def on_group_error(group_items, error):
+            failures.append((group_items, str(error)))
+            return True
+
+        try:
+            shards = shard_by_provider([("example.com", items)], lambda d: d)
+            await asyncio.wait_for(coordinator.run(shards, False, on_result, on_group_error), timeout=5)
+        finally:
+            await stop_workers(worker)
+            await coordinator.stop()
+
+        assert failures == [(items, "Connection failed")]
+
+    @pytest.mark.asyncio
+    async def test_token_required_off_loopback(self):
+        """Without a token the coordinator only listens on loopback or a Unix socket."""
+        with pytest.raises(ValueError):
+            await Coordinator("0.0.0.0:0", token="").start()
+
+        coordinator = Coordinator("127.0.0.1:0", token="")
+        await coordinator.start()
+        await coordinator.stop()
+
+    @pytest.mark.asyncio
+    async def test_worker_with_wrong_token_rejected(self):
+        """Workers must present the coordinator's token."""
+        coordinator = await start_coordinator()
+        worker = Worker(coordinator.address, make_finder(), token="wrong")
+
+        try:
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(worker.serve(), timeout=5)
+        finally:
+            await coordinator.stop()
+        assert coordinator.workers == {}
+
+    @pytest.mark.asyncio
+    async def test_worker_without_token_rejected(self):
+        """A register message with no token field is refused outright."""
+        coordinator = await start_coordinator()
+        host, port = coordinator.address.rsplit(":", 1)
+        reader, writer = await asyncio.open_connection(host, int(port))
+
+        try:
+            writer.write(b'{"op": "register", "name": "anonymous"}\n')
+            await writer.drain()
+            assert await asyncio.wait_for(reader.read(), timeout=5) == b""
+        finally:
+            writer.close()
+            await coordinator.stop()
+        assert coordinator.workers == {}
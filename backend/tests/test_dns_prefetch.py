@@ -0,0 +1,85 @@
+"""
+Tests for the async batched DNS prefetch used by bulk searches.
+"""
+import asyncio
+import dns.resolver
+import pytest
+from unittest.mock import Mock, patch
+from core.email_finder import EmailFinder
+
+
+def fake_resolver(delay=0.01, dead=()):
+    """Async stand-in for dns.asyncresolver.resolve that tracks concurrency."""
+    state = {"in_flight": 0, "peak": 0, "queries": []}
+
+    async def resolve(name, rdtype):
+        state["queries"].append((name, rdtype))
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            await asyncio.sleep(delay)
+            if name in dead:
+                raise dns.resolver.NXDOMAIN()
+            if rdtype == 'MX':
+                return [Mock(preference=10, exchange=f"mx.{name}.")]
+            if rdtype == 'A':
+                return [Mock(address="192.0.2.10")]
+            raise dns.resolver.NoAnswer()
+        finally:
+            state["in_flight"] -= 1
+
+    return resolve, state
+
+
+class TestDNSPrefetch:
+    """Test prefetch_mx_records()."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    @pytest.mark.asyncio
+    async def test_fills_mx_cache(self):
+        """Distinct domains are resolved once; later lookups hit the cache."""
+        resolve, state = fake_resolver()
+        with patch('dns.asyncresolver.resolve', side_effect=resolve):
+            results = await self.finder.prefetch_mx_records(
+                ["a.com", "B.com", "a.com", "https://b.com/"], resolve_addresses=False
+            )
+
+        assert results == {"a.com": ["mx.a.com"], "b.com": ["mx.b.com"]}
+        assert len(state["queries"]) == 2
+        with patch('dns.resolver.resolve') as mock_sync:
+            assert self.finder.get_mx_records("a.com") == ["mx.a.com"]
+        mock_sync.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_bounded_parallelism(self):
+        """Queries overlap, but never more than `concurrency` at once."""
+        resolve, state = fake_resolver()
+        domains = [f"d{i}.com" for i in range(20)]
+        with patch('dns.asyncresolver.resolve', side_effect=resolve):
+            await self.finder.prefetch_mx_records(domains, concurrency=5, resolve_addresses=False)
+
+        assert state["peak"] == 5
+
+    @pytest.mark.asyncio
+    async def test_dead_domains_cached(self):
+        """Dead domains become negative entries before any SMTP work."""
+        resolve, _ = fake_resolver(dead={"dead.com"})
+        with patch('dns.asyncresolver.resolve', side_effect=resolve):
+            results = await self.finder.prefetch_mx_records(["dead.com"], resolve_addresses=False)
+
+        assert results == {"dead.com": []}
+        assert self.finder.mx_cache.failure_reason("dead.com") == "nxdomain"
+
+    @pytest.mark.asyncio
+    async def test_resolves_mx_host_addresses(self):
+        """A/AAAA of MX hosts are resolved in the same pass and used to connect."""
+        resolve, _ = fake_resolver()
+        with patch('dns.asyncresolver.resolve', side_effect=resolve):
+            await self.finder.prefetch_mx_records(["a.com"], resolve_addresses=True)
+
+        assert self.finder.host_addresses.get("mx.a.com") == "192.0.2.10"
+        session = await self.finder.smtp_pool.acquire("mx.a.com")
+        assert session.address == "192.0.2.10"
+        await self.finder.smtp_pool.release(session, reusable=False)
@@ -2,9 +2,11 @@
 Unit tests for EmailFinder core logic.
 Tests pattern generation, name normalization, and email verification.
 """
+import asyncio
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from core.email_finder import EmailFinder
+from core.smtp_session import AsyncSMTPSession
 from models import EmailFinderResponse
 
 
@@ -120,57 +122,49 @@ class TestEmailVerification:
     def setup_method(self):
         self.finder = EmailFinder()
 
-    @patch('smtplib.SMTP')
-    def test_verify_email_valid(self, mock_smtp):
+    def test_verify_email_valid(self, fake_smtp):
         """Test verification of valid email."""
-        # Mock SMTP responses
-        mock_server = MagicMock()
-        mock_server.rcpt.return_value = (250, b"2.1.5 Recipient OK")
-        mock_smtp.return_value = mock_server
+        fake_smtp.valid = {"test@example.com"}
 
-        is_valid, log, code = self.finder.verify_email("test@example.com", "mx.example.com")
+        is_valid, log, code = self.finder.verify_email("test@example.com", fake_smtp.host)
 
         assert is_valid is True
         assert code == 250
-        assert "mx.example.com" in log
+        assert fake_smtp.host in log
 
-    @patch('smtplib.SMTP')
-    def test_verify_email_invalid(self, mock_smtp):
+    def test_verify_email_invalid(self, fake_smtp):
         """Test verification of invalid email."""
-        mock_server = MagicMock()
-        mock_server.rcpt.return_value = (550, b"5.1.1 User unknown")
-        mock_smtp.return_value = mock_server
-
-        is_valid, log, code = self.finder.verify_email("fake@example.com", "mx.example.com")
+        is_valid, log, code = self.finder.verify_email("fake@example.com", fake_smtp.host)
 
         assert is_valid is False
         assert code == 550
 
-    @patch('smtplib.SMTP')
-    def test_verify_email_timeout(self, mock_smtp):
+    @patch('asyncio.open_connection', side_effect=asyncio.TimeoutError())
+    def test_verify_email_timeout(self, mock_connect):
         """Test timeout handling."""
-        mock_server = MagicMock()
-        mock_server.connect.side_effect = TimeoutError()
-        mock_smtp.return_value = mock_server
-
         is_valid, log, code = self.finder.verify_email("test@example.com", "mx.example.com")
 
         assert is_valid is False
         assert "Timeout" in log
         assert code == 0
 
-    @patch('smtplib.SMTP')
-    def test_verify_email_connection_refused(self, mock_smtp):
+    @patch('asyncio.open_connection', side_effect=ConnectionRefusedError())
+    def test_verify_email_connection_refused(self, mock_connect):
         """Test connection refused handling."""
-        mock_server = MagicMock()
-        mock_server.connect.side_effect = ConnectionRefusedError()
-        mock_smtp.return_value = mock_server
-
         is_valid, log, code = self.finder.verify_email("test@example.com", "mx.example.com")
 
         assert is_valid is False
         assert "refused" in log.lower()
 
+    def test_verify_email_is_paced(self, fake_smtp):
+        """The blocking verifier goes through the politeness scheduler and source limits."""
+        with patch.object(self.finder.scheduler, 'acquire', wraps=self.finder.scheduler.acquire) as pace, \
+                patch.object(self.finder.sources, 'acquire', wraps=self.finder.sources.acquire) as limit:
+            self.finder.verify_email("test@example.com", fake_smtp.host)
+
+        pace.assert_called_once()
+        limit.assert_called_once()
+
 
 class TestCatchAllDetection:
     """Test catch-all server detection."""
@@ -179,7 +173,7 @@ class TestCatchAllDetection:
         self.finder = EmailFinder()
 
     @patch.object(EmailFinder, 'get_mx_records')
-    @patch.object(EmailFinder, 'verify_email')
+    @patch.object(EmailFinder, 'verify_email_async')
     def test_detect_catch_all(self, mock_verify, mock_mx):
         """Test catch-all detection."""
         # Setup mocks
@@ -197,7 +191,7 @@ class TestCatchAllDetection:
         assert result.email is not None  # Should return best guess
 
     @patch.object(EmailFinder, 'get_mx_records')
-    @patch.object(EmailFinder, 'verify_email')
+    @patch.object(EmailFinder, 'verify_email_async')
     def test_honest_server_finds_email(self, mock_verify, mock_mx):
         """Test honest server finding real email."""
         # Setup mocks
@@ -216,7 +210,7 @@ class TestCatchAllDetection:
         assert result.email == "john.doe@example.com"
 
     @patch.object(EmailFinder, 'get_mx_records')
-    @patch.object(EmailFinder, 'verify_email')
+    @patch.object(EmailFinder, 'verify_email_async')
     def test_no_match_found(self, mock_verify, mock_mx):
         """Test when no pattern matches."""
         # Setup mocks
@@ -248,8 +242,7 @@ class TestIntegration:
         self.finder = EmailFinder()
 
     @patch('dns.resolver.resolve')
-    @patch('smtplib.SMTP')
-    def test_full_workflow_adrian_turion(self, mock_smtp, mock_dns):
+    def test_full_workflow_adrian_turion(self, mock_dns, fake_smtp):
         """Test the full workflow with Adrian Turion @ auraia.ch."""
         # Mock DNS
         mock_mx_record = Mock()
@@ -257,18 +250,159 @@ class TestIntegration:
         mock_mx_record.exchange = "auraia-ch.mail.protection.outlook.com."
         mock_dns.return_value = [mock_mx_record]
 
-        # Mock SMTP
-        mock_server = MagicMock()
-        # Random email rejected (honest server), first pattern accepted
-        mock_server.rcpt.side_effect = [
-            (550, b"Access denied"),
-            (250, b"Recipient OK"),
-        ]
-        mock_smtp.return_value = mock_server
+        # Fake SMTP: random email rejected (honest server), first pattern accepted
+        fake_smtp.valid = {"adrian.turion@auraia.ch"}
+        real_open_connection = asyncio.open_connection
 
-        result = self.finder.find_email("auraia.ch", "Adrian Turion")
+        async def open_fake_connection(host, port, **kwargs):
+            return await real_open_connection(fake_smtp.host, fake_smtp.port, **kwargs)
+
+        with patch('asyncio.open_connection', side_effect=open_fake_connection):
+            result = self.finder.find_email("auraia.ch", "Adrian Turion")
 
         assert result.status == "valid"
         assert result.email == "adrian.turion@auraia.ch"
         assert result.catchAll is False
         assert "auraia-ch.mail.protection.outlook.com" in result.mxRecords[0]
+
+
+class TestSessionReuse:
+    """Test that one find_email call reuses a single SMTP session per MX."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    @patch('asyncio.sleep')
+    @patch.object(EmailFinder, 'get_mx_records')
+    def test_single_connection_for_catch_all_and_patterns(self, mock_mx, mock_sleep, fake_smtp):
+        """Catch-all probe and every pattern go through one connection."""
+        mock_mx.return_value = [fake_smtp.host]
+        fake_smtp.valid = {"j.doe@example.com"}
+
+        result = self.finder.find_email("example.com", "John Doe")
+
+        assert result.status == "valid"
+        assert result.email == "j.doe@example.com"
+        assert fake_smtp.connections == 1
+        # catch-all probe + john.doe@ + johndoe@ + j.doe@
+        assert len(fake_smtp.rcpt_commands()) == 4
+
+
+class TestPipelinedPatterns:
+    """Test that find_email batches pattern RCPTs on PIPELINING servers."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    @patch('asyncio.sleep')
+    @patch.object(EmailFinder, 'get_mx_records')
+    def test_patterns_in_one_round_trip(self, mock_mx, mock_sleep, fake_smtp):
+        """No politeness sleep between patterns: they are sent as one batch."""
+        mock_mx.return_value = [fake_smtp.host]
+        fake_smtp.pipelining = True
+        fake_smtp.valid = {"jdoe@example.com"}
+
+        result = self.finder.find_email("example.com", "John Doe")
+
+        assert result.status == "valid"
+        assert result.email == "jdoe@example.com"
+        mock_sleep.assert_not_called()
+        assert fake_smtp.connections == 1
+
+    @patch('asyncio.sleep')
+    @patch.object(EmailFinder, 'get_mx_records')
+    def test_sequential_without_pipelining(self, mock_mx, mock_sleep, fake_smtp):
+        """Servers without PIPELINING keep one RCPT per round trip, stopping at the match."""
+        mock_mx.return_value = [fake_smtp.host]
+        fake_smtp.valid = {"j.doe@example.com"}
+
+        result = self.finder.find_email("example.com", "John Doe")
+
+        assert result.email == "j.doe@example.com"
+        # Paced by the scheduler (within burst here), not by fixed sleeps
+        mock_sleep.assert_not_called()
+        assert self.finder.scheduler.stats()["acquired"] == 4
+        # catch-all probe + john.doe@ + johndoe@ + j.doe@
+        assert len(fake_smtp.rcpt_commands()) == 4
+
+
+class TestDomainGroups:
+    """Test grouped lookups of several people at one domain."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    def test_group_by_domain(self):
+        """Rows are grouped by normalized domain, in order of first appearance."""
+        rows = [("Example.com", "John Doe"), ("other.com", "Bob Lee"), ("https://example.com/team", "Jane Smith")]
+
+        assert self.finder.group_by_domain(rows) == {"example.com": [0, 2], "other.com": [1]}
+
+    @pytest.mark.asyncio
+    async def test_one_probe_and_session_per_group(self, fake_smtp):
+        """MX lookup, catch-all probe and session are shared by the whole group."""
+        fake_smtp.valid = {"john.doe@example.com", "j.smith@example.com"}
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]) as mock_mx:
+            results = await self.finder.find_emails_for_domain_async("example.com", ["John Doe", "Jane Smith"])
+
+        assert [r.email for r in results] == ["john.doe@example.com", "j.smith@example.com"]
+        mock_mx.assert_called_once()
+        assert fake_smtp.connections == 1
+        probes = [c for c in fake_smtp.rcpt_commands() if "chk_" in c]
+        assert len(probes) == 1
+
+    @pytest.mark.asyncio
+    async def test_catch_all_short_circuits_group(self, fake_smtp):
+        """A catch-all domain answers every member without testing patterns."""
+        fake_smtp.catch_all = True
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            results = await self.finder.find_emails_for_domain_async(
+                "example.com", ["John Doe", "Jane Smith", "Bob Lee"]
+            )
+
+        assert [r.status for r in results] == ["catch_all"] * 3
+        assert [r.email for r in results] == ["john.doe@example.com", "jane.smith@example.com", "bob.lee@example.com"]
+        assert len(fake_smtp.rcpt_commands()) == 1
+
+
+class TestAsyncEngine:
+    """Test the asyncio verification engine directly."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    @pytest.mark.asyncio
+    async def test_find_email_async(self, fake_smtp):
+        """find_email_async can be awaited from a running loop."""
+        fake_smtp.valid = {"john.doe@example.com"}
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            result = await self.finder.find_email_async("example.com", "John Doe")
+
+        assert result.status == "valid"
+        assert result.email == "john.doe@example.com"
+
+    @pytest.mark.asyncio
+    async def test_check_email_async_invalid(self, fake_smtp):
+        """Rejected address without a name is reported as not_found."""
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            result = await self.finder.check_email_async("nobody@example.com")
+
+        assert result.status == "not_found"
+
+    @pytest.mark.asyncio
+    async def test_verify_email_async_timeout(self):
+        """A server that never answers is reported as a timeout, not a hang."""
+        async def silent_server(reader, writer):
+            await asyncio.sleep(5)
+
+        server = await asyncio.start_server(silent_server, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        session = AsyncSMTPSession("127.0.0.1", "vps.example.com", "verify@vps.example.com", command_timeout=0.2)
+
+        with patch('config.config.SMTP_PORT', port):
+            is_valid, log, code = await self.finder.verify_email_async("test@example.com", "127.0.0.1", session)
+
+        server.close()
+        assert is_valid is False
+        assert "Timeout" in log
+        assert code == 0
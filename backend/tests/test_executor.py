@@ -0,0 +1,159 @@
+"""
+Tests for the bounded executor and the 503 admission check.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+import main
+from core.email_finder import EmailFinder
+from core.executor import BoundedExecutor, ExecutorSaturated
+from core.loop_runner import get_background_loop
+
+
+class TestBoundedExecutor:
+    """Test worker/queue limits."""
+
+    @pytest.mark.asyncio
+    async def test_runs_off_the_loop(self):
+        """Calls run in a worker thread and return their result."""
+        executor = BoundedExecutor(max_workers=2, max_queue=0)
+        try:
+            name = await executor.run(lambda: threading.current_thread().name)
+        finally:
+            executor.shutdown()
+
+        assert name.startswith("blocking")
+        assert executor.stats()["completed"] == 1
+        assert executor.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_try_run_rejects_when_full(self):
+        """try_run() fails fast once workers + queue are in use; run() waits instead."""
+        executor = BoundedExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+        try:
+            busy = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            assert executor.saturated
+
+            with pytest.raises(ExecutorSaturated):
+                await executor.try_run(time.time)
+            waiting = asyncio.ensure_future(executor.run(lambda: "done"))
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+
+            release.set()
+            assert await asyncio.wait_for(waiting, timeout=5) == "done"
+            await asyncio.gather(*busy)
+        finally:
+            release.set()
+            executor.shutdown()
+
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["waited"] == 1
+        assert not stats["saturated"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_keeps_slot_until_done(self):
+        """A cancelled caller does not free its slot while its thread is still running."""
+        executor = BoundedExecutor(max_workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            busy = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            busy.cancel()
+            await asyncio.gather(busy, return_exceptions=True)
+            assert executor.saturated
+
+            waiting = asyncio.ensure_future(executor.run(lambda: "done"))
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+
+            release.set()
+            assert await asyncio.wait_for(waiting, timeout=5) == "done"
+        finally:
+            release.set()
+            executor.shutdown()
+
+        assert executor.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_waiters_on_two_loops(self):
+        """Callers on the API loop and on run_sync's loop both get a slot once one frees up."""
+        executor = BoundedExecutor(max_workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            busy = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            other_loop = asyncio.run_coroutine_threadsafe(executor.run(lambda: "background"), get_background_loop())
+            here = asyncio.ensure_future(executor.run(lambda: "here"))
+            await asyncio.sleep(0.05)
+            assert not here.done() and not other_loop.done()
+
+            release.set()
+            assert await asyncio.wait_for(here, timeout=5) == "here"
+            assert await asyncio.wait_for(asyncio.wrap_future(other_loop), timeout=5) == "background"
+            await busy
+        finally:
+            release.set()
+            executor.shutdown()
+
+        stats = executor.stats()
+        assert stats["waited"] == 2
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_restarts_after_shutdown(self):
+        """A shut down executor starts new worker threads on the next call."""
+        executor = BoundedExecutor(max_workers=1, max_queue=0)
+        executor.shutdown()
+
+        assert await executor.run(lambda: 42) == 42
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_slow_dns_does_not_block_loop(self):
+        """A blocking MX lookup leaves the event loop free for other tasks."""
+        finder = EmailFinder()
+
+        def slow_mx(domain):
+            time.sleep(0.2)
+            return []
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        with patch.object(finder, "get_mx_records", side_effect=slow_mx):
+            result = await finder.check_email_async("john@example.com")
+        task.cancel()
+        finder.executor.shutdown()
+
+        assert result.status == "error"
+        assert ticks >= 10
+
+
+class TestAdmission:
+    """Test 503 responses while the executor is full."""
+
+    def test_busy_returns_503(self):
+        """Lookup endpoints answer 503 with Retry-After; /health keeps working."""
+        client = TestClient(main.app)
+        with patch.object(BoundedExecutor, "saturated", new=True):
+            response = client.post("/api/find-email", json={"domain": "example.com", "fullName": "John Doe"})
+            health = client.get("/health")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert health.status_code == 200
+        assert "executor" in health.json()
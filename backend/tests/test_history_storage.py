@@ -0,0 +1,236 @@
+"""
+Tests for compressed search transcripts, the history detail endpoint and history paging.
+"""
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+import database
+from database import (
+    SearchHistory, SearchTranscript, build_history_entry, get_db, init_db,
+    pack_transcript, unpack_transcript
+)
+from models import EmailFinderResponse
+
+
+def make_result():
+    return EmailFinderResponse(
+        status="valid",
+        email="john.doe@example.com",
+        patternsTested=["john.doe@example.com"],
+        smtpLogs=["Catch-all check (chk_abc@example.com) on MX1 (mx.example.com): 550 No such user"] * 20,
+        mxRecords=["mx.example.com", "mx2.example.com"],
+        debugInfo="MX: mx.example.com | Match: john.doe@example.com (high confidence)"
+    )
+
+
+def make_legacy_db(tmp_path, rows):
+    """SQLite file with the search_history layout of older releases."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE search_history (id INTEGER PRIMARY KEY, created_at DATETIME, domain VARCHAR(255), "
+            "full_name VARCHAR(255), status VARCHAR(50), email VARCHAR(255), catch_all BOOLEAN, "
+            "patterns_tested TEXT, mx_records TEXT, smtp_logs TEXT, debug_info VARCHAR(500), "
+            "error_message VARCHAR(500))"
+        )
+        for row in rows:
+            conn.exec_driver_sql(
+                "INSERT INTO search_history (id, domain, full_name, status, patterns_tested, mx_records, smtp_logs) "
+                "VALUES (?, 'example.com', 'John Doe', 'valid', ?, ?, ?)",
+                row
+            )
+    return engine
+
+
+class TestTranscriptStorage:
+    """Test that transcripts are stored compressed in their own table."""
+
+    def test_pack_roundtrip(self):
+        """Transcripts survive compression and are smaller than the JSON."""
+        result = make_result()
+        payload = pack_transcript(result.patternsTested, result.mxRecords, result.smtpLogs)
+
+        assert unpack_transcript(payload) == {
+            "patternsTested": result.patternsTested,
+            "mxRecords": result.mxRecords,
+            "smtpLogs": result.smtpLogs
+        }
+        assert len(payload) < len(json.dumps(result.smtpLogs))
+        assert unpack_transcript(None)["smtpLogs"] == []
+
+    def test_history_entry_has_compact_row(self, session_factory):
+        """The main row keeps the first MX; the transcript goes to search_transcripts."""
+        with session_factory() as db:
+            db.add(build_history_entry("example.com", "John Doe", make_result()))
+            db.commit()
+
+        with session_factory() as db:
+            entry = db.query(SearchHistory).one()
+            assert entry.mx_host == "mx.example.com"
+            assert db.query(SearchTranscript).count() == 1
+            assert unpack_transcript(entry.transcript.payload)["mxRecords"] == ["mx.example.com", "mx2.example.com"]
+
+    def test_legacy_migration(self, tmp_path):
+        """Inline JSON transcripts from older releases are moved on init_db()."""
+        engine = make_legacy_db(tmp_path, [(1, '["john.doe@example.com"]', '["mx.example.com"]', '["250 OK"]')])
+
+        init_db(engine)
+
+        with sessionmaker(bind=engine)() as db:
+            entry = db.get(SearchHistory, 1)
+            assert entry.mx_host == "mx.example.com"
+            assert unpack_transcript(entry.transcript.payload)["smtpLogs"] == ["250 OK"]
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT smtp_logs FROM search_history").scalar() is None
+
+    def test_legacy_migration_skips_corrupt_rows(self, tmp_path):
+        """A row whose JSON does not decode is left in place; the others are moved."""
+        engine = make_legacy_db(tmp_path, [
+            (1, '["a@example.com"]', '["mx.example.com"]', '["250 OK"]'),
+            (2, '["b@example.com"', '["mx.example.com"]', '["250 OK"]'),
+            (3, '["c@example.com"]', '["mx.example.com"]', '["550 No"]'),
+        ])
+
+        init_db(engine)
+
+        with sessionmaker(bind=engine)() as db:
+            assert db.get(SearchHistory, 1).transcript is not None
+            assert db.get(SearchHistory, 2).transcript is None
+            assert db.get(SearchHistory, 3).transcript is not None
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT id FROM search_history WHERE smtp_logs IS NOT NULL").fetchall() == [(2,)]
+
+    def test_legacy_migration_commits_per_batch(self, tmp_path):
+        """Batches moved before a failure stay committed."""
+        engine = make_legacy_db(tmp_path, [
+            (1, '["a@example.com"]', '["mx.example.com"]', '["250 OK"]'),
+            (2, '["b@example.com"]', '["mx.example.com"]', '["250 OK"]'),
+        ])
+        init_db(engine)  # Already migrated; reset row 2 to its legacy form
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM search_transcripts")
+            conn.exec_driver_sql(
+                "UPDATE search_history SET patterns_tested = '[]', mx_records = '[]', smtp_logs = '[]'"
+            )
+
+        with patch("database.pack_transcript", side_effect=[b"packed", RuntimeError("disk full")]):
+            with pytest.raises(RuntimeError):
+                database._migrate_legacy_transcripts(engine, batch_size=1)
+
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT history_id FROM search_transcripts").fetchall() == [(1,)]
+
+
+class TestHistoryDetailEndpoint:
+    """Test /api/history and /api/history/{id}."""
+
+    def test_list_and_detail(self, session_factory):
+        """The list has no transcripts; the detail endpoint returns them."""
+        with session_factory() as db:
+            db.add(build_history_entry("example.com", "John Doe", make_result()))
+            db.commit()
+
+        def override_get_db():
+            with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            client = TestClient(app)
+            listing = client.get("/api/history").json()
+            detail = client.get(f"/api/history/{listing[0]['id']}").json()
+            missing = client.get("/api/history/999")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert "smtpLogs" not in listing[0]
+        assert listing[0]["mxHost"] == "mx.example.com"
+        assert detail["email"] == "john.doe@example.com"
+        assert len(detail["smtpLogs"]) == 20
+        assert detail["mxRecords"] == ["mx.example.com", "mx2.example.com"]
+        assert missing.status_code == 404
+
+
+class TestHistoryPagination:
+    """Test keyset paging, delta polling and ETags on /api/history."""
+
+    @pytest.fixture
+    def client(self, session_factory):
+        # Five searches; two share a timestamp so the id breaks the tie
+        with session_factory() as db:
+            for i, second in enumerate([1, 2, 2, 3, 4]):
+                entry = build_history_entry("example.com", f"Person {i}", make_result())
+                entry.created_at = datetime(2026, 1, 1, 12, 0, second)
+                db.add(entry)
+            db.commit()
+
+        def override_get_db():
+            with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.clear()
+
+    def test_cursor_pages(self, client):
+        """Following X-Next-Cursor walks every row exactly once, newest first."""
+        seen = []
+        cursor = None
+        while True:
+            response = client.get("/api/history", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+            seen += [row["id"] for row in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert seen == [5, 4, 3, 2, 1]
+
+    def test_invalid_cursor(self, client):
+        """A malformed cursor is a client error."""
+        assert client.get("/api/history?cursor=garbage").status_code == 400
+
+    def test_since_id(self, client):
+        """Delta mode returns only searches newer than since_id."""
+        rows = client.get("/api/history?since_id=3").json()
+
+        assert [row["id"] for row in rows] == [5, 4]
+
+    def test_etag(self, client, session_factory):
+        """An unchanged history answers If-None-Match with 304, a new search changes the ETag."""
+        first = client.get("/api/history")
+        etag = first.headers["ETag"]
+
+        unchanged = client.get("/api/history", headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+
+        with session_factory() as db:
+            db.add(build_history_entry("example.com", "New Person", make_result()))
+            db.commit()
+        changed = client.get("/api/history", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.json()[0]["request"]["fullName"] == "New Person"
+
+    def test_etag_of_older_page(self, client, session_factory):
+        """A new search does not invalidate pages it does not appear on."""
+        first = client.get("/api/history", params={"limit": 2})
+        second = client.get("/api/history", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+        assert second.headers["ETag"] != first.headers["ETag"]
+
+        with session_factory() as db:
+            db.add(build_history_entry("example.com", "New Person", make_result()))
+            db.commit()
+        again = client.get(
+            "/api/history",
+            params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+            headers={"If-None-Match": second.headers["ETag"]}
+        )
+        assert again.status_code == 304
@@ -0,0 +1,157 @@
+"""
+Tests for the batched search history writer.
+Uses an in-memory SQLite database.
+"""
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from unittest.mock import Mock
+
+from core.history_writer import HistoryWriter
+from database import SearchHistory, configure_sqlite
+from models import EmailFinderResponse
+
+
+def result(email="john.doe@example.com"):
+    return EmailFinderResponse(status="valid", email=email, mxRecords=["mx.example.com"])
+
+
+def count(session_factory):
+    with session_factory() as db:
+        return db.query(SearchHistory).count()
+
+
+class TestHistoryWriter:
+    """Test buffering, batch flushes and failure handling."""
+
+    def test_flush_writes_batches(self, session_factory):
+        """Rows wait in the buffer until a flush, then go in batch_size transactions."""
+        writer = HistoryWriter(session_factory, batch_size=2, flush_interval_ms=1000)
+        writer._pending.extend(("example.com", f"Person {i}", result()) for i in range(5))
+
+        assert writer.flush() == 5
+        assert count(session_factory) == 5
+        stats = writer.stats()
+        assert stats["batches"] == 3
+        assert stats["queue_depth"] == 0
+
+    def test_full_batch_flushes_inline_without_thread(self, session_factory):
+        """Without the flusher thread, a full batch is written by add()."""
+        writer = HistoryWriter(session_factory, batch_size=3)
+        writer.add("example.com", "John Doe", result())
+        writer.add("example.com", "Jane Smith", result())
+        assert count(session_factory) == 0
+
+        writer.add("example.com", "Bob Lee", result())
+        assert count(session_factory) == 3
+
+    def test_background_flush(self, session_factory):
+        """The flusher thread writes pending rows after flush_interval_ms."""
+        writer = HistoryWriter(session_factory, batch_size=100, flush_interval_ms=20)
+        writer.start()
+        try:
+            writer.add("example.com", "John Doe", result())
+            for _ in range(100):
+                if count(session_factory) == 1:
+                    break
+                time.sleep(0.01)
+            assert count(session_factory) == 1
+        finally:
+            writer.stop()
+
+    def test_stop_flushes(self, session_factory):
+        """stop() writes whatever is still buffered."""
+        writer = HistoryWriter(session_factory, batch_size=100, flush_interval_ms=60000)
+        writer.start()
+        writer.add("example.com", "John Doe", result())
+        writer.stop()
+
+        assert count(session_factory) == 1
+        assert not writer.running
+
+    def test_failed_flush_keeps_rows(self, session_factory):
+        """Rows survive a database error and are written on the next flush."""
+        broken = Mock(side_effect=Exception("database is locked"))
+        writer = HistoryWriter(broken, batch_size=10)
+        writer.add("example.com", "John Doe", result())
+
+        assert writer.flush() == 0
+        assert writer.stats()["failures"] == 1
+        assert writer.stats()["queue_depth"] == 1
+
+        writer.session_factory = session_factory
+        assert writer.flush() == 1
+        assert count(session_factory) == 1
+
+    def test_max_pending(self):
+        """add() never drops rows: past max_pending they are kept for put() to hold back."""
+        writer = HistoryWriter(Mock(side_effect=Exception("down")), batch_size=100, max_pending=2)
+        for i in range(3):
+            writer.add("example.com", f"Person {i}", result())
+
+        assert writer.stats()["queue_depth"] == 3
+
+    def test_failed_flush_on_full_queue_keeps_every_row(self, session_factory):
+        """A batch that fails while the queue is full goes back whole, oldest first."""
+        factory = Mock(side_effect=Exception("database is locked"))
+        writer = HistoryWriter(factory, batch_size=2, max_pending=2)
+        writer._pending.extend(("example.com", f"Person {i}", result()) for i in range(3))
+
+        assert writer.flush() == 0
+        assert [name for _, name, _ in writer._pending] == ["Person 0", "Person 1", "Person 2"]
+
+        writer.session_factory = session_factory
+        assert writer.flush() == 3
+        assert count(session_factory) == 3
+
+    @pytest.mark.asyncio
+    async def test_put_waits_for_room(self, session_factory):
+        """put() applies backpressure while the queue is full, then proceeds once it drains."""
+        writer = HistoryWriter(session_factory, batch_size=100, flush_interval_ms=60000, max_pending=2)
+        writer._pending.extend(("example.com", f"Person {i}", result()) for i in range(2))
+        writer.start()
+        try:
+            await asyncio.wait_for(writer.put("example.com", "John Doe", result()), timeout=5)
+            assert await writer.drain()
+        finally:
+            writer.stop()
+
+        assert count(session_factory) == 3
+        assert writer.stats()["backpressure_waits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_put_writes_directly_when_stuck(self, session_factory):
+        """A queue that stays full makes put() write its row itself, nothing is dropped."""
+        writer = HistoryWriter(session_factory, batch_size=100, max_pending=2, put_timeout=0.05)
+        writer._pending.extend(("example.com", f"Person {i}", result()) for i in range(2))
+
+        await asyncio.wait_for(writer.put("example.com", "John Doe", result()), timeout=5)
+
+        assert count(session_factory) == 1
+        assert writer.depth == 2
+        assert writer.stats()["direct_writes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_drain_without_thread(self, session_factory):
+        """drain() writes the queue itself when the writer thread is not running."""
+        writer = HistoryWriter(session_factory, batch_size=100)
+        await writer.put("example.com", "John Doe", result())
+
+        assert writer.depth == 1
+        assert await writer.drain()
+        assert count(session_factory) == 1
+
+
+class TestSQLitePragmas:
+    """Test the engine configuration."""
+
+    def test_wal_mode(self, tmp_path):
+        """File databases are opened in WAL mode with a busy timeout."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+        configure_sqlite(engine)
+
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
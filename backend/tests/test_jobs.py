@@ -0,0 +1,200 @@
+"""
+Tests for background bulk jobs.
+Uses an in-memory SQLite database and a mocked finder.
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+import main
+from core.email_finder import EmailFinder
+from core.jobs import JobManager, MAX_CONSECUTIVE_ERRORS
+from database import BulkJob, SearchHistory
+from models import EmailFinderResponse
+
+
+def make_finder(side_effect=None):
+    """EmailFinder whose grouped lookup is mocked."""
+    async def find_emails_for_domain_async(domain, full_names, fresh=False):
+        await asyncio.sleep(0)
+        return [
+            EmailFinderResponse(status="valid", email=f"{name.split()[0].lower()}@{domain}", debugInfo="ok")
+            for name in full_names
+        ]
+
+    finder = EmailFinder()
+    finder.prefetch_mx_records = AsyncMock(return_value={})
+    finder.find_emails_for_domain_async = AsyncMock(side_effect=side_effect or find_emails_for_domain_async)
+    return finder
+
+
+async def wait_for_job(manager, job_id, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        job = manager.get_job(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("Job did not finish")
+
+
+class TestJobManager:
+    """Test job lifecycle and persistence."""
+
+    @pytest.mark.asyncio
+    async def test_job_completes(self, session_factory):
+        """All rows are processed and results are stored in row order."""
+        manager = JobManager(make_finder(), session_factory=session_factory, workers_per_job=3)
+        rows = [("example.com", f"Person{i} Doe") for i in range(7)]
+
+        job_id = manager.submit(rows, source="test.csv")
+        job = await wait_for_job(manager, job_id)
+
+        assert job["status"] == "completed"
+        assert job["processed"] == 7
+        assert job["found"] == 7
+        results = manager.get_results(job_id)["results"]
+        assert [r["row"] for r in results] == list(range(7))
+        assert results[0]["email"] == "person0@example.com"
+
+        # Each row is also written to the search history
+        with session_factory() as db:
+            assert db.query(SearchHistory).count() == 7
+
+    @pytest.mark.asyncio
+    async def test_rows_processed_concurrently(self, session_factory):
+        """Several rows of one job are in flight at the same time."""
+        in_flight = 0
+        peak = 0
+
+        async def slow_lookup(domain, full_names, fresh=False):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return [EmailFinderResponse(status="not_found") for _ in full_names]
+
+        manager = JobManager(make_finder(slow_lookup), session_factory=session_factory, workers_per_job=4)
+        job_id = manager.submit([(f"example{i}.com", "P X") for i in range(8)])
+        await wait_for_job(manager, job_id)
+
+        assert peak == 4
+
+    @pytest.mark.asyncio
+    async def test_rows_grouped_by_domain(self, session_factory):
+        """One lookup per domain group, results stored per row in row order."""
+        finder = make_finder()
+        manager = JobManager(finder, session_factory=session_factory)
+        rows = [("example.com", "John Doe"), ("other.com", "Bob Lee"), ("https://Example.com/", "Jane Smith")]
+
+        job_id = manager.submit(rows)
+        await wait_for_job(manager, job_id)
+
+        assert finder.find_emails_for_domain_async.call_count == 2
+        finder.find_emails_for_domain_async.assert_any_call("example.com", ["John Doe", "Jane Smith"], False)
+        emails = [r["email"] for r in manager.get_results(job_id)["results"]]
+        assert emails == ["john@example.com", "bob@other.com", "jane@example.com"]
+
+    @pytest.mark.asyncio
+    async def test_stops_after_consecutive_errors(self, session_factory):
+        """Job stops (and skips the rest) after too many errors in a row."""
+        manager = JobManager(
+            make_finder(Exception("Connection failed")),
+            session_factory=session_factory,
+            workers_per_job=1
+        )
+        job_id = manager.submit([(f"example{i}.com", f"P{i} X") for i in range(10)])
+        job = await wait_for_job(manager, job_id)
+
+        assert job["status"] == "stopped"
+        assert job["errors"] == MAX_CONSECUTIVE_ERRORS
+        statuses = [r["status"] for r in manager.get_results(job_id)["results"]]
+        assert statuses.count("skipped") == 10 - MAX_CONSECUTIVE_ERRORS
+
+    @pytest.mark.asyncio
+    async def test_group_failure_counts_once(self, session_factory):
+        """A failed domain group marks all its rows as errors but counts one error."""
+        manager = JobManager(make_finder(Exception("Connection failed")), session_factory=session_factory)
+        job_id = manager.submit([("example.com", f"P{i} X") for i in range(10)])
+        job = await wait_for_job(manager, job_id)
+
+        assert job["status"] == "completed"
+        assert job["processed"] == 10
+        assert job["errors"] == 1
+        statuses = [r["status"] for r in manager.get_results(job_id)["results"]]
+        assert statuses == ["error"] * 10
+
+    @pytest.mark.asyncio
+    async def test_unsaved_history_fails_job(self, session_factory):
+        """A job whose history rows could not be written is not reported completed."""
+        manager = JobManager(make_finder(), session_factory=session_factory)
+        manager.history_writer.drain = AsyncMock(return_value=False)
+
+        job_id = manager.submit([("example.com", "John Doe")])
+        job = await wait_for_job(manager, job_id)
+
+        assert job["status"] == "failed"
+        assert "history not saved" in job["errorMessage"]
+
+    @pytest.mark.asyncio
+    async def test_resume_pending(self, session_factory):
+        """Jobs left running by a previous process are picked up again."""
+        first = JobManager(make_finder(), session_factory=session_factory)
+        job_id = first.submit([("example.com", "John Doe")])
+        await first.shutdown()
+        with session_factory() as db:
+            db.get(BulkJob, job_id).status = "running"
+            db.commit()
+
+        second = JobManager(make_finder(), session_factory=session_factory)
+        assert second.resume_pending() == 1
+        job = await wait_for_job(second, job_id)
+        assert job["status"] == "completed"
+
+
+class TestJobEndpoints:
+    """Test /api/jobs endpoints."""
+
+    @pytest.fixture
+    def client(self, session_factory):
+        manager = JobManager(make_finder(), session_factory=session_factory)
+        with patch('main.job_manager', manager), patch('main.init_db'), \
+                patch('main.SessionLocal', session_factory):
+            with TestClient(main.app) as client:
+                yield client
+
+    def test_submit_and_poll(self, client):
+        """Submit returns a job ID at once; progress and results can be polled."""
+        response = client.post("/api/jobs", json={"searches": [
+            {"domain": "example.com", "fullName": "John Doe"},
+            {"domain": "example.com", "fullName": "Jane Smith"},
+            {"domain": " ", "fullName": "Skipped Row"},
+        ]})
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["total"] == 2
+
+        for _ in range(500):
+            job = client.get(f"/api/jobs/{job['jobId']}").json()
+            if job["status"] == "completed":
+                break
+        assert job["status"] == "completed"
+
+        data = client.get(f"/api/jobs/{job['jobId']}/results").json()
+        assert [r["email"] for r in data["results"]] == ["john@example.com", "jane@example.com"]
+
+    def test_submit_upload(self, client):
+        """CSV uploads are accepted as jobs."""
+        files = {"file": ("test.csv", b"domain,fullName\nexample.com,John Doe", "text/csv")}
+
+        response = client.post("/api/jobs/upload", files=files)
+
+        assert response.status_code == 202
+        assert response.json()["source"] == "test.csv"
+
+    def test_unknown_job(self, client):
+        """Unknown job IDs return 404."""
+        assert client.get("/api/jobs/doesnotexist").status_code == 404
+        assert client.get("/api/jobs/doesnotexist/results").status_code == 404
@@ -0,0 +1,385 @@
+"""
+Tests for the MX cache and its persistent disk tier.
+"""
+import threading
+import dns.exception
+import dns.name
+import dns.resolver
+import pytest
+from unittest.mock import Mock, patch
+from core.email_finder import EmailFinder
+from core.mx_cache import MXCache, HostAddressCache
+from core.mx_cache_store import MXCacheStore
+
+
+class TestMXCache:
+    """Test the in-memory tier."""
+
+    def test_ttl(self):
+        """Entries expire after the TTL."""
+        cache = MXCache(ttl=10)
+        with patch('core.mx_cache.time.time', return_value=1000):
+            cache.set("Example.com", ["mx.example.com"])
+            assert cache.get("example.com") == ["mx.example.com"]
+
+        with patch('core.mx_cache.time.time', return_value=1011):
+            assert cache.get("example.com") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["persistent"] is None
+
+
+class TestBoundedLRU:
+    """Test size caps, eviction and the expiry sweeper."""
+
+    def test_evicts_least_recently_used(self):
+        """Over max_entries, the least recently used domain goes first."""
+        cache = MXCache(max_entries=2)
+        cache.set("a.com", ["mx.a.com"])
+        cache.set("b.com", ["mx.b.com"])
+        cache.get("a.com")  # a.com is now most recent
+        cache.set("c.com", ["mx.c.com"])
+
+        assert cache.get("b.com") is None
+        assert cache.get("a.com") == ["mx.a.com"]
+        assert cache.get("c.com") == ["mx.c.com"]
+        assert cache.stats()["evictions"] == 1
+
+    def test_memory_cap(self):
+        """Entries are evicted to stay under the approximate memory cap."""
+        cache = MXCache(max_entries=0, max_bytes=5000)
+        for i in range(100):
+            cache.set(f"domain{i}.com", [f"mx{i}.domain{i}.com"])
+
+        stats = cache.stats()
+        assert stats["approx_bytes"] <= 5000
+        assert 0 < stats["cached_domains"] < 100
+        assert stats["evictions"] == 100 - stats["cached_domains"]
+
+    def test_replace_keeps_size_accounting(self):
+        """Overwriting an entry does not leak its old size."""
+        cache = MXCache()
+        cache.set("a.com", ["mx.a.com"])
+        size = cache.stats()["approx_bytes"]
+        cache.set("a.com", ["mx.a.com"])
+
+        assert cache.stats()["approx_bytes"] == size
+        assert cache.stats()["evictions"] == 0
+
+    def test_sweeper_removes_expired(self):
+        """The background sweeper drops expired entries without reads."""
+        cache = MXCache(ttl=0)
+        cache.set("a.com", ["mx.a.com"])
+
+        cache.start_sweeper(interval=0.01)
+        try:
+            for _ in range(200):
+                if cache.stats()["cached_domains"] == 0:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            cache.stop_sweeper()
+
+        assert cache.stats()["cached_domains"] == 0
+        assert cache.stats()["expired_removed"] == 1
+
+    def test_concurrent_access(self):
+        """Many threads reading and writing keep the cache consistent."""
+        cache = MXCache(max_entries=50)
+
+        def worker(n):
+            for i in range(500):
+                domain = f"d{(n * 7 + i) % 80}.com"
+                if cache.get(domain) is None:
+                    cache.set(domain, [f"mx.{domain}"])
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        assert stats["cached_domains"] <= 50
+        assert stats["hits"] + stats["misses"] == 8 * 500
+        expected_bytes = sum(
+            MXCache._entry_size(domain, records) for domain, (records, _, _, _) in cache._cache.items()
+        )
+        assert stats["approx_bytes"] == expected_bytes
+
+
+class TestHostAddressCache:
+    """MX host address cache: same LRU cap and expiry sweep as MXCache."""
+
+    def test_lru_eviction(self):
+        """Hosts beyond max_entries are evicted least recently used first."""
+        cache = HostAddressCache(max_entries=2)
+        cache.set("mx1.a.com", ["192.0.2.1"])
+        cache.set("mx2.a.com", ["192.0.2.2"])
+        cache.get("mx1.a.com")
+        cache.set("mx3.a.com", ["192.0.2.3"])
+
+        assert cache.has("mx1.a.com")
+        assert not cache.has("mx2.a.com")
+        assert cache.stats()["cached_hosts"] == 2
+        assert cache.stats()["evictions"] == 1
+
+    def test_swept_with_mx_cache(self):
+        """The MXCache sweeper also purges expired host addresses."""
+        cache = MXCache(ttl=60)
+        addresses = HostAddressCache(ttl=0)
+        addresses.set("mx.a.com", ["192.0.2.10"])
+
+        cache.start_sweeper(interval=0.01, also_sweep=(addresses,))
+        try:
+            for _ in range(200):
+                if addresses.stats()["cached_hosts"] == 0:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            cache.stop_sweeper()
+
+        assert addresses.stats()["cached_hosts"] == 0
+        assert addresses.stats()["expired_removed"] == 1
+
+
+class TestRefreshAhead:
+    """Test per-entry TTLs from DNS answers and background refresh."""
+
+    def test_answer_ttl_clamped(self):
+        """DNS answer TTLs are kept per entry, within [min_ttl, max_ttl]."""
+        cache = MXCache(ttl=3600, min_ttl=300, max_ttl=86400)
+        with patch('core.mx_cache.time.time', return_value=1000):
+            cache.set("short.com", ["mx.short.com"], ttl=5)
+            cache.set("long.com", ["mx.long.com"], ttl=10 ** 7)
+            cache.set("normal.com", ["mx.normal.com"], ttl=7200)
+
+        with patch('core.mx_cache.time.time', return_value=1000 + 301):
+            assert cache.get("short.com") is None
+            assert cache.get("normal.com") == ["mx.normal.com"]
+        with patch('core.mx_cache.time.time', return_value=1000 + 7201):
+            assert cache.get("normal.com") is None
+            assert cache.get("long.com") == ["mx.long.com"]
+
+    def test_hot_entry_refreshed_before_expiry(self):
+        """A hit late in an entry's lifetime asks for one background refresh."""
+        refresher = Mock()
+        cache = MXCache(min_ttl=0, refresh_ahead=0.8, refresher=refresher)
+        with patch('core.mx_cache.time.time', return_value=1000):
+            cache.set("hot.com", ["mx.hot.com"], ttl=100)
+
+        with patch('core.mx_cache.time.time', return_value=1050):
+            cache.get("hot.com")
+        refresher.assert_not_called()
+
+        with patch('core.mx_cache.time.time', return_value=1085):
+            assert cache.get("hot.com") == ["mx.hot.com"]  # Served without waiting
+            cache.get("hot.com")
+        refresher.assert_called_once_with("hot.com")
+
+        # The refreshed answer comes back through set() and restarts the lifetime
+        with patch('core.mx_cache.time.time', return_value=1090):
+            cache.set("hot.com", ["mx2.hot.com"], ttl=100)
+        with patch('core.mx_cache.time.time', return_value=1175):
+            cache.get("hot.com")
+        assert refresher.call_count == 2
+        assert cache.stats()["refreshes"] == 2
+
+    def test_negative_entries_not_refreshed(self):
+        """Negative entries simply expire."""
+        refresher = Mock()
+        cache = MXCache(negative_ttl=100, refresher=refresher)
+        with patch('core.mx_cache.time.time', return_value=1000):
+            cache.set_failure("dead.com", "nxdomain")
+        with patch('core.mx_cache.time.time', return_value=1095):
+            cache.get("dead.com")
+
+        refresher.assert_not_called()
+
+    def test_finder_uses_answer_ttl(self):
+        """get_mx_records stores the TTL of the DNS answer."""
+        finder = EmailFinder()
+        class Answer(list):
+            rrset = Mock(ttl=7200)
+
+        answer = Answer([Mock(preference=10, exchange="mx.example.com.")])
+        with patch('dns.resolver.resolve', return_value=answer):
+            finder.get_mx_records("example.com")
+
+        assert finder.mx_cache._cache["example.com"][3] == 7200
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_entry(self):
+        """A failing refresh leaves the current records in place."""
+        finder = EmailFinder()
+        finder.mx_cache.set("example.com", ["mx.example.com"])
+        finder.mx_cache._refreshing.add("example.com")
+
+        with patch('dns.asyncresolver.resolve', side_effect=dns.exception.Timeout()):
+            await finder._refresh_mx("example.com")
+
+        assert finder.mx_cache.get("example.com") == ["mx.example.com"]
+        assert finder.mx_cache.stats()["refreshing"] == 0
+
+
+class TestNegativeCache:
+    """Test cached DNS failures."""
+
+    def test_failure_ttls(self):
+        """Permanent failures use negative_ttl, timeouts the shorter transient_ttl."""
+        cache = MXCache(ttl=3600, negative_ttl=600, transient_ttl=60)
+        with patch('core.mx_cache.time.time', return_value=1000):
+            cache.set_failure("dead.com", "nxdomain")
+            cache.set_failure("slow.com", "timeout")
+
+        with patch('core.mx_cache.time.time', return_value=1100):
+            assert cache.get("dead.com") == []
+            assert cache.failure_reason("dead.com") == "nxdomain"
+            assert cache.get("slow.com") is None
+
+        with patch('core.mx_cache.time.time', return_value=1700):
+            assert cache.get("dead.com") is None
+
+    def test_stats_per_failure(self):
+        """Negative entries and hits are reported per failure type."""
+        cache = MXCache()
+        cache.set_failure("dead.com", "nxdomain")
+        cache.set_failure("nomail.com", "null_mx")
+        cache.get("dead.com")
+        cache.get("dead.com")
+
+        stats = cache.stats()
+        assert stats["negative_entries"]["nxdomain"] == 1
+        assert stats["negative_entries"]["null_mx"] == 1
+        assert stats["negative_hits"] == {
+            "nxdomain": 2, "no_answer": 0, "null_mx": 0, "timeout": 0, "servfail": 0
+        }
+
+    def test_unknown_failure(self):
+        """Only known failure types are accepted."""
+        with pytest.raises(ValueError):
+            MXCache().set_failure("example.com", "weird")
+
+
+class TestFinderNegativeCaching:
+    """Test that get_mx_records caches DNS failures."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    @pytest.mark.parametrize("error, failure", [
+        (dns.resolver.NXDOMAIN(), "nxdomain"),
+        (dns.resolver.NoAnswer(), "no_answer"),
+        (dns.resolver.LifetimeTimeout(timeout=5.0, errors={}), "timeout"),
+        (dns.resolver.NoNameservers(), "servfail"),
+    ])
+    @patch('dns.resolver.resolve')
+    def test_failure_cached(self, mock_resolve, error, failure):
+        """A failing domain is queried once, then answered from the cache."""
+        mock_resolve.side_effect = error
+
+        assert self.finder.get_mx_records("dead.example") == []
+        assert self.finder.get_mx_records("dead.example") == []
+
+        assert mock_resolve.call_count == 1
+        assert self.finder.mx_cache.failure_reason("dead.example") == failure
+
+    @patch('dns.resolver.resolve')
+    def test_null_mx(self, mock_resolve):
+        """RFC 7505 "MX 0 ." means the domain accepts no mail."""
+        mock_resolve.return_value = [Mock(preference=0, exchange=dns.name.root)]
+
+        assert self.finder.get_mx_records("nomail.example") == []
+        assert self.finder.mx_cache.failure_reason("nomail.example") == "null_mx"
+
+    @patch('dns.resolver.resolve')
+    def test_error_message(self, mock_resolve):
+        """find_email explains why there are no MX records."""
+        mock_resolve.side_effect = dns.resolver.NXDOMAIN()
+
+        result = self.finder.find_email("dead.example", "John Doe")
+
+        assert result.status == "error"
+        assert result.errorMessage == "No MX records found: domain does not exist (NXDOMAIN)"
+
+
+class TestMXCacheStore:
+    """Test the shared SQLite tier."""
+
+    def test_survives_restart(self, tmp_path):
+        """A new cache (new process) reads entries written by a previous one."""
+        path = str(tmp_path / "mx.db")
+        first = MXCache(ttl=3600, store=MXCacheStore(path))
+        first.set("example.com", ["mx1.example.com", "mx2.example.com"])
+        first.store.close()
+
+        second = MXCache(ttl=3600, store=MXCacheStore(path))
+
+        assert second.get("example.com") == ["mx1.example.com", "mx2.example.com"]
+        assert second.stats()["disk_hits"] == 1
+        # Now in memory: no second disk read
+        second.get("example.com")
+        assert second.stats()["persistent"]["reads"] == 1
+
+    def test_shared_between_workers(self, tmp_path):
+        """Two caches on the same file see each other's writes."""
+        path = str(tmp_path / "mx.db")
+        worker_a = MXCache(ttl=3600, store=MXCacheStore(path))
+        worker_b = MXCache(ttl=3600, store=MXCacheStore(path))
+
+        assert worker_b.get("example.com") is None
+        worker_a.set("example.com", ["mx.example.com"])
+
+        assert worker_b.get("example.com") == ["mx.example.com"]
+
+    def test_ttl_kept_from_original_store_time(self, tmp_path):
+        """Disk entries keep their store time: an old entry is not revived."""
+        store = MXCacheStore(str(tmp_path / "mx.db"))
+        store.set("example.com", ["mx.example.com"], stored_at=1000)
+        cache = MXCache(ttl=60, store=store)
+
+        with patch('core.mx_cache.time.time', return_value=1030):
+            assert cache.get("example.com") == ["mx.example.com"]
+        with patch('core.mx_cache.time.time', return_value=1100):
+            assert cache.get("example.com") is None
+
+    def test_compact(self, tmp_path):
+        """compact() deletes expired rows from disk."""
+        store = MXCacheStore(str(tmp_path / "mx.db"))
+        store.set("old.com", ["mx.old.com"], stored_at=0)
+        cache = MXCache(ttl=60, store=store)
+        cache.set("new.com", ["mx.new.com"])
+
+        assert cache.compact(vacuum=True) == 1
+        assert store.stats()["entries"] == 1
+        assert store.get("old.com") is None
+
+    def test_lazy_open(self, tmp_path):
+        """The database file is not touched until the first lookup."""
+        path = tmp_path / "mx.db"
+        cache = MXCache(ttl=60, store=MXCacheStore(str(path)))
+
+        assert not path.exists()
+        cache.get("example.com")
+        assert path.exists()
+
+    def test_unavailable_store(self, tmp_path):
+        """A broken disk tier degrades to memory-only instead of failing lookups."""
+        cache = MXCache(ttl=60, store=MXCacheStore(str(tmp_path / "missing" / "mx.db")))
+
+        cache.set("example.com", ["mx.example.com"])
+
+        assert cache.get("example.com") == ["mx.example.com"]
+        assert cache.stats()["persistent"]["errors"] >= 1
+
+    def test_negative_entries_persist(self, tmp_path):
+        """Negative entries go through to disk with their failure type."""
+        path = str(tmp_path / "mx.db")
+        MXCache(store=MXCacheStore(path)).set_failure("dead.com", "nxdomain")
+
+        cache = MXCache(store=MXCacheStore(path))
+
+        assert cache.get("dead.com") == []
+        assert cache.failure_reason("dead.com") == "nxdomain"
@@ -0,0 +1,86 @@
+"""
+Tests for learned pattern priors.
+"""
+import pytest
+from unittest.mock import patch
+from core.pattern_priors import PatternPriors, DEFAULT_ORDER, template_of
+from core.email_finder import EmailFinder
+
+
+class TestPatternPriors:
+    """Test template matching and ordering."""
+
+    def test_template_of(self):
+        """Confirmed addresses map back to their template."""
+        assert template_of("john.doe@example.com", ["john"], ["doe"]) == "first.last"
+        assert template_of("JDoe@example.com", ["john"], ["doe"]) == "flast"
+        assert template_of("madshakon.morck@example.com", ["mads-hakon", "madshakon"], ["morck"]) == "first.last"
+        assert template_of("sales@example.com", ["john"], ["doe"]) is None
+
+    def test_default_order(self):
+        """Without any hit the historical order is kept."""
+        assert PatternPriors().order("example.com") == DEFAULT_ORDER
+
+    def test_domain_template_first(self):
+        """One confirmed address is enough to move a domain's format first."""
+        priors = PatternPriors(min_samples=20)
+        priors.record("example.com", "flast")
+
+        order = priors.order("example.com")
+        assert order[0] == "flast"
+        assert order[1:] == [t for t in DEFAULT_ORDER if t != "flast"]
+        assert priors.order("other.com") == DEFAULT_ORDER
+
+    def test_provider_fallback(self):
+        """Unknown domains use their provider's order once it has enough samples."""
+        priors = PatternPriors(min_samples=3)
+        for domain in ("a.com", "b.com", "c.com"):
+            priors.record(domain, "f.last", provider="microsoft")
+        priors.record("d.com", "first", provider="google")
+
+        assert priors.order("new.com", provider="microsoft")[0] == "f.last"
+        # Google has too few samples: global order (f.last: 3, first: 1) applies
+        assert priors.order("new.com", provider="google")[:2] == ["f.last", "first"]
+
+    def test_max_domains(self):
+        """Oldest domains are forgotten past max_domains."""
+        priors = PatternPriors(max_domains=2)
+        priors.record("a.com", "flast")
+        priors.record("b.com", "flast")
+        priors.record("c.com", "flast")
+
+        assert priors.stats()["domains"] == 2
+        assert priors.order("a.com", provider=None) == DEFAULT_ORDER
+
+    def test_unknown_template(self):
+        """Only known templates are accepted."""
+        with pytest.raises(ValueError):
+            PatternPriors().record("example.com", "first_last")
+
+
+class TestFinderLearnsPatterns:
+    """Test that confirmed addresses reorder the next lookups."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    def test_generate_patterns_uses_priors(self):
+        """The domain's learned template comes first."""
+        self.finder.pattern_priors.record("example.com", "flast")
+        patterns = self.finder.generate_patterns(["john"], ["doe"], "example.com")
+
+        assert patterns[0] == "jdoe@example.com"
+        assert len(patterns) == len(DEFAULT_ORDER)
+
+    @pytest.mark.asyncio
+    async def test_hit_reorders_next_lookup(self, fake_smtp):
+        """After jdoe@ is confirmed, the next person's flast pattern is tried first."""
+        fake_smtp.valid = {"jdoe@example.com", "asmith@example.com"}
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.find_email_async("example.com", "John Doe")
+            result = await self.finder.find_email_async("example.com", "Anna Smith")
+
+        assert result.status == "valid"
+        assert result.email == "asmith@example.com"
+        assert result.patternsTested[0] == "asmith@example.com"
+        assert self.finder.pattern_priors.stats()["recorded"] == 2
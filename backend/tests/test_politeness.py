@@ -0,0 +1,92 @@
+"""
+Unit tests for the politeness scheduler (token buckets per host/provider).
+"""
+import pytest
+from unittest.mock import patch
+from core.politeness import TokenBucket, PolitenessScheduler
+
+
+class TestTokenBucket:
+    """Test token bucket reservations."""
+
+    def test_burst_then_wait(self):
+        """Burst is free, the next token costs 1/rate seconds."""
+        bucket = TokenBucket(rate=2, burst=3)
+
+        assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.reserve() == pytest.approx(0.5, abs=0.01)
+        # Reservations queue up behind each other
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+
+    def test_slow_down_and_recover(self):
+        """Rate is halved on slow_down and climbs back with recover."""
+        bucket = TokenBucket(rate=4, burst=4)
+
+        bucket.slow_down(0.5, min_rate=0.1)
+        assert bucket.rate == 2
+        assert bucket.reserve() > 0  # Bucket was emptied
+
+        bucket.recover(1)
+        bucket.recover(1)
+        bucket.recover(1)
+        assert bucket.rate == 4
+
+
+class TestPolitenessScheduler:
+    """Test per-host and per-provider scheduling."""
+
+    def test_provider_for_host(self):
+        """Known MX suffixes map to providers, unknown ones to their base domain."""
+        scheduler = PolitenessScheduler()
+
+        assert scheduler.provider_for_host("aspmx.l.google.com") == "google"
+        assert scheduler.provider_for_host("auraia-ch.mail.protection.outlook.com") == "microsoft"
+        assert scheduler.provider_for_host("mx1.mail.example.org") == "example.org"
+
+    @pytest.mark.asyncio
+    async def test_distinct_hosts_not_throttled(self):
+        """Different providers each get their own budget."""
+        scheduler = PolitenessScheduler(host_rate=1, host_burst=1, provider_rate=1, provider_burst=1)
+
+        with patch('asyncio.sleep') as mock_sleep:
+            await scheduler.acquire("mx.alpha.com")
+            await scheduler.acquire("mx.beta.com")
+            await scheduler.acquire("mx.gamma.com")
+
+        mock_sleep.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_same_host_is_paced(self):
+        """Checks beyond the burst on one host wait for the per-host rate."""
+        scheduler = PolitenessScheduler(host_rate=1, host_burst=1, provider_rate=100, provider_burst=100)
+
+        with patch('asyncio.sleep') as mock_sleep:
+            await scheduler.acquire("mx.alpha.com")
+            await scheduler.acquire("mx.alpha.com")
+
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args[0][0] == pytest.approx(1.0, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_provider_budget_shared_across_hosts(self):
+        """MX hosts of one provider share the provider bucket."""
+        scheduler = PolitenessScheduler(host_rate=100, host_burst=100, provider_rate=1, provider_burst=1)
+
+        with patch('asyncio.sleep') as mock_sleep:
+            await scheduler.acquire("alt1.aspmx.l.google.com")
+            await scheduler.acquire("alt2.aspmx.l.google.com")
+
+        mock_sleep.assert_called_once()
+
+    def test_rate_limit_reply_slows_host(self):
+        """421/450 replies cut the host rate; stats list the throttled host."""
+        scheduler = PolitenessScheduler(host_rate=4, host_burst=4)
+
+        scheduler.report("mx.alpha.com", 450)
+
+        stats = scheduler.stats()
+        assert stats["rate_limited_replies"] == 1
+        assert stats["throttled_hosts"] == {"mx.alpha.com": 2.0}
+
+        scheduler.report("mx.alpha.com", 550)  # Normal reply: partial recovery
+        assert scheduler.stats()["throttled_hosts"]["mx.alpha.com"] > 2.0
@@ -0,0 +1,167 @@
+"""
+Unit tests for the per-MX-host SMTP connection pool.
+Runs against the fake SMTP server from conftest.
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+from core.email_finder import EmailFinder
+from core.loop_runner import run_sync
+from core.smtp_pool import SMTPPool
+
+
+def make_pool(**kwargs):
+    return SMTPPool("vps.example.com", "verify@vps.example.com", **kwargs)
+
+
+class TestSMTPPool:
+    """Test session reuse, limits and eviction."""
+
+    @pytest.mark.asyncio
+    async def test_reuse_warm_session(self, fake_smtp):
+        """A released session is handed out again without a new handshake."""
+        pool = make_pool()
+
+        session = await pool.acquire(fake_smtp.host)
+        await session.rcpt("a@example.com")
+        await pool.release(session)
+
+        again = await pool.acquire(fake_smtp.host)
+        await again.rcpt("b@example.com")
+        await pool.release(again)
+
+        assert again is session
+        assert fake_smtp.connections == 1
+        # Second user starts a fresh transaction
+        assert "RSET" in fake_smtp.commands
+        assert pool.stats()["reused"] == 1
+        await pool.close_all()
+
+    @pytest.mark.asyncio
+    async def test_max_sessions_per_host(self, fake_smtp):
+        """Callers wait for a free slot once the host limit is reached."""
+        pool = make_pool(max_sessions_per_host=1)
+
+        first = await pool.acquire(fake_smtp.host)
+        await first.rcpt("a@example.com")
+        waiting = asyncio.ensure_future(pool.acquire(fake_smtp.host))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        await pool.release(first)
+        second = await asyncio.wait_for(waiting, timeout=1)
+
+        assert second is first
+        await pool.release(second)
+        await pool.close_all()
+
+    @pytest.mark.asyncio
+    async def test_idle_eviction(self, fake_smtp):
+        """Sessions idle longer than idle_timeout are closed."""
+        pool = make_pool(idle_timeout=0.05)
+
+        session = await pool.acquire(fake_smtp.host)
+        await session.rcpt("a@example.com")
+        await pool.release(session)
+        await asyncio.sleep(0.1)
+
+        assert await pool.evict_idle() == 1
+        assert session.connected is False
+        assert pool.stats()["open_sessions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_noop_health_check(self, fake_smtp):
+        """Idle sessions are checked with NOOP before reuse."""
+        pool = make_pool(health_check_after=0)
+
+        session = await pool.acquire(fake_smtp.host)
+        await session.rcpt("a@example.com")
+        await pool.release(session)
+        await pool.acquire(fake_smtp.host)
+
+        assert "NOOP" in fake_smtp.commands
+        await pool.close_all()
+
+    @pytest.mark.asyncio
+    async def test_dead_session_replaced(self, fake_smtp):
+        """A session the server dropped fails the health check and is replaced."""
+        pool = make_pool(health_check_after=0)
+
+        session = await pool.acquire(fake_smtp.host)
+        await session.rcpt("a@example.com")
+        await pool.release(session)
+        session._writer.close()  # Simulate the server hanging up
+        await asyncio.sleep(0.05)
+
+        replacement = await pool.acquire(fake_smtp.host)
+        assert replacement is not session
+        assert pool.stats()["health_check_failures"] == 1
+        await pool.release(replacement)
+
+    @pytest.mark.asyncio
+    async def test_retire_after_max_recipients(self, fake_smtp):
+        """Sessions that used their recipient budget are closed on release."""
+        pool = make_pool(max_recipients_per_session=2)
+
+        session = await pool.acquire(fake_smtp.host)
+        await session.rcpt("a@example.com")
+        await session.rcpt("b@example.com")
+        await pool.release(session)
+
+        assert session.connected is False
+        assert pool.stats()["idle_sessions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_keyed_by_source_address(self, fake_smtp):
+        """Sessions bound to different source IPs are pooled separately."""
+        pool = make_pool()
+
+        a = await pool.acquire(fake_smtp.host)
+        await pool.release(a)
+        b = await pool.acquire(fake_smtp.host, source_address="127.0.0.1")
+
+        assert b is not a
+        assert b.source_address == "127.0.0.1"
+
+
+    @pytest.mark.asyncio
+    async def test_other_loop_idle_session_frees_slot(self, fake_smtp):
+        """At the cap, an idle session from another loop is closed instead of blocking."""
+        pool = make_pool(max_sessions_per_host=1)
+
+        async def warm():
+            session = await pool.acquire(fake_smtp.host)
+            await session.rcpt("a@example.com")
+            await pool.release(session)
+            return session
+
+        foreign = run_sync(warm())
+        session = await asyncio.wait_for(pool.acquire(fake_smtp.host), timeout=2)
+
+        assert session is not foreign
+        assert pool.stats()["open_sessions"] == 1
+        for _ in range(100):
+            if not foreign.connected:
+                break
+            await asyncio.sleep(0.01)
+        assert foreign.connected is False
+        await pool.release(session, reusable=False)
+
+class TestFinderUsesPool:
+    """Test that consecutive lookups share pooled sessions."""
+
+    @patch('asyncio.sleep')
+    @patch.object(EmailFinder, 'get_mx_records')
+    def test_two_lookups_one_connection(self, mock_mx, mock_sleep, fake_smtp):
+        """The second lookup on the same MX reuses the first one's connection."""
+        mock_mx.return_value = [fake_smtp.host]
+        fake_smtp.valid = {"john.doe@example.com", "jane.smith@example.com"}
+        finder = EmailFinder()
+
+        first = finder.find_email("example.com", "John Doe")
+        second = finder.find_email("example.com", "Jane Smith")
+
+        assert first.status == "valid"
+        assert second.status == "valid"
+        assert fake_smtp.connections == 1
+        assert finder.smtp_pool.stats()["reused"] == 1
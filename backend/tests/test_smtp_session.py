@@ -0,0 +1,165 @@
+"""
+Unit tests for SMTP session reuse.
+Tests reconnect and recipient-limit handling with a mocked smtplib
+and the asyncio session against a fake SMTP server.
+"""
+import smtplib
+import pytest
+from unittest.mock import MagicMock, patch
+from core.smtp_session import SMTPSession, AsyncSMTPSession
+
+
+def make_session(**kwargs):
+    return SMTPSession("mx.example.com", "vps.example.com", "verify@vps.example.com", **kwargs)
+
+
+class TestSMTPSession:
+    """Test SMTPSession connection lifecycle."""
+
+    @patch('smtplib.SMTP')
+    def test_lazy_connect_and_reuse(self, mock_smtp):
+        """Connects on first RCPT only, then reuses the connection."""
+        mock_server = MagicMock()
+        mock_server.rcpt.return_value = (550, b"User unknown")
+        mock_smtp.return_value = mock_server
+
+        session = make_session()
+        assert session.connected is False
+
+        session.rcpt("a@example.com")
+        session.rcpt("b@example.com")
+        session.rcpt("c@example.com")
+
+        assert session.connections == 1
+        mock_server.mail.assert_called_once_with("verify@vps.example.com")
+
+    @patch('smtplib.SMTP')
+    def test_reconnect_when_server_drops(self, mock_smtp):
+        """A dropped session is re-opened and the RCPT retried once."""
+        mock_server = MagicMock()
+        mock_server.rcpt.side_effect = [
+            (550, b"User unknown"),
+            smtplib.SMTPServerDisconnected("Connection unexpectedly closed"),
+            (250, b"OK"),
+        ]
+        mock_smtp.return_value = mock_server
+
+        session = make_session()
+        session.rcpt("a@example.com")
+        code, _ = session.rcpt("b@example.com")
+
+        assert code == 250
+        assert session.connections == 2
+
+    @patch('smtplib.SMTP')
+    def test_rset_after_max_recipients(self, mock_smtp):
+        """RSET + MAIL FROM once the per-transaction recipient budget is used."""
+        mock_server = MagicMock()
+        mock_server.rcpt.return_value = (550, b"User unknown")
+        mock_smtp.return_value = mock_server
+
+        session = make_session(max_recipients=2)
+        for i in range(3):
+            session.rcpt(f"user{i}@example.com")
+
+        mock_server.rset.assert_called_once()
+        assert mock_server.mail.call_count == 2
+        assert session.connections == 1
+
+    @patch('smtplib.SMTP')
+    def test_too_many_recipients_reply(self, mock_smtp):
+        """452 triggers RSET and a retry on the same connection."""
+        mock_server = MagicMock()
+        mock_server.rcpt.side_effect = [
+            (452, b"4.5.3 Too many recipients"),
+            (250, b"OK"),
+        ]
+        mock_smtp.return_value = mock_server
+
+        session = make_session()
+        code, _ = session.rcpt("a@example.com")
+
+        assert code == 250
+        mock_server.rset.assert_called_once()
+        assert session.connections == 1
+
+
+class TestAsyncSMTPSession:
+    """Test AsyncSMTPSession against the fake SMTP server."""
+
+    @pytest.mark.asyncio
+    async def test_reuse_and_extensions(self, fake_smtp):
+        """One connection for several RCPTs; EHLO keywords are parsed."""
+        fake_smtp.pipelining = True
+        fake_smtp.valid = {"b@example.com"}
+
+        async with AsyncSMTPSession(fake_smtp.host, "vps.example.com", "verify@vps.example.com") as session:
+            first, _ = await session.rcpt("a@example.com")
+            second, _ = await session.rcpt("b@example.com")
+            assert "PIPELINING" in session.extensions
+
+        assert (first, second) == (550, 250)
+        assert fake_smtp.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_too_many_recipients_reply(self, fake_smtp):
+        """452 from the server triggers RSET and a retry on the same connection."""
+        fake_smtp.max_recipients = 2
+
+        async with AsyncSMTPSession(fake_smtp.host, "vps.example.com", "verify@vps.example.com") as session:
+            codes = [(await session.rcpt(f"user{i}@example.com"))[0] for i in range(3)]
+
+        assert codes == [550, 550, 550]
+        assert "RSET" in fake_smtp.commands
+        assert fake_smtp.connections == 1
+
+
+class TestPipelining:
+    """Test RCPT batching with ESMTP PIPELINING."""
+
+    @pytest.mark.asyncio
+    async def test_rcpt_many_single_write(self, fake_smtp):
+        """All RCPTs go out in one write and replies come back in order."""
+        fake_smtp.pipelining = True
+        fake_smtp.valid = {"c@example.com"}
+        emails = ["a@example.com", "b@example.com", "c@example.com", "d@example.com"]
+
+        async with AsyncSMTPSession(fake_smtp.host, "vps.example.com", "verify@vps.example.com") as session:
+            await session.connect()
+            session._writer.write = MagicMock(wraps=session._writer.write)
+            replies = await session.rcpt_many(emails)
+            assert session._writer.write.call_count == 1
+
+        assert [code for code, _ in replies] == [550, 550, 250, 550]
+
+    @pytest.mark.asyncio
+    async def test_rcpt_many_respects_recipient_limit(self, fake_smtp):
+        """Batches are split at the session's recipient budget with RSET in between."""
+        fake_smtp.pipelining = True
+
+        async with AsyncSMTPSession(fake_smtp.host, "vps.example.com", "verify@vps.example.com", max_recipients=3) as session:
+            replies = await session.rcpt_many([f"user{i}@example.com" for i in range(7)])
+
+        assert [code for code, _ in replies] == [550] * 7
+        assert fake_smtp.commands.count("RSET") == 2
+
+    @pytest.mark.asyncio
+    async def test_rcpt_many_server_limit_lower(self, fake_smtp):
+        """452 replies inside a batch are retried after RSET."""
+        fake_smtp.pipelining = True
+        fake_smtp.max_recipients = 2
+
+        async with AsyncSMTPSession(fake_smtp.host, "vps.example.com", "verify@vps.example.com") as session:
+            replies = await session.rcpt_many([f"user{i}@example.com" for i in range(4)])
+
+        assert [code for code, _ in replies] == [550] * 4
+        assert fake_smtp.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_rcpt_many_without_pipelining(self, fake_smtp):
+        """Falls back to one RCPT per round trip."""
+        async with AsyncSMTPSession(fake_smtp.host, "vps.example.com", "verify@vps.example.com") as session:
+            await session.connect()
+            session._writer.write = MagicMock(wraps=session._writer.write)
+            await session.rcpt_many(["a@example.com", "b@example.com", "c@example.com"])
+            assert session._writer.write.call_count == 3
@@ -0,0 +1,101 @@
+"""
+Tests for the outbound source-address pool.
+"""
+import pytest
+from unittest.mock import patch
+
+from config import Config
+from core.email_finder import EmailFinder
+from core.source_pool import SourcePool, is_block_reply
+
+SOURCES = {"127.0.0.2": "mx1.test", "127.0.0.3": "mx2.test"}
+
+
+class TestSourcePool:
+    """Test address selection and per-address statistics."""
+
+    def test_empty_pool(self):
+        """Without configured addresses sessions use the OS default."""
+        pool = SourcePool({})
+
+        assert pool.select() is None
+        assert pool.helo_for(None, "default.test") == "default.test"
+
+    def test_round_robin(self):
+        """Addresses are used in turn, each with its own EHLO hostname."""
+        pool = SourcePool(SOURCES, strategy="round_robin")
+
+        picked = [pool.select().address for _ in range(4)]
+
+        assert picked == ["127.0.0.2", "127.0.0.3", "127.0.0.2", "127.0.0.3"]
+        assert pool.helo_for("127.0.0.3", "default.test") == "mx2.test"
+
+    def test_least_loaded(self):
+        """The address with the fewest sessions in use is picked."""
+        pool = SourcePool(SOURCES, strategy="least_loaded")
+
+        first = pool.select()
+        second = pool.select()
+        assert first.address != second.address
+
+        pool.release(second.address)
+        assert pool.select().address == second.address
+
+    def test_block_reply_cools_address_down(self):
+        """A blocklist rejection sets the address aside; greylisting is only counted."""
+        pool = SourcePool(SOURCES, strategy="round_robin", block_cooldown=60)
+
+        pool.report("127.0.0.2", 450, "4.7.1 Greylisted, try again later")
+        pool.report("127.0.0.2", 550, "5.7.1 Service unavailable; client host blocked using Spamhaus")
+
+        assert [pool.select().address for _ in range(3)] == ["127.0.0.3"] * 3
+        stats = pool.stats()["addresses"]["127.0.0.2"]
+        assert stats["greylisted"] == 1
+        assert stats["blocked"] == 1
+        assert stats["cooling_down"] is True
+
+    def test_is_block_reply(self):
+        """Unknown-recipient rejections are not blocks."""
+        assert is_block_reply(554, "Rejected: IP on blocklist")
+        assert not is_block_reply(550, "5.1.1 User unknown")
+        assert not is_block_reply(450, "blocked, try later")
+
+    @pytest.mark.asyncio
+    async def test_per_address_budget(self):
+        """Each address spends its own RCPT budget."""
+        pool = SourcePool(SOURCES, rate=1, burst=1)
+
+        assert await pool.acquire("127.0.0.2") == 0
+        assert await pool.acquire("127.0.0.3") == 0
+        assert pool.stats()["addresses"]["127.0.0.2"]["rcpts"] == 1
+
+
+class TestSourceBinding:
+    """Sessions leave from the pooled addresses."""
+
+    @pytest.mark.asyncio
+    async def test_sessions_bound_to_sources(self, fake_smtp):
+        """Checks alternate source IPs and announce each IP's hostname."""
+        fake_smtp.valid = {"john.doe@example.com"}
+        with patch.object(Config, "SMTP_SOURCE_ADDRESSES", "127.0.0.2=mx1.test,127.0.0.3=mx2.test"):
+            finder = EmailFinder()
+
+        for _ in range(2):
+            is_valid, _, code = await finder.verify_email_async("john.doe@example.com", fake_smtp.host)
+            assert is_valid and code == 250
+
+        assert sorted(fake_smtp.peers) == ["127.0.0.2", "127.0.0.3"]
+        ehlo = [c for c in fake_smtp.commands if c.upper().startswith("EHLO")]
+        assert sorted(ehlo) == ["EHLO mx1.test", "EHLO mx2.test"]
+        stats = finder.sources.stats()["addresses"]
+        assert all(s["in_use"] == 0 and s["rcpts"] == 1 for s in stats.values())
+
+    def test_sync_session_bound_to_source(self, fake_smtp):
+        """The blocking verifier binds to a pooled address as well."""
+        with patch.object(Config, "SMTP_SOURCE_ADDRESSES", "127.0.0.2=mx1.test"):
+            finder = EmailFinder()
+
+        finder.verify_email("nobody@example.com", fake_smtp.host)
+
+        assert fake_smtp.peers == ["127.0.0.2"]
+        assert finder.sources.stats()["addresses"]["127.0.0.2"]["in_use"] == 0
@@ -0,0 +1,138 @@
+"""
+Tests for the per-address verification verdict cache.
+"""
+import pytest
+from unittest.mock import patch
+from core.catch_all_cache import CATCH_ALL, HONEST
+from core.verdict_cache import VerdictCache, outcome_for_code
+from core.email_finder import EmailFinder
+
+
+class TestVerdictCache:
+    """Test verdict storage, TTLs and eviction."""
+
+    def test_outcome_for_code(self):
+        """SMTP codes map to valid / invalid / tempfail, anything else is not cached."""
+        assert outcome_for_code(250) == "valid"
+        assert outcome_for_code(251) == "valid"
+        assert outcome_for_code(550) == "invalid"
+        assert outcome_for_code(451) == "tempfail"
+        assert outcome_for_code(0) is None
+
+    def test_get_set(self):
+        """Stored verdicts come back with code, MX and age."""
+        cache = VerdictCache()
+
+        assert cache.get("john.doe@example.com") is None
+        assert cache.set("John.Doe@example.com", 250, "mx.example.com", "250 OK")
+
+        is_valid, log, code, mx_host = cache.get("john.doe@example.com")
+        assert is_valid is True
+        assert code == 250
+        assert mx_host == "mx.example.com"
+        assert "cached" in log
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["outcomes"]["valid"] == 1
+
+    def test_uncacheable_code(self):
+        """Connection errors (code 0) are never cached."""
+        cache = VerdictCache()
+        assert not cache.set("john.doe@example.com", 0, "mx.example.com", "Connection refused")
+        assert cache.get("john.doe@example.com") is None
+
+    def test_per_outcome_ttls(self):
+        """Temporary failures expire long before definitive verdicts."""
+        cache = VerdictCache(valid_ttl=1000, invalid_ttl=1000, tempfail_ttl=10)
+        with patch('core.verdict_cache.time.time', return_value=1000):
+            cache.set("ok@example.com", 250, "mx.example.com", "250 OK")
+            cache.set("later@example.com", 450, "mx.example.com", "450 Try again")
+
+        with patch('core.verdict_cache.time.time', return_value=1050):
+            assert cache.get("ok@example.com") is not None
+            assert cache.get("later@example.com") is None
+
+        with patch('core.verdict_cache.time.time', return_value=3000):
+            assert cache.cleanup_expired() == 1
+        assert cache.stats()["cached_addresses"] == 0
+
+    def test_lru_eviction(self):
+        """Least recently used addresses are evicted at max_entries."""
+        cache = VerdictCache(max_entries=2)
+        cache.set("a@example.com", 250, "mx", "250 OK")
+        cache.set("b@example.com", 250, "mx", "250 OK")
+        cache.get("a@example.com")
+        cache.set("c@example.com", 550, "mx", "550 No such user")
+
+        assert cache.get("b@example.com") is None
+        assert cache.get("a@example.com") is not None
+        assert cache.stats()["evictions"] == 1
+
+
+class TestFinderUsesVerdictCache:
+    """Test that repeat lookups reuse verdicts instead of sending RCPTs."""
+
+    def setup_method(self):
+        self.finder = EmailFinder()
+
+    @pytest.mark.asyncio
+    async def test_repeat_check_sends_no_rcpt(self, fake_smtp):
+        """Checking the same address twice on an honest domain talks to the server once."""
+        fake_smtp.valid = {"john.doe@example.com"}
+        self.finder.catch_all_cache.set("example.com", HONEST, fake_smtp.host)
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.check_email_async("john.doe@example.com")
+            rcpts_before = len(fake_smtp.rcpt_commands())
+            result = await self.finder.check_email_async("john.doe@example.com")
+
+        assert result.status == "valid"
+        assert len(fake_smtp.rcpt_commands()) == rcpts_before
+        assert self.finder.verdict_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_acceptance_not_cached_unless_domain_honest(self, fake_smtp):
+        """A 250 from a server not known to reject unknown addresses is not cached."""
+        fake_smtp.catch_all = True
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.check_email_async("anyone@example.com")
+
+        assert self.finder.verdict_cache.get("anyone@example.com") is None
+
+    @pytest.mark.asyncio
+    async def test_cached_acceptance_ignored_on_catch_all_domain(self, fake_smtp):
+        """A domain found catch-all after an address was cached as valid is re-checked."""
+        self.finder.verdict_cache.set("john.doe@example.com", 250, fake_smtp.host, "250 OK")
+        self.finder.catch_all_cache.set("example.com", CATCH_ALL, fake_smtp.host)
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.check_email_async("john.doe@example.com")
+
+        assert len(fake_smtp.rcpt_commands()) == 1
+
+    @pytest.mark.asyncio
+    async def test_repeat_find_skips_known_patterns(self, fake_smtp):
+        """Patterns already verified are not tested again on the next search."""
+        fake_smtp.valid = {"john.doe@example.com"}
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.find_email_async("example.com", "John Doe")
+            self.finder.catch_all_cache.clear()
+            rcpts_before = fake_smtp.rcpt_commands()
+            result = await self.finder.find_email_async("example.com", "John Doe")
+
+        assert result.status == "valid"
+        assert result.email == "john.doe@example.com"
+        new_rcpts = fake_smtp.rcpt_commands()[len(rcpts_before):]
+        assert all("chk_" in command for command in new_rcpts)
+
+    @pytest.mark.asyncio
+    async def test_fresh_reverifies(self, fake_smtp):
+        """fresh=True bypasses cached verdicts and refreshes them."""
+        fake_smtp.valid = {"john.doe@example.com"}
+        with patch.object(EmailFinder, 'get_mx_records', return_value=[fake_smtp.host]):
+            await self.finder.check_email_async("john.doe@example.com")
+            rcpts_before = len(fake_smtp.rcpt_commands())
+            result = await self.finder.check_email_async("john.doe@example.com", fresh=True)
+
+        assert result.status == "valid"
+        assert len(fake_smtp.rcpt_commands()) > rcpts_before
+        assert self.finder.verdict_cache.stats()["hits"] == 0